@@ -1,74 +1,38 @@
-import PyPDF2
-import difflib
+import argparse
+import hashlib
+import json
+import linediff
 import os
 import sys
 import re # Importar para expresiones regulares
+import comparator
+import parallel
+import sidecar
+from comparator import extract_text_from_pdf # Extracción en paralelo y con caché
 from datetime import datetime
+from pathlib import Path
 
-def extract_text_from_pdf(pdf_path):
-    """
-    Extrae todo el texto de un archivo PDF.
-
-    Args:
-        pdf_path (str): La ruta al archivo PDF.
-
-    Returns:
-        str: El texto extraído del PDF.
-    """
-    text = ""
-    try:
-        if not os.path.exists(pdf_path):
-            print(f"ERROR: El archivo no existe en la ruta: '{pdf_path}'")
-            return None
-
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            
-            if reader.is_encrypted:
-                print(f"ADVERTENCIA: El PDF '{pdf_path}' está encriptado. Intentando desencriptar sin contraseña...")
-                # Si tienes una contraseña, podrías usar: reader.decrypt('tu_contrasena_aqui')
-
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text
-                else:
-                    print(f"ADVERTENCIA: Página {page_num+1} de '{pdf_path}' no contiene texto extraíble o es una imagen escaneada.")
-            
-            if not text.strip():
-                print(f"ADVERTENCIA: No se pudo extraer texto significativo de '{pdf_path}'. Podría ser un PDF escaneado o vacío.")
-
-    except PyPDF2.errors.PdfReadError as e:
-        print(f"ERROR PyPDF2 al leer '{pdf_path}': {e}. El archivo podría estar corrupto o no ser un PDF válido.")
-        return None
-    except FileNotFoundError:
-        print(f"ERROR: El archivo no fue encontrado en '{pdf_path}'.")
-        return None
-    except Exception as e:
-        print(f"ERROR inesperado al procesar '{pdf_path}': {e}")
-        return None
-    return text
-
-def compare_pdf_texts(pdf1_path, pdf2_path):
+def compare_pdf_texts(pdf1_path, pdf2_path, workers=None, context=linediff.DEFAULT_CONTEXT):
     """
     Compara el texto de dos archivos PDF y devuelve las diferencias.
 
     Args:
         pdf1_path (str): La ruta al primer archivo PDF.
         pdf2_path (str): La ruta al segundo archivo PDF.
+        workers (int): Procesos para extraer las páginas (por defecto uno por CPU).
+        context (int): Líneas de contexto alrededor de cada diferencia.
 
     Returns:
         list: Una lista de cadenas que representan las diferencias,
               o None si hubo un error al extraer el texto.
     """
     print(f"Extrayendo texto de: {pdf1_path}")
-    text1 = extract_text_from_pdf(pdf1_path)
+    text1 = extract_text_from_pdf(pdf1_path, workers)
     if text1 is None:
         return None
 
     print(f"Extrayendo texto de: {pdf2_path}")
-    text2 = extract_text_from_pdf(pdf2_path)
+    text2 = extract_text_from_pdf(pdf2_path, workers)
     if text2 is None:
         return None
 
@@ -76,8 +40,8 @@ def compare_pdf_texts(pdf1_path, pdf2_path):
     lines1 = text1.splitlines(keepends=True)
     lines2 = text2.splitlines(keepends=True)
 
-    # Llamar directamente a difflib.unified_diff
-    diff = difflib.unified_diff(lines1, lines2, fromfile=os.path.basename(pdf1_path), tofile=os.path.basename(pdf2_path))
+    # Diff anclado en las líneas únicas: lineal en reportes largos con líneas repetidas
+    diff = linediff.unified_diff(lines1, lines2, fromfile=os.path.basename(pdf1_path), tofile=os.path.basename(pdf2_path), n=context)
     
     return list(diff)
 
@@ -128,12 +92,191 @@ def get_pdfs_by_date(directory_path, filename_pattern=r'Audit_aru_(\d{4}-\d{2}-\
 
     return oldest_recent_pdf, newest_pdf
 
+# --- Modo flota: todos los equipos de un árbol de directorios ---
+
+# Audit_<alias>_<AAAA-MM-DD>.pdf (el alias puede contener "_")
+FLEET_PATTERN = re.compile(r'^Audit_(.+)_(\d{4}-\d{2}-\d{2})\.pdf$')
+
+FLEET_INDEX_VERSION = 1
+FLEET_INDEX_DIRECTORY = str(Path.home()) + '/.cache/fortigate-security-auditor'
+
+def fleet_index_path(root):
+    """
+    Ruta del índice persistido de un árbol de reportes.
+    """
+    name = hashlib.sha256(os.path.abspath(root).encode()).hexdigest()[:16]
+    return os.path.join(FLEET_INDEX_DIRECTORY, f'fleet-index-{name}.json')
+
+def load_fleet_index(root):
+    try:
+        with open(fleet_index_path(root)) as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return {"version": FLEET_INDEX_VERSION, "directories": {}, "compared": {}}
+    if index.get("version") != FLEET_INDEX_VERSION:
+        return {"version": FLEET_INDEX_VERSION, "directories": {}, "compared": {}}
+    return index
+
+def save_fleet_index(root, index):
+    path = fleet_index_path(root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as index_file:
+        json.dump(index, index_file)
+    os.replace(tmp_path, path)
+
+def scan_fleet(root, index):
+    """
+    Recorre el árbol una vez y actualiza el índice: por directorio, su mtime, sus subdirectorios
+    y sus reportes (alias, fecha, archivo). Los directorios cuyo mtime no cambió (sin archivos
+    nuevos ni borrados) no se vuelven a listar.
+
+    Returns:
+        tuple: ({(directorio relativo, alias): [(fecha, ruta), ...] ordenados por fecha}, directorios listados)
+    """
+    directories = {}
+    listed = 0
+    pending = [""]
+    while pending:
+        relative = pending.pop()
+        path = os.path.join(root, relative)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        entry = index["directories"].get(relative)
+        if entry is None or entry["mtime_ns"] != mtime_ns:
+            entry = {"mtime_ns": mtime_ns, "subdirs": [], "reports": []}
+            listed += 1
+            with os.scandir(path) as scan:
+                for item in scan:
+                    if item.is_dir(follow_symlinks=False):
+                        entry["subdirs"].append(item.name)
+                    else:
+                        match = FLEET_PATTERN.match(item.name)
+                        if match:
+                            entry["reports"].append([match.group(1), match.group(2), item.name])
+        directories[relative] = entry
+        pending.extend(os.path.join(relative, subdir) for subdir in entry["subdirs"])
+    # Los directorios borrados desaparecen del índice
+    index["directories"] = directories
+
+    reports = {}
+    for relative, entry in directories.items():
+        for alias, date, filename in entry["reports"]:
+            reports.setdefault((relative, alias), []).append((date, os.path.join(root, relative, filename)))
+    for dated_reports in reports.values():
+        dated_reports.sort()
+    return reports, listed
+
+def compare_pair(pdf1_path, pdf2_path, context=linediff.DEFAULT_CONTEXT):
+    """
+    Compara dos reportes de un equipo (en un proceso del pool) y retorna el resultado:
+    {"mode": "results" | "text", "comparison" | "diff", "error"}
+    """
+    results1, results2 = sidecar.find(pdf1_path), sidecar.find(pdf2_path)
+    if results1 is not None and results2 is not None:
+        comparison = comparator.compare_results(results1, results2)
+        return {"mode": "results", "comparison": comparison, "error": comparison is None}
+    # Un solo proceso por comparación: las comparaciones ya se reparten entre procesos
+    diff = compare_pdf_texts(pdf1_path, pdf2_path, workers=1, context=context)
+    return {"mode": "text", "diff": diff, "error": diff is None}
+
+def compare_fleet(root, summary_file, jobs=None, compare_all=False, context=linediff.DEFAULT_CONTEXT):
+    """
+    Compara los dos últimos reportes de cada equipo del árbol root, en paralelo, y escribe
+    un resumen consolidado en summary_file. Los equipos cuyo último par ya fue comparado en
+    la ejecución anterior se omiten (salvo compare_all).
+
+    Returns:
+        int: 0 sin cambios, 2 con cambios, 1 si alguna comparación falló.
+    """
+    index = load_fleet_index(root)
+    reports, listed = scan_fleet(root, index)
+    print(f"[+] {len(reports)} equipos encontrados ({listed} directorios leídos, {len(index['directories']) - listed} sin cambios)")
+
+    pairs = []
+    single = []
+    unchanged = []
+    for key in sorted(reports):
+        # norte/fw1 para norte/fw1/Audit_fw1_*.pdf, norte/fw1 también para norte/Audit_fw1_*.pdf
+        label = key[0] if os.path.basename(key[0]) == key[1] else os.path.join(key[0], key[1])
+        dated_reports = reports[key]
+        if len(dated_reports) < 2:
+            single.append(label)
+            continue
+        pair = [dated_reports[-2][1], dated_reports[-1][1]]
+        if not compare_all and index["compared"].get(label) == pair:
+            unchanged.append(label)
+            continue
+        pairs.append((label, pair))
+
+    print(f"[+] Comparando {len(pairs)} equipos")
+    tasks = [lambda pair=pair: compare_pair(*pair, context) for label, pair in pairs]
+    results = []
+    if pairs:
+        pool = parallel.CapturePool(tasks, jobs or os.cpu_count() or 1)
+        try:
+            for index_task in range(len(tasks)):
+                results.append(pool.result(index_task))
+        finally:
+            pool.close()
+
+    with_changes = errors = 0
+    print(f"=== Resumen de cambios de la flota: {len(pairs)} equipos comparados ===", file=summary_file)
+    for (label, pair), result in zip(pairs, results):
+        header = f"\n--- {label}: {os.path.basename(pair[0])} -> {os.path.basename(pair[1])} ---"
+        if result["error"]:
+            errors += 1
+            print(f"{header}\nERROR: No se pudo realizar la comparación.", file=summary_file)
+            continue
+        index["compared"][label] = pair
+        if result["mode"] == "results":
+            if not sidecar.has_differences(result["comparison"]):
+                continue
+            print(header, file=summary_file)
+            comparator.print_comparison(result["comparison"], file=summary_file)
+        else:
+            if not result["diff"]:
+                continue
+            print(f"{header}\n(comparación de texto, sin archivos de resultados)", file=summary_file)
+            for line in result["diff"]:
+                print(line, end='', file=summary_file)
+        with_changes += 1
+
+    print(f"\n=== {with_changes} equipos con cambios, {len(pairs) - with_changes - errors} sin cambios, {errors} con errores ===", file=summary_file)
+    if unchanged:
+        print(f"Sin reportes nuevos desde la última ejecución ({len(unchanged)}): {', '.join(unchanged)}", file=summary_file)
+    if single:
+        print(f"Con un solo reporte ({len(single)}): {', '.join(single)}", file=summary_file)
+
+    save_fleet_index(root, index)
+    if errors:
+        return 1
+    return 2 if with_changes else 0
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Uso: python compare_pdfs.py <ruta_al_directorio_de_pdfs>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Compara los dos últimos reportes de auditoría de un directorio, o de cada equipo de un árbol (--fleet)')
+    parser.add_argument('directory', help='Directorio de los PDF (Audit_aru_<fecha>.pdf), o raíz del árbol con --fleet')
+    parser.add_argument('--fleet', help='Compara los dos últimos Audit_<alias>_<fecha>.pdf de cada equipo del árbol', action='store_true')
+    parser.add_argument('--summary', help='Archivo del resumen consolidado del modo flota (por defecto: salida estándar)')
+    parser.add_argument('--jobs', help='Comparaciones en paralelo del modo flota (por defecto: una por CPU)', type=int, default=None)
+    parser.add_argument('--context', help='Líneas de contexto de la comparación de texto (por defecto: 3)', type=int, default=linediff.DEFAULT_CONTEXT)
+    parser.add_argument('--all', help='Modo flota: compara también los equipos sin reportes nuevos desde la última ejecución', action='store_true')
+    args = parser.parse_args()
+
+    if args.fleet:
+        if not os.path.isdir(args.directory):
+            print(f"ERROR: El directorio '{args.directory}' no existe o no es un directorio válido.")
+            sys.exit(1)
+        if args.summary is None:
+            sys.exit(compare_fleet(args.directory, sys.stdout, args.jobs, args.all, args.context))
+        with open(args.summary, 'w', encoding='utf-8') as summary_file:
+            code = compare_fleet(args.directory, summary_file, args.jobs, args.all, args.context)
+        print(f"[+] Resumen escrito en {args.summary}")
+        sys.exit(code)
 
-    pdf_directory = sys.argv[1]
+    pdf_directory = args.directory
 
     print(f"\n--- Buscando PDFs en: {pdf_directory} ---")
     pdf_path1, pdf_path2 = get_pdfs_by_date(pdf_directory)
@@ -146,18 +289,6 @@ if __name__ == "__main__":
     print(f"  Antiguo (Base): {os.path.basename(pdf_path1)}")
     print(f"  Reciente (Nuevo): {os.path.basename(pdf_path2)}")
 
-    print("\n--- Iniciando comparación de PDFs ---")
-    differences = compare_pdf_texts(pdf_path1, pdf_path2)
-
-    if differences is not None:
-        if len(differences) > 0:
-            print("\n--- Diferencias encontradas: ---")
-            for line in differences:
-                print(line, end='')
-            sys.exit(2) # Exit with a different code to indicate differences were found
-        else:
-            print("\nLos archivos PDF son idénticos en su contenido de texto.")
-            sys.exit(0) # Exit with success code
-    else:
-        print("\nNo se pudo realizar la comparación debido a errores en la extracción de texto de uno o ambos archivos.")
-        sys.exit(1) # Exit with an error code
\ No newline at end of file
+    # Por resultados estructurados (.results.json) si existen, si no por el texto de los PDF
+    sys.exit(comparator.compare_reports(pdf_path1, pdf_path2,
+                                       lambda pdf1, pdf2: compare_pdf_texts(pdf1, pdf2, context=args.context)))
@@ -0,0 +1,141 @@
+import socket
+
+from intervalset import IntervalSet
+
+# Sets of IP addresses stored as sorted, merged integer intervals per IP family
+# (4 and 6, see intervalset), plus the names of objects that cannot be resolved
+# offline (fqdn, geography, dynamic, ...).
+
+MAX_IPV4 = (1 << 32) - 1
+MAX_IPV6 = (1 << 128) - 1
+
+# Wildcard masks with more holes than this are approximated by their bounding range
+MAX_WILDCARD_INTERVALS = 4096
+
+
+def ipv4_to_int(ip):
+    return int.from_bytes(socket.inet_aton(ip), 'big')
+
+
+def ipv6_to_int(ip):
+    return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+
+
+def int_to_ip(value, family=4):
+    if family == 4:
+        return socket.inet_ntoa(value.to_bytes(4, 'big'))
+    return socket.inet_ntop(socket.AF_INET6, value.to_bytes(16, 'big'))
+
+
+def ipv4_mask(mask):
+    # "255.255.255.0" or "24"
+    if '.' in mask:
+        return ipv4_to_int(mask)
+    return (MAX_IPV4 << (32 - int(mask))) & MAX_IPV4
+
+
+def ipv4_subnet(ip, mask):
+    """
+    Returns the intervals of an IPv4 address and mask. Non contiguous (wildcard)
+    masks give one interval per combination of the holes in the mask.
+    """
+    address = ipv4_to_int(ip)
+    mask = ipv4_mask(mask)
+    network = address & mask
+    wildcard = ~mask & MAX_IPV4
+    if (wildcard + 1) & wildcard == 0:
+        # Contiguous mask
+        return [(network, network | wildcard)]
+
+    # Trailing zeros of the mask form the interval, the other zeros are holes
+    block = wildcard & ~(wildcard + 1)
+    holes = [bit for bit in range(32) if (wildcard & ~block) >> bit & 1]
+    if 1 << len(holes) > MAX_WILDCARD_INTERVALS:
+        return [(network, network | wildcard)]
+    intervals = []
+    for combination in range(1 << len(holes)):
+        start = network
+        for position, bit in enumerate(holes):
+            if combination >> position & 1:
+                start |= 1 << bit
+        intervals.append((start, start | block))
+    return intervals
+
+
+def ipv6_prefix(prefix):
+    # "2001:db8::/32"
+    ip, _, length = prefix.partition('/')
+    length = int(length) if length else 128
+    host_bits = 128 - length
+    network = ipv6_to_int(ip) >> host_bits << host_bits
+    return [(network, network | ((1 << host_bits) - 1))]
+
+
+class AddressSet(IntervalSet):
+    __slots__ = ('unresolved',)
+
+    def __init__(self, intervals=None, unresolved=()):
+        """
+        intervals: dict family (4 or 6) -> iterable of (start, end) integer ranges (inclusive).
+        unresolved: names of the objects whose addresses are unknown offline (fqdn, geography, ...).
+        """
+        super().__init__(intervals)
+        self.unresolved = frozenset(unresolved)
+
+    @classmethod
+    def all(cls, families=(4,)):
+        return cls({family: [(0, MAX_IPV4 if family == 4 else MAX_IPV6)] for family in families})
+
+    def is_all(self, family=4):
+        return self.covers_range(0, MAX_IPV4 if family == 4 else MAX_IPV6, family)
+
+    def contains(self, ip):
+        """
+        Returns True if the IP (string) is in the set.
+        """
+        if ':' in ip:
+            value, family = ipv6_to_int(ip), 6
+        else:
+            value, family = ipv4_to_int(ip), 4
+        return self.covers_range(value, value, family)
+
+    def overlaps(self, other):
+        if self.unresolved & other.unresolved:
+            return True
+        return super().overlaps(other)
+
+    def covers(self, other):
+        """
+        Returns True if every address of other is in this set. Unresolved objects of
+        other are only covered by the same objects, or by the whole address space.
+        """
+        missing = other.unresolved - self.unresolved
+        if missing and not self.is_all(4):
+            return False
+        return super().covers(other)
+
+    @classmethod
+    def union_all(cls, address_sets):
+        address_sets = list(address_sets)
+        result = super().union_all(address_sets)
+        result.unresolved = frozenset().union(*(address_set.unresolved for address_set in address_sets))
+        return result
+
+    def intersection(self, other):
+        result = super().intersection(other)
+        result.unresolved = self.unresolved & other.unresolved
+        return result
+
+    def __bool__(self):
+        return bool(self.intervals) or bool(self.unresolved)
+
+    def __eq__(self, other):
+        return super().__eq__(other) and self.unresolved == other.unresolved
+
+    def __repr__(self):
+        items = []
+        for family, ranges in self.intervals.items():
+            for start, end in ranges:
+                items.append(int_to_ip(start, family) if start == end else f'{int_to_ip(start, family)}-{int_to_ip(end, family)}')
+        items.extend(sorted(self.unresolved))
+        return f'AddressSet({", ".join(items)})'
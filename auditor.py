@@ -0,0 +1,1000 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import traceback
+from datetime import datetime
+from pathlib import Path
+
+import checkpoint
+import checks
+import display
+import fingerprint
+import firewall
+import fortiguard
+import resultcache
+import rules
+import sidecar
+
+# Audit pipeline, importable by other services:
+#
+#     import auditor
+#     result = auditor.audit('backups/fw1.conf', auditor.AuditOptions(levels=[1, 2], wan=['port1']))
+#     print(result.counts(), result.failed_checks())
+#
+# fortigate-security-auditor.py is the command line front-end of this module.
+# audit() can be called repeatedly in the same process: the imported checks and the
+# Fortiguard database are shared. Errors are raised (AuditError), never exit().
+# The heavy dependencies are imported by the stage that needs them: the parser
+# (parsecache) when loading a configuration, fpdf when exporting a PDF report and
+# the process pools (parallel) when running checks or devices in parallel.
+
+cache_file_path = str(Path.home()) + '/.cache/fortigate-security-auditor/results.sqlite3'
+# JSON results cache of the previous versions, imported once into cache_file_path
+legacy_cache_file_path = str(Path.home()) + '/.cache/fortigate-security-auditor.json'
+parse_cache_path = str(Path.home()) + '/.cache/fortigate-security-auditor/parsed'
+
+# Modules that "import auditor" must not load (see python3 auditor.py)
+DEFERRED_MODULES = ('fpdf', 'parsecache', 'fortios', 'parallel', 'multiprocessing', 'concurrent.futures', 'csv', 'numpy')
+
+# Startup budget of "import auditor", in ms (cumulative import time)
+STARTUP_BUDGET = 100
+
+# Version of the results carried forward by the incremental audit (see run_checks): to be
+# increased when a change of the shared code (firewall.py, checker.py...) changes check results
+RESULTS_VERSION = 1
+
+# Signature of the code of the auditor and of the checks (see code_signature)
+_code_signature = None
+
+
+class AuditError(Exception):
+    """
+    The audit cannot be performed (missing cache for --resume, file that cannot be renamed...).
+    """
+
+
+class AuditOptions:
+
+    def __init__(self, levels=("1",), ids=None, benchmarks=None, wan=None, quiet=True, verbose=False,
+                 json=False, resume=False, autofix=False, no_parse_cache=False, parse_cache_size=512,
+                 policy_workers=1, jobs=1, job_threads=False, full=False, output=None, report_name='Fortigate',
+                 report_date='', output_dir=None, manifest=None, cache_file=cache_file_path,
+                 cache_max_age=resultcache.DEFAULT_MAX_AGE, cache_max_devices=resultcache.DEFAULT_MAX_DEVICES):
+        """
+        Same options as the command line. Defaults suit a service: not interactive (quiet),
+        level 1, no PDF. cache_file: SQLite results cache (None: no results cache).
+        """
+        self.levels = [str(level) for level in levels]
+        self.ids = ids
+        self.benchmarks = benchmarks
+        self.wan = wan
+        self.quiet = quiet
+        self.verbose = verbose
+        self.json = json
+        self.resume = resume
+        self.autofix = autofix
+        self.no_parse_cache = no_parse_cache
+        self.parse_cache_size = parse_cache_size
+        self.policy_workers = policy_workers
+        self.jobs = jobs
+        self.job_threads = job_threads
+        self.full = full
+        self.output = output
+        self.report_name = report_name
+        self.report_date = report_date
+        self.output_dir = output_dir
+        self.manifest = manifest
+        self.cache_file = cache_file
+        self.cache_max_age = cache_max_age
+        self.cache_max_devices = cache_max_devices
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        Options of the parsed command line arguments (argparse.Namespace).
+        """
+        options = cls()
+        for name, value in vars(args).items():
+            if hasattr(options, name):
+                setattr(options, name, value)
+        options.levels = [str(level) for level in options.levels]
+        return options
+
+    def replace(self, **changes):
+        options = AuditOptions.__new__(AuditOptions)
+        options.__dict__.update(self.__dict__)
+        options.__dict__.update(changes)
+        return options
+
+
+class AuditResult:
+
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.error = None              # "Type: message" when the audit failed (batch mode)
+        self.checks = []               # [{"id", "title", "result", "levels", "auto", "log", "findings"}], in report order
+        self.cached_results = {}       # Entry of the results cache for this configuration
+        self.output = None             # PDF report written, if any
+        self.performed_checks = []     # Checker objects (only in the auditing process)
+
+    def __getstate__(self):
+        # Checkers reference the whole configuration: not sent back by the batch workers
+        state = dict(self.__dict__)
+        state["performed_checks"] = []
+        return state
+
+    def counts(self):
+        """
+        Number of checks by result: {"PASS": n, "FAIL": n, ...}
+        """
+        counts = {}
+        for check in self.checks:
+            counts[check["result"]] = counts.get(check["result"], 0) + 1
+        return counts
+
+    def failed_checks(self):
+        return [check["id"] for check in self.checks if check["result"] == "FAIL"]
+
+
+class RestoredCheck:
+    """
+    Check of a previous audit restored from the results cache (see restore_snapshot), with what
+    the summary and the PDF report read of a Checker.
+    """
+
+    def __init__(self, check):
+        self.id = check["id"]
+        self.title = check["title"]
+        self.result = check["result"]
+        self.levels = check["levels"]
+        self.auto = check["auto"]
+        self.log = check["log"]
+        self.findings = check["findings"]
+
+    def get_id(self):
+        return self.id
+
+    def get_log(self):
+        return self.log
+
+    def get_findings(self):
+        return self.findings
+
+
+def rename_txt_config(filepath):
+    # --- MODIFICACIÓN INICIO ---
+    # Check if the input file has a .txt extension and rename it to .conf
+    if filepath.lower().endswith('.txt'):
+        new_filepath = filepath.replace('.txt', '.conf')
+        os.rename(filepath, new_filepath)
+        print(f"[+] Renamed input file from '{filepath}' to '{new_filepath}'")
+        filepath = new_filepath # Update filepath to the new .conf file
+    # --- MODIFICACIÓN FIN ---
+    return filepath
+
+
+def load_configuration(filepath, options, interactive=True):
+    # Load fortigate configuration file
+    print(f'[+] Configuration file: {filepath}')
+
+    if options.json:
+        f = open(filepath)
+        config = json.load(f)["configs"]
+        f.close()
+        print(f'[+] Configuration loaded from JSON file')
+        return config
+
+    # Parser stage: imported on first use
+    import parsecache
+
+    # Single pass native parser: no temporary copy nor JSON dump on disk
+    parse_cache = None
+    if not options.no_parse_cache:
+        parse_cache = parsecache.ParseCache(parse_cache_path, options.parse_cache_size * 1024 * 1024)
+
+    errors = 'strict'
+    reparse = True
+    while reparse:
+        try:
+            config, from_cache = parsecache.load_config(filepath, cache=parse_cache, errors=errors)
+            reparse = False
+        except UnicodeDecodeError as e:
+            print(f'[!] Parsing failed due to characters not utf-8 encoded')
+            print(f'     I can try to remove those characters and re-parse again')
+            print(f'     Most of the time, non utf-8 characters are in comments or non critical items, however that may fail some checks.')
+            if options.autofix:
+                print(f'[+] Trying to fix the issue')
+            elif not interactive:
+                raise AuditError('configuration is not utf-8 encoded; re-run with --autofix') from e
+            else:
+                print(f'[?] Type \'yes\' to continue or Ctrl-C to quit')
+                while input() != "yes":
+                    print(f'[?] Type \'yes\' to continue or Ctrl-C to quit')
+
+            # Fix the encoding
+            errors = 'ignore'
+
+    if from_cache:
+        print(f'[+] Configuration loaded from parse cache')
+    else:
+        print(f'[+] Configuration succesfully parsed')
+    return config
+
+
+def load_firewall(config, options, interactive=True):
+    """
+    Returns (Firewall, Display) for a configuration file path, or an already parsed configuration.
+    """
+    if isinstance(config, str):
+        config = load_configuration(config, options, interactive)
+
+    print(f'[+] Starting checks for levels: {",".join(options.levels)}')
+
+    if options.ids is not None:
+        print(f'[+] Limiting to checks {", ".join(options.ids)}')
+
+    device_display = display.Display(verbose=options.verbose, quiet=options.quiet)
+    device_firewall = firewall.Firewall(config, device_display)
+    vdoms = device_firewall.get_vdoms()
+    if len(vdoms) > 1:
+        print(f'[!] {len(vdoms)} VDOMs ({", ".join(vdoms)}): only the global settings are audited, not the settings of each VDOM')
+    if options.wan is not None:
+        print(f'[+] Configuring WAN interfaces: {", ".join(options.wan)}')
+        device_firewall.set_wan_interfaces(options.wan)
+    device_firewall.set_policy_workers(options.policy_workers)
+    return device_firewall, device_display
+
+
+def is_selected(checker, options):
+    if options.ids is not None and checker.get_id() not in options.ids:
+        return False
+    return checker.enabled and checker.is_level_applicable(options.levels)
+
+
+def select_checkers(firewall, display, options):
+    """
+    Returns the selected checkers (valid, enabled and applicable to options.levels) in report order.
+    """
+    # Only the selected checks are imported (see checks/__init__.py)
+    benchmarks = None if options.benchmarks is None else [benchmark.lower() for benchmark in options.benchmarks]
+    check_classes = checks.classes(ids=options.ids, levels=options.levels, benchmarks=benchmarks)
+    checkers = [check_class(firewall, display, options.verbose) for check_class in check_classes]
+    checkers = [checker for checker in checkers if checker.is_valid() and is_selected(checker, options)]
+    # Stable order (by benchmark and id) for the console, the summary and the PDF
+    checkers.sort(key=lambda checker: checker.get_sort_key())
+    return checkers
+
+
+def plan_checks(firewall, display, options):
+    """
+    Returns the plan of the selected checks without running them: {"checks": [{"id", "title",
+    "mode", "inputs", "missing", "indexes", "cost"}], "indexes": [(name, cost)], "cost"}.
+    mode: "auto", "manual", "skip" (manual check in quiet mode) or "n/a" (inputs absent).
+    cost: entries of the declared inputs plus the cost of the indexes, None if not declared.
+    """
+    plan = {"checks": [], "indexes": [], "cost": 0}
+    used_indexes = set()
+    for checker in select_checkers(firewall, display, options):
+        if not checker.is_applicable():
+            mode = "n/a"
+        elif not checker.auto:
+            mode = "skip" if options.quiet else "manual"
+        else:
+            mode = "auto"
+        cost = None
+        if checker.inputs is not None:
+            cost = sum(firewall.get_chapter_size(chapter) for chapter in checker.inputs)
+            indexes = firewall.resolve_indexes(checker.indexes)
+            if mode in ("auto", "manual"):
+                plan["cost"] += cost
+                used_indexes.update(indexes)
+            cost += sum(firewall.get_index_cost(name) for name in indexes)
+        plan["checks"].append({
+            "id": checker.get_id(),
+            "title": checker.title,
+            "mode": mode,
+            "inputs": checker.inputs,
+            "missing": checker.get_missing_inputs(),
+            "indexes": checker.indexes,
+            "cost": cost,
+        })
+    # Each index is built once, whatever the number of checks using it
+    for name in firewall.resolve_indexes(used_indexes):
+        plan["indexes"].append((name, firewall.get_index_cost(name)))
+        plan["cost"] += firewall.get_index_cost(name)
+    return plan
+
+
+def print_plan(plan):
+    modes = [check["mode"] for check in plan["checks"]]
+    print(f'[+] Plan: {len(modes)} checks ({modes.count("auto")} automatic, {modes.count("manual")} manual, '
+          f'{modes.count("skip")} skipped, {modes.count("n/a")} not applicable)')
+    indexes = ", ".join(f'{name} ({cost})' for name, cost in plan["indexes"])
+    print(f'[+] Indexes built before the checks: {indexes or "none"}')
+    print(f'[+] Estimated cost (configuration entries processed): {plan["cost"]}')
+    for check in plan["checks"]:
+        cost = "?" if check["cost"] is None else check["cost"]
+        print(f'[{check["id"]}]\t[{check["mode"]}]\tcost {cost}\t{check["title"]}')
+        if check["inputs"] is None:
+            print(f'     | inputs not declared')
+            continue
+        inputs = [f'{chapter} (missing)' if chapter in check["missing"] else chapter for chapter in check["inputs"]]
+        if inputs:
+            print(f'     | inputs {", ".join(inputs)}')
+        if check["indexes"]:
+            print(f'     | indexes {", ".join(check["indexes"])}')
+
+
+def run_checks(firewall, display, cached_results, options, checkpoint_log=None, memo=None):
+    """
+    Runs the selected checks in order and returns them. cached_results is updated.
+    checkpoint_log: CheckpointLog recording each performed check; the checks it recorded
+    before an interruption are restored instead of being run.
+    memo: ResultCache whose memo table holds the results by content (check id, digest of
+    the check code and inputs), shared by the devices of the fleet.
+    """
+    recorded = checkpoint_log.recorded if checkpoint_log is not None else {}
+    # Instantiate checkers
+    performed_checks = []
+    checkers = select_checkers(firewall, display, options)
+
+    # Incremental audit: the automatic checks whose code and inputs (declared chapters and
+    # indexes) did not change since their cached result are carried forward, not run again,
+    # and those already evaluated on the same inputs for another device are reused (memo)
+    digests = {}
+    carried = {}
+    memoized = {}
+    # The WAN interfaces are part of the inputs of the checks using them: asked (if needed)
+    # before the digests, so that the answer is part of them
+    if any("wan_interfaces" in firewall.resolve_indexes(checker.indexes) for checker in checkers
+           if checker.auto and checker.get_id() not in recorded and checker.inputs is not None):
+        firewall.get_wan_interfaces()
+    for checker in checkers:
+        if not checker.auto or checker.get_id() in recorded:
+            continue
+        digest = checker.get_inputs_digest()
+        if digest is None:
+            continue
+        digests[checker.get_id()] = digest = f'{RESULTS_VERSION}:{digest}'
+        if options.full:
+            continue
+        previous = cached_results.get(checker.get_id())
+        if previous is not None and previous.get("inputs_digest") == digest and previous["result"] != "ERROR":
+            carried[checker.get_id()] = previous
+        elif memo is not None:
+            # Same check on the same inputs (for instance a block of a common template) on another device
+            previous = memo.memo_get(checker.get_id(), digest)
+            if previous is not None:
+                memoized[checker.get_id()] = carried[checker.get_id()] = previous
+    if len(carried) > len(memoized):
+        print(f'[+] {len(carried) - len(memoized)} automatic checks carried forward: their inputs did not change (--full to run them again)')
+    if memoized:
+        print(f'[+] {len(memoized)} automatic checks reused from other configurations with the same inputs')
+
+    # Only the indexes declared by the checks to run are built, once, before the checks
+    # (and before the pool: the workers inherit them)
+    to_run = [checker for checker in checkers if checker.get_id() not in recorded and checker.get_id() not in carried
+              and checker.is_applicable() and (checker.auto or not options.quiet)]
+    built = firewall.build_indexes({name for checker in to_run for name in checker.indexes})
+    if built:
+        print(f'[+] Indexes built: {", ".join(built)}')
+    # Declarative rules (see rules.py) evaluated together, chapter by chapter; their
+    # outcome is applied when they are run below, in check order
+    rule_checkers = [checker for checker in to_run if isinstance(checker, rules.RuleCheck)]
+    rules.evaluate(firewall, rule_checkers)
+
+    # Automatic checks are independent and read-only: with --jobs they start now in a pool,
+    # their output is replayed below in the same order as a serial run
+    check_pool = None
+    if options.jobs > 1:
+        auto_checkers = [checker for checker in to_run if checker.auto and not isinstance(checker, rules.RuleCheck)]
+        if len(auto_checkers) > 1:
+            import parallel
+            # Possible question about the WAN interfaces asked once, before starting the workers
+            firewall.get_wan_interfaces()
+            print(f'[+] Running {len(auto_checkers)} automatic checks with {options.jobs} jobs')
+            check_pool = parallel.CheckPool(auto_checkers, options.jobs, threads=options.job_threads)
+
+    for checker in checkers:
+        if checker.get_id() in recorded:
+            # Performed by the interrupted audit
+            checker.restore_from_cache(recorded[checker.get_id()])
+        elif checker.get_id() in carried:
+            checker.restore_from_cache(carried[checker.get_id()])
+        elif not checker.is_applicable():
+            # None of the chapters it requires exists
+            checker.skip_not_applicable()
+        elif checker.auto:
+            if check_pool is not None and checker in check_pool:
+                check_pool.collect(checker)
+            else:
+                checker.run()
+        else:
+            if options.quiet:
+                checker.skip()
+            else:
+                if options.resume:
+                    if checker.get_id() in cached_results.keys():
+                        # There is a cached result for this check
+                        # IMPORTANT: Ensure the cached_results dictionary structure matches your Checker's restore_from_cache method
+                        # 'message' (old) -> 'messages' (detailed list)
+                        # New: 'current_summary_message' (for the main summary message)
+                        # New: 'log_messages' (for the structured log entries)
+                        cached_data = cached_results[checker.get_id()]
+
+                        # Adjusting the cached_data to match Checker's expectations if the cache is old
+                        if "message" in cached_data and "messages" not in cached_data:
+                            cached_data["messages"] = [cached_data["message"]] if not isinstance(cached_data["message"], list) else cached_data["message"]
+                            del cached_data["message"]
+
+                        if "final_summary_message" in cached_data and "current_summary_message" not in cached_data:
+                            cached_data["current_summary_message"] = cached_data["final_summary_message"]
+                            del cached_data["final_summary_message"]
+
+                        if "log_messages" not in cached_data:
+                            # Attempt to reconstruct log_messages if they're missing but 'messages' exists
+                            if "messages" in cached_data and cached_data["messages"]:
+                                cached_data["log_messages"] = [{"message": msg, "level": "INFO"} for msg in cached_data["messages"]]
+                            else:
+                                cached_data["log_messages"] = []
+
+                        checker.restore_from_cache(cached_data)
+                    else:
+                        # There is no cached result, we have to perform the step
+                        checker.run()
+                else:
+                    checker.run()
+        performed_checks.append(checker)
+
+        # Save to cache - THIS IS THE CRITICAL LINE TO CHANGE
+        # Using checker.messages for the list of detailed logs
+        # Using checker.current_summary_message for the single summary message
+        # Using checker.log_messages for the structured log entries
+        checker_result = {
+            "result": checker.result,
+            "messages": checker.messages,                   # Corrected to 'messages' (plural)
+            "current_summary_message": checker.current_summary_message, # New attribute for the single summary message
+            "log_messages": checker.log_messages,           # New attribute for structured logs
+            "question": checker.question,
+            "question_context": checker.question_context,
+            "answer": checker.answer
+        }
+        if checker.get_id() in digests:
+            checker_result["inputs_digest"] = digests[checker.get_id()]
+        # Skipped manual steps are not recorded: they are asked when resuming interactively
+        if checkpoint_log is not None and checker.get_id() not in recorded and not (options.quiet and not checker.auto):
+            checkpoint_log.append(checker.get_id(), checker_result)
+        # Carried forward results are already in the cache (memoized ones are new for this device)
+        if checker.get_id() not in carried or checker.get_id() in memoized:
+            cached_results[checker.get_id()] = checker_result
+        if memo is not None and checker.get_id() in digests and checker.get_id() not in carried \
+                and checker.result != "ERROR":
+            memo.memo_save(checker.get_id(), digests[checker.get_id()], checker_result)
+
+    if check_pool is not None:
+        check_pool.close()
+
+    return performed_checks
+
+
+def print_summary(performed_checks):
+    print('[+] Finished')
+    print('------------------------------------------------')
+    print('[+] Here is a summary:')
+
+    for performed_check in performed_checks:
+        print(f'[{performed_check.get_id()}]\t[{performed_check.result}]\t{performed_check.title}')
+
+
+def export_pdf(performed_checks, outputfile, report_name, report_date):
+    """
+    Writes the PDF report and returns its path.
+    """
+    # PDF stage: imported on first use
+    from fpdf import FPDF
+
+    print('------------------------------------------------')
+    # Ensure the output file has a .pdf extension
+    if not outputfile.lower().endswith('.pdf'):
+        outputfile = f"{outputfile}.pdf"
+
+    print(f'[+] Exporting results to {outputfile}')
+
+    pdf = FPDF(orientation='L') # Changed to landscape orientation
+    pdf.add_page()
+    pdf.set_font("Arial", size=10)
+
+    # --- MODIFICACIÓN DEL TÍTULO DEL PDF ---
+    # Construye el título del reporte
+    report_title = f"Fortigate Security Audit Report for {report_name}"
+    if report_date:
+        report_title += f" ({report_date})"
+
+    # Add the dynamic title to the PDF
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, txt=report_title, ln=True, align='C')
+    pdf.ln(10) # Add some space
+    # --- FIN MODIFICACIÓN DEL TÍTULO DEL PDF ---
+
+    # Set font for table headers
+    pdf.set_font("Arial", 'B', 10)
+    # Define column widths (adjust as needed for your data and page size)
+    col_widths = [20, 15, 74, 10, 156] # Adjusted for wider landscape page. Total around 275mm
+    headers = ["ID", "Result", "Check Title", "LVL", "Log Details"] # Changed header to 'Log Details'
+
+    # Add headers to PDF table
+    for header, width in zip(headers, col_widths):
+        pdf.cell(width, 10, header, border=1, align='C') # Centered headers
+    pdf.ln() # Move to next line after headers
+
+    # Set font for table content
+    pdf.set_font("Arial", size=8)
+    for performed_check in performed_checks:
+        # Get the full log, which now includes the summary message and detailed logs
+        full_log_content = performed_check.get_log().replace('"', '\'').replace('\n', ' ')
+        levels = ", ".join(str(x) for x in performed_check.levels)
+
+        # Calculate height for multi_cell content
+        # Estimate needed height for the multi_cell by breaking the text and summing line heights
+        # This is an approximation; fpdf doesn't have a direct method to get future multi_cell height easily.
+        # A more robust solution might involve creating a dummy PDF and calculating, but for simplicity:
+        text_width = col_widths[4] - pdf.c_margin * 2 # Usable width for text
+        lines = pdf.get_string_width(full_log_content) / text_width
+        line_height = pdf.font_size * 1.2 # Standard line height based on font size
+
+        # Ensure minimum height for row if log is empty or very short
+        cell_height = max(10, lines * line_height)
+
+        # Store current Y position
+        current_y = pdf.get_y()
+
+        # Check if new page is needed for the multi_cell
+        if current_y + cell_height > pdf.page_break_trigger:
+            pdf.add_page()
+            # If a new page is added, re-add headers for the new page for continuity
+            pdf.set_font("Arial", 'B', 10)
+            for header, width in zip(headers, col_widths):
+                pdf.cell(width, 10, header, border=1, align='C')
+            pdf.ln()
+            pdf.set_font("Arial", size=8) # Reset font for content
+            current_y = pdf.get_y() # Update current Y
+
+        # Print cells for fixed-height columns
+        pdf.cell(col_widths[0], cell_height, performed_check.get_id(), border=1, ln=0)
+        pdf.cell(col_widths[1], cell_height, performed_check.result, border=1, ln=0)
+        pdf.cell(col_widths[2], cell_height, performed_check.title, border=1, ln=0)
+        pdf.cell(col_widths[3], cell_height, levels, border=1, ln=0)
+
+        # Save X,Y for multi_cell
+        x_log = pdf.get_x()
+        y_log = pdf.get_y()
+
+        # Print multi_cell content
+        pdf.multi_cell(col_widths[4], line_height, full_log_content, border=1, align='L')
+
+        # After multi_cell, restore Y position to the max height of the row for the next row
+        pdf.set_xy(x_log + col_widths[4], current_y + cell_height) # Move to the end of the current line, adjusted for cell height
+        pdf.ln() # Move to the next line for the next check
+
+    pdf.output(outputfile) # Save the PDF
+    print('[+] PDF report generated successfully.')
+    return outputfile
+
+
+def export_report(result, performed_checks, outputfile, report_name, report_date):
+    """
+    Writes the PDF report and, next to it, the results file used to compare audits (see sidecar.py).
+    """
+    result.output = export_pdf(performed_checks, outputfile, report_name, report_date)
+    results_path = sidecar.write(sidecar.sidecar_path(result.output), result, report_date)
+    print(f'[+] Results written to {results_path}')
+
+
+def open_cache(options):
+    """
+    Opens the results cache (None when disabled): imports the old JSON cache file once and
+    removes the devices beyond the retention limits.
+    """
+    if options.cache_file is None:
+        if options.resume:
+            raise AuditError('Cannot resume this benchmark because the results cache is disabled')
+        return None
+    legacy = options.cache_file == cache_file_path and os.path.exists(legacy_cache_file_path)
+    if not os.path.exists(options.cache_file) and not legacy:
+        if options.resume:
+            raise AuditError('Cannot resume this benchmark because there is no cache file')
+        print(f'[!] Creating local cache file in {options.cache_file}')
+
+    cache = resultcache.ResultCache(options.cache_file)
+    if legacy:
+        migrated = cache.migrate_json(legacy_cache_file_path)
+        if migrated:
+            print(f'[+] Results of {migrated} configurations imported from {legacy_cache_file_path}')
+    cache.evict(options.cache_max_age, options.cache_max_devices)
+    return cache
+
+
+def code_signature():
+    """
+    Size and modification time of the modules of the auditor and of the checks: changes when
+    the tool is updated.
+    """
+    global _code_signature
+    if _code_signature is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        signature = checks._signature()
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.py'):
+                stat = os.stat(os.path.join(directory, name))
+                signature.append([name, stat.st_size, stat.st_mtime_ns])
+        _code_signature = signature
+    return _code_signature
+
+
+def audit_fingerprint(filepath, wan, options):
+    """
+    Fingerprint of the audit of filepath: canonical content of the configuration (see fingerprint.py)
+    and everything else the results depend on (options, code, Fortiguard database). None when the
+    audit is not reused: interactive (manual answers), --full, --resume or JSON input.
+    """
+    if not options.quiet or options.full or options.resume or options.json:
+        return None
+    settings = [RESULTS_VERSION, sorted(options.levels), sorted(options.ids or []),
+                sorted(benchmark.lower() for benchmark in options.benchmarks or []), sorted(wan or []),
+                options.verbose, options.autofix, code_signature(), fortiguard._source_signature()]
+    digest = hashlib.blake2b(fingerprint.config_fingerprint(filepath).encode(), digest_size=20)
+    digest.update(json.dumps(settings).encode())
+    return digest.hexdigest()
+
+
+def restore_snapshot(cache, device, audit_digest, result):
+    """
+    Fills result with the checks of the last audit of device when the fingerprint of its
+    configuration and options did not change. Returns the snapshot restored, or None.
+    """
+    if cache is None or audit_digest is None:
+        return None
+    snapshot = cache.snapshot(device, audit_digest)
+    if snapshot is None:
+        return None
+    print(f'[+] Configuration unchanged since the audit of {snapshot["config"]} ({snapshot["audited"]}): results reused')
+    performed_checks = [RestoredCheck(check) for check in snapshot["checks"]]
+    print_summary(performed_checks)
+    _fill_result(result, performed_checks, {})
+    return snapshot
+
+
+def copy_report(result, snapshot, outputfile, report_name, report_date):
+    """
+    Copies the PDF report of the restored audit (see restore_snapshot) to outputfile when it has
+    the same title. Returns False when the report must be exported again.
+    """
+    previous = snapshot.get("output")
+    if previous is None or (snapshot["report_name"], snapshot["report_date"]) != (report_name, report_date) \
+            or not os.path.isfile(previous):
+        return False
+    if not outputfile.lower().endswith('.pdf'):
+        outputfile = f"{outputfile}.pdf"
+    print('------------------------------------------------')
+    if os.path.abspath(previous) != os.path.abspath(outputfile):
+        shutil.copyfile(previous, outputfile)
+        print(f'[+] Report unchanged, copied from {previous} to {outputfile}')
+    else:
+        print(f'[+] Report unchanged: {outputfile}')
+    result.output = outputfile
+    results_path = sidecar.write(sidecar.sidecar_path(outputfile), result, report_date)
+    print(f'[+] Results written to {results_path}')
+    return True
+
+
+def save_snapshot(cache, device, audit_digest, result, snapshot, report_name, report_date):
+    # Reused by the next audit of device if its configuration is unchanged (restore_snapshot),
+    # with its PDF report if the title is the same (copy_report)
+    if cache is None or audit_digest is None or any(check["result"] == "ERROR" for check in result.checks):
+        return
+    if snapshot is None:
+        snapshot = {"config": result.config, "audited": datetime.now().isoformat(timespec='seconds'), "checks": result.checks}
+    snapshot.update(output=result.output, report_name=report_name, report_date=report_date)
+    cache.save_snapshot(device, audit_digest, snapshot)
+
+
+def device_results(cache, filepath, options):
+    """
+    Cached results of the configuration filepath: {check id: result}, saved as they are set.
+    """
+    if cache is None or not cache.has_device(filepath):
+        # There is no cache for this fortigate configuration file
+        if options.resume:
+            raise AuditError(f'Cannot resume this benchmark because there is no cache results for config {filepath}')
+        if cache is None:
+            return {}
+    return cache.device_results(filepath)
+
+
+def report_changed_chapters(cache, filepath, device_firewall):
+    """
+    Prints the chapters of the configuration changed since the last complete audit of filepath.
+    """
+    if cache is None:
+        return
+    previous = cache.chapter_digests(filepath)
+    if not previous:
+        return
+    current = device_firewall.get_chapter_digests()
+    changed = sorted(chapter for chapter in previous.keys() | current.keys() if previous.get(chapter) != current.get(chapter))
+    if not changed:
+        print(f'[+] No chapter changed since the last audit')
+    else:
+        print(f'[+] {len(changed)} chapters changed since the last audit: {", ".join(changed)}')
+
+
+def save_chapter_digests(cache, filepath, device_firewall):
+    # Compared by the next audit (report_changed_chapters)
+    if cache is not None:
+        cache.save_chapter_digests(filepath, device_firewall.get_chapter_digests())
+
+
+def open_checkpoint(filepath, options):
+    """
+    Opens the checkpoint log of the audit of filepath (next to the results cache), None when
+    the results cache is disabled. With --resume, the checks of an interrupted audit are reloaded.
+    """
+    if options.cache_file is None:
+        return None
+    directory = os.path.join(os.path.dirname(os.path.abspath(options.cache_file)), 'checkpoints')
+    checkpoint_log = checkpoint.CheckpointLog(directory, filepath, resume=options.resume)
+    if checkpoint_log.stale:
+        print(f'[!] The configuration file changed since the interrupted audit: all checks are performed again')
+    elif checkpoint_log.recorded:
+        print(f'[+] Resuming the interrupted audit: {len(checkpoint_log.recorded)} checks already performed')
+    return checkpoint_log
+
+
+def close_checkpoint(checkpoint_log, completed):
+    if checkpoint_log is None:
+        return
+    checkpoint_log.close(completed)
+    recorded = len(checkpoint_log.recorded) + checkpoint_log.appended
+    if not completed and recorded:
+        print(f'[!] Audit interrupted: {recorded} checks recorded, run again with --resume to continue')
+
+
+def _fill_result(result, performed_checks, cached_results):
+    result.performed_checks = performed_checks
+    result.cached_results = cached_results
+    result.checks = [{
+        "id": check.get_id(),
+        "title": check.title,
+        "result": check.result,
+        "levels": check.levels,
+        "auto": check.auto,
+        "log": check.get_log(),
+        "findings": check.get_findings(),
+    } for check in performed_checks]
+
+
+def audit(config, options=None, name=None):
+    """
+    Audits one device and returns an AuditResult.
+    config: path of the configuration file, or configuration already parsed (list of "configs").
+    Raises AuditError, or the error of the failing stage (parsing...).
+    """
+    if options is None:
+        options = AuditOptions()
+    filepath = None
+    if isinstance(config, str):
+        try:
+            filepath = rename_txt_config(config)
+        except OSError as e:
+            raise AuditError(f'Error renaming file: {e}') from e
+    result = AuditResult(name or (Path(filepath).stem if filepath else options.report_name), filepath)
+
+    # Results cache, keyed by the configuration file path: each result is saved when set
+    cache = open_cache(options) if filepath is not None else None
+    # Last audit of the device (name, or configuration file path as the results cache: the
+    # report name is only a title, "Fortigate" by default): reused as is if the configuration
+    # did not change
+    device = name or (os.path.abspath(filepath) if filepath is not None else None)
+    audit_digest = audit_fingerprint(filepath, options.wan, options) if cache is not None else None
+    checkpoint_log = None
+    completed = False
+    try:
+        snapshot = restore_snapshot(cache, device, audit_digest, result)
+        if snapshot is None:
+            cached_results = device_results(cache, filepath, options)
+            device_firewall, device_display = load_firewall(filepath or config, options, interactive=not options.quiet)
+            report_changed_chapters(cache, filepath, device_firewall)
+            # Each performed check is recorded at once: an interrupted audit is resumed with --resume
+            if filepath is not None:
+                checkpoint_log = open_checkpoint(filepath, options)
+            performed_checks = run_checks(device_firewall, device_display, cached_results, options, checkpoint_log, cache)
+            save_chapter_digests(cache, filepath, device_firewall)
+            completed = True
+            print_summary(performed_checks)
+            _fill_result(result, performed_checks, cached_results)
+
+        # Export to PDF
+        if options.output is not None and (snapshot is None or not copy_report(
+                result, snapshot, options.output, options.report_name, options.report_date)):
+            export_report(result, result.performed_checks, options.output, options.report_name, options.report_date)
+        save_snapshot(cache, device, audit_digest, result, snapshot, options.report_name, options.report_date)
+    finally:
+        close_checkpoint(checkpoint_log, completed)
+        if cache is not None:
+            cache.close()
+    return result
+
+
+def read_manifest(options, configs=()):
+    """
+    Returns the devices to audit in batch mode: the options.manifest entries, then the config paths.
+    """
+    devices = []
+    if options.manifest is not None:
+        with open(options.manifest) as manifest_file:
+            for entry in json.load(manifest_file):
+                if isinstance(entry, str):
+                    entry = {"config": entry}
+                devices.append(entry)
+    for filepath in configs:
+        devices.append({"config": filepath})
+
+    for device in devices:
+        device.setdefault("name", Path(device["config"]).stem)
+        device.setdefault("date", options.report_date)
+        if device.get("wan") is None:
+            device["wan"] = options.wan if options.wan is not None else []
+        elif isinstance(device["wan"], str):
+            device["wan"] = device["wan"].split()
+        if device.get("output") is None and options.output_dir is not None:
+            suffix = f'_{device["date"]}' if device["date"] else ''
+            device["output"] = os.path.join(options.output_dir, f'{device["name"]}{suffix}.pdf')
+    return devices
+
+
+def audit_device(device, options):
+    """
+    Batch mode: audits one device of the manifest. Failures are reported in the result,
+    they do not stop the other audits.
+    """
+    result = AuditResult(device["name"], device["config"])
+    cache = None
+    checkpoint_log = None
+    completed = False
+    try:
+        filepath = rename_txt_config(device["config"])
+        result.config = filepath
+        # Connection of this worker (SQLite connections are not shared across processes)
+        if options.cache_file is not None:
+            cache = resultcache.ResultCache(options.cache_file)
+        audit_digest = audit_fingerprint(filepath, device["wan"], options) if cache is not None else None
+        snapshot = restore_snapshot(cache, device["name"], audit_digest, result)
+        if snapshot is None:
+            cached_results = device_results(cache, filepath, options)
+            config = load_configuration(filepath, options, interactive=False)
+
+            device_display = display.Display(verbose=options.verbose, quiet=options.quiet)
+            device_firewall = firewall.Firewall(config, device_display)
+            print(f'[+] Configuring WAN interfaces: {", ".join(device["wan"])}')
+            device_firewall.set_wan_interfaces(device["wan"])
+            device_firewall.set_policy_workers(options.policy_workers)
+
+            report_changed_chapters(cache, filepath, device_firewall)
+            # options.jobs is the number of devices audited in parallel
+            checkpoint_log = open_checkpoint(filepath, options)
+            performed_checks = run_checks(device_firewall, device_display, cached_results, options.replace(jobs=1), checkpoint_log, cache)
+            save_chapter_digests(cache, filepath, device_firewall)
+            completed = True
+            print_summary(performed_checks)
+            _fill_result(result, performed_checks, cached_results)
+
+        if device.get("output") and (snapshot is None or not copy_report(
+                result, snapshot, device["output"], device["name"], device["date"])):
+            export_report(result, result.performed_checks, device["output"], device["name"], device["date"])
+        save_snapshot(cache, device["name"], audit_digest, result, snapshot, device["name"], device["date"])
+    except Exception as e:
+        traceback.print_exc()
+        result.error = f'{type(e).__name__}: {e}'
+    finally:
+        close_checkpoint(checkpoint_log, completed)
+        if cache is not None:
+            cache.close()
+    return result
+
+
+def audit_fleet(devices, options):
+    """
+    Batch mode: audits every device (see read_manifest) in this process, sharing the imported checks
+    and the Fortiguard database. With options.jobs the devices are spread across worker processes.
+    Returns the AuditResult of each device.
+    """
+    if options.output_dir is not None:
+        os.makedirs(options.output_dir, exist_ok=True)
+    if not options.quiet:
+        # Workers cannot ask questions: manual checks are skipped
+        print(f'[!] Batch mode is not interactive: manual steps are ignored (as with --quiet)')
+    options = options.replace(quiet=True)
+
+    # Migration and eviction done once here, the audits open their own connection
+    cache = open_cache(options)
+    if cache is not None:
+        cache.close()
+    # Loaded once here, inherited by the forked workers
+    fortiguard.load_database()
+
+    print(f'[+] Auditing {len(devices)} devices')
+    print(f'[+] Starting checks for levels: {",".join(options.levels)}')
+    tasks = [lambda device=device: audit_device(device, options) for device in devices]
+
+    results = []
+    if options.jobs > 1 and len(devices) > 1:
+        import parallel
+        pool = parallel.CapturePool(tasks, options.jobs, threads=options.job_threads)
+        for index, device in enumerate(devices):
+            print(f'================ {device["name"]} ================')
+            try:
+                results.append(pool.result(index))
+            except Exception as e:
+                # The worker died (memory, signal...): audit this device again here
+                print(f'[!] Worker failed for {device["name"]} ({e}), auditing it again')
+                results.append(tasks[index]())
+        pool.close()
+    else:
+        for device, task in zip(devices, tasks):
+            print(f'================ {device["name"]} ================')
+            results.append(task())
+
+    print('================================================')
+    print('[+] Fleet summary:')
+    failed = 0
+    for result in results:
+        if result.error is not None:
+            failed += 1
+            print(f'[!] {result.name}: audit failed ({result.error})')
+            continue
+        counts = result.counts()
+        print(f'[+] {result.name}: {len(result.checks)} checks, {counts.get("PASS", 0)} PASS, {counts.get("FAIL", 0)} FAIL')
+
+    if failed:
+        print(f'[!] {failed} of {len(results)} audits failed')
+    return results
+
+
+def check_startup(budget=STARTUP_BUDGET):
+    """
+    Measures "import auditor" in a new interpreter (python -X importtime) and returns the
+    list of problems: deferred modules imported at startup, or cumulative time over budget (ms).
+    """
+    import subprocess
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import auditor'],
+                             cwd=directory, capture_output=True, text=True)
+    if process.returncode != 0:
+        return [f'import auditor failed: {process.stderr.strip()}']
+
+    problems = []
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        self_time, cumulative, module = line[len('import time:'):].split('|')
+        module = module.strip()
+        if module in DEFERRED_MODULES:
+            problems.append(f'{module} is imported at startup')
+        if module == 'auditor' and int(cumulative) / 1000 > budget:
+            problems.append(f'import auditor takes {int(cumulative) / 1000:.1f} ms (budget: {budget} ms)')
+    return problems
+
+
+if __name__ == '__main__':
+    # Startup budget check: python3 auditor.py
+    problems = check_startup()
+    for problem in problems:
+        print(f'[!] {problem}')
+    if problems:
+        exit(1)
+    print(f'[+] Startup within budget ({STARTUP_BUDGET} ms), heavy modules deferred')
@@ -1,4 +1,9 @@
+import hashlib
 import re
+import sys
+
+# Huella del archivo fuente de cada clase de verificación (ver get_inputs_digest)
+_source_digests = {}
 
 class Checker:
 
@@ -18,10 +23,21 @@ class Checker:
         self.question_context = None
         self.question = None
         self.answer = None
+        # Entradas declaradas: el runner construye antes solo los índices necesarios (ver --plan)
+        self.inputs = None              # Capítulos leídos ("system global"...); None: no declarados
+        self.indexes = []               # Índices derivados usados (ver Firewall.INDEXES)
+        self.requires_inputs = False    # True: no aplica (SKIP sin ejecutarse) si no existe ninguno de sus capítulos
 
     def __lt__(self, other):
         return self.id < other.id
 
+    def get_sort_key(self):
+        """
+        Clave de orden estable: autor del benchmark y orden natural del id ("1.2" antes de "1.10").
+        """
+        parts = re.split(r'(\d+)', str(self.id))
+        return (str(self.benchmark_author), [int(part) if part.isdigit() else part for part in parts])
+
     def is_valid(self):
         if self.id is None:
             print(f'[!] Error en {self.__class__.__name__}: ID de verificación no definido')
@@ -76,6 +92,41 @@ class Checker:
             for msg_line in self.messages:
                 self.display.show(msg_line)
 
+    def get_missing_inputs(self):
+        """
+        Retorna los capítulos declarados que no existen en la configuración.
+        """
+        return [chapter for chapter in self.inputs or [] if self.firewall.get_config(chapter) is None]
+
+    def is_applicable(self):
+        """
+        False si la verificación requiere sus entradas (requires_inputs) y no existe ninguna.
+        """
+        if not self.requires_inputs or not self.inputs:
+            return True
+        return len(self.get_missing_inputs()) < len(self.inputs)
+
+    def get_inputs_digest(self):
+        """
+        Huella del código de la verificación y de todo lo que lee (ver Firewall.get_inputs_digest).
+        Si no cambió desde la ejecución anterior, su resultado tampoco. None si las entradas no
+        están declaradas.
+        """
+        if self.inputs is None:
+            return None
+        check_class = type(self)
+        if check_class not in _source_digests:
+            with open(sys.modules[check_class.__module__].__file__, 'rb') as source:
+                _source_digests[check_class] = hashlib.blake2b(source.read(), digest_size=16).hexdigest()
+        return f'{_source_digests[check_class]}:{self.firewall.get_inputs_digest(self.inputs, self.indexes)}'
+
+    def skip_not_applicable(self):
+        missing = ", ".join(f'"config {chapter}"' for chapter in self.inputs)
+        print(f'[{self.get_id()}] {self.title} : SKIP')
+        self.result = 'SKIP'
+        self.add_message(f"No aplica: sin bloque {missing}.", log_level="SKIP")
+        self.set_message("No aplica a esta configuración.")
+
     def skip(self):
         print(f'[{self.get_id()}] {self.title} : SKIP')
         self.result = 'SKIP'
@@ -176,6 +227,19 @@ class Checker:
         # Decide si también quieres que este mensaje resumen se añada a la lista de logs detallados:
         # self.add_message(message, log_level="INFO") # Podrías añadirlo como INFO o PASS/FAIL según el contexto
 
+    def get_findings(self):
+        """
+        Retorna los hallazgos de la verificación (líneas de los mensajes FAIL, WARN o ERROR,
+        y el mensaje resumen si no pasó), sin duplicados. Se usan para comparar dos auditorías.
+        """
+        findings = []
+        if self.result in ("FAIL", "ERROR") and self.current_summary_message:
+            findings.append(str(self.current_summary_message).strip())
+        for entry in self.log_messages or []:
+            if entry.get("level") in ("FAIL", "WARN", "ERROR"):
+                findings.extend(line.strip() for line in str(entry["message"]).split("\n"))
+        return list(dict.fromkeys(finding for finding in findings if finding))
+
     # --- Ayudantes internos ---
     def get_id(self):
         return f'{self.benchmark_author}-{self.id}'
@@ -220,15 +284,11 @@ class Checker:
 
         return "\n".join(formatted_logs)
 
-    def get_config(self, chapter=None):
-        # Esta es una función de EJEMPLO. ¡Reemplázala con tu lógica real!
-        if chapter == "system global":
-            return {
-                "hostname": "FortiGate-FW01",
-                "admin-lockout-threshold": "3",
-                "admin-lockout-duration": "60"
-            }
-        return None
+    def get_config(self, chapter=None, vdom=None):
+        """
+        Retorna el bloque de configuración del capítulo (ver Firewall.get_config).
+        """
+        return self.firewall.get_config(chapter, vdom)
 
     def is_ip(self, param):
         return re.match(r"^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$",param) is not None
@@ -236,5 +296,13 @@ class Checker:
     def is_fqdn(self, param):
         return re.match(r"^(?!:\/\/)(?=.{1,255}$)((.{1,63}\.){1,127}(?![0-9]*$)[a-z0-9-]+\.?)$",param) is not None
 
+    def get_policy_label(self, policy):
+        """
+        Retorna el identificador de una política para los mensajes: id y nombre si tiene.
+        """
+        if "name" in policy.keys():
+            return f'{policy["edit"]} \"{policy["name"]}\"'
+        return f'{policy["edit"]}'
+
     def get_wan_interfaces(self):
         return self.firewall.get_wan_interfaces()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+
+# Crash-safe log of the checks performed by the current audit of a configuration.
+#
+# Each result (result, messages, question and answer) is appended as one JSON line
+# and synced to disk as soon as the check is performed, so a crash, Ctrl-C or an
+# unexpected exception loses nothing already done. The log is removed when the audit
+# completes. With --resume, the checks recorded by an interrupted audit of the same
+# configuration file are restored instead of being run (or asked) again.
+#
+# The first line identifies the configuration file (path, size and modification
+# time): the log of another version of the file is discarded. A last line truncated
+# by the crash is ignored.
+
+LOG_VERSION = 1
+
+
+def _identity(filepath):
+    stat = os.stat(filepath)
+    return {"version": LOG_VERSION, "config": os.path.abspath(filepath),
+            "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class CheckpointLog:
+
+    def __init__(self, directory, filepath, resume=False):
+        """
+        Opens the log of the audit of filepath. With resume, the checks recorded by an
+        interrupted audit are loaded in self.recorded ({check id: result}) and kept.
+        """
+        os.makedirs(directory, exist_ok=True)
+        name = hashlib.sha256(os.path.abspath(filepath).encode()).hexdigest()
+        self.path = os.path.join(directory, f'{name}.log')
+        self.identity = _identity(filepath)
+        self.recorded = {}
+        self.stale = False      # The log of an interrupted audit of another version of the file was discarded
+        self.appended = 0
+
+        if resume:
+            self.recorded = self._read()
+
+        # Written again (without the truncated line) before appending, replaced atomically
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        self.file = open(tmp_path, 'w', encoding='utf-8')
+        self.file.write(json.dumps(self.identity) + '\n')
+        for check_id, result in self.recorded.items():
+            self.file.write(json.dumps({"id": check_id, "result": result}) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as log:
+                lines = log.read().split('\n')
+        except FileNotFoundError:
+            return {}
+
+        recorded = {}
+        for number, line in enumerate(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Truncated by the crash
+                continue
+            if number == 0:
+                if entry != self.identity:
+                    self.stale = True
+                    return {}
+                continue
+            recorded[entry["id"]] = entry["result"]
+        return recorded
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+        # Data only: the file metadata (mtime) is not needed to read the log back
+        getattr(os, 'fdatasync', os.fsync)(self.file.fileno())
+
+    def append(self, check_id, result):
+        """
+        Records the result of a performed check, durably.
+        """
+        self._write({"id": check_id, "result": result})
+        self.appended += 1
+
+    def close(self, completed):
+        """
+        Closes the log, removed when the audit completed.
+        """
+        self.file.close()
+        if completed:
+            os.remove(self.path)
@@ -1,19 +1,154 @@
+import importlib
+import json
 import os
-import sys
-import inspect
+import rules
 from checker import Checker
 
-# Imports all python files as checks
+# Check discovery through a generated manifest (checks/manifest.json).
+#
+# The manifest lists the module, class and metadata (id, full id as given to --ids,
+# benchmark, levels, auto, enabled) of every check, so only the selected checks are
+# imported. It records the size and modification time of the check files and is
+# generated again (importing every check once) when a file is added, removed or
+# modified, or with "python3 -m checks".
+#
+# The rule files of a benchmark folder (JSON or YAML, see rules.py) are listed the same
+# way, one entry per rule: a selected rule is compiled from its file, nothing is imported.
 
-checks = []
+MANIFEST_VERSION = 3
 
-parent_folder = os.path.dirname(__file__)
-for folder_name in os.listdir(parent_folder):
-    item = f'{parent_folder}/{folder_name}'
-    if os.path.isdir(item) and folder_name[:2] != '__':
-        __import__(f'checks.{folder_name}', locals(), globals())
+parent_folder = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.path.join(parent_folder, 'manifest.json')
 
-# Return all checker classes order by name
-def classes():
-    classes = Checker.__subclasses__()
-    return classes
\ No newline at end of file
+# Manifest of this process (see manifest)
+_manifest = None
+
+
+def _check_files():
+    # (benchmark package, module or rule file) of every check, in a stable order
+    files = []
+    for folder_name in sorted(os.listdir(parent_folder)):
+        folder = os.path.join(parent_folder, folder_name)
+        if not os.path.isdir(folder) or folder_name[:2] == '__':
+            continue
+        for module in sorted(os.listdir(folder)):
+            if module == '__init__.py' or (module[-3:] != '.py' and not rules.is_rule_file(module)):
+                continue
+            files.append((folder_name, module))
+    return files
+
+
+def _signature():
+    signature = [MANIFEST_VERSION]
+    for folder_name, module in _check_files():
+        stat = os.stat(os.path.join(parent_folder, folder_name, module))
+        signature.append([f'{folder_name}/{module}', stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def generate_manifest():
+    """
+    Imports every check and returns the manifest: {"signature", "checks": [entries]}.
+    """
+    entries = []
+    for folder_name, module in _check_files():
+        if rules.is_rule_file(module):
+            rule_file = f'{folder_name}/{module}'
+            for check_class in rules.rule_classes(os.path.join(parent_folder, rule_file)).values():
+                checker = check_class(None, None)
+                entries.append({
+                    "rules": rule_file,
+                    "benchmark": folder_name,
+                    "id": checker.id,
+                    "check_id": checker.get_id(),
+                    "benchmark_author": checker.benchmark_author,
+                    "levels": checker.levels,
+                    "auto": checker.auto,
+                    "enabled": checker.enabled,
+                })
+            continue
+        module_name = f'checks.{folder_name}.{module[:-3]}'
+        imported = importlib.import_module(module_name)
+        for class_name, check_class in sorted(vars(imported).items()):
+            # Checks defined in this module (not the imported ones)
+            if not isinstance(check_class, type) or Checker not in check_class.__bases__ \
+                    or check_class.__module__ != module_name:
+                continue
+            checker = check_class(None, None)
+            entries.append({
+                "module": module_name,
+                "class": class_name,
+                "benchmark": folder_name,
+                "id": checker.id,
+                "check_id": checker.get_id(),
+                "benchmark_author": checker.benchmark_author,
+                "levels": checker.levels,
+                "auto": checker.auto,
+                "enabled": checker.enabled,
+            })
+    return {"signature": _signature(), "checks": entries}
+
+
+def manifest(rebuild=False):
+    """
+    Returns the manifest, generated again when outdated (or when rebuild is True).
+    """
+    global _manifest
+    if _manifest is not None and not rebuild:
+        return _manifest
+
+    loaded = None
+    if not rebuild:
+        try:
+            with open(MANIFEST_PATH) as manifest_file:
+                loaded = json.load(manifest_file)
+        except (OSError, ValueError):
+            loaded = None
+        if loaded is not None and loaded.get("signature") != _signature():
+            loaded = None
+
+    if loaded is None:
+        loaded = generate_manifest()
+        try:
+            tmp_path = f'{MANIFEST_PATH}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as manifest_file:
+                json.dump(loaded, manifest_file, indent=1)
+            os.replace(tmp_path, MANIFEST_PATH)
+        except OSError as e:
+            print(f'[!] Cannot save the check manifest: {e}')
+
+    _manifest = loaded
+    return loaded
+
+
+def _is_selected(entry, ids, levels, benchmarks):
+    if not entry["enabled"]:
+        return False
+    # Same id as --ids and auditor.is_selected: "CIS-1.1" (Checker.get_id)
+    if ids is not None and entry["check_id"] not in ids:
+        return False
+    if benchmarks is not None and entry["benchmark"] not in benchmarks \
+            and str(entry["benchmark_author"]).lower() not in benchmarks:
+        return False
+    if levels is not None and entry["levels"]:
+        return any(int(level) in entry["levels"] for level in levels)
+    return True
+
+
+def classes(ids=None, levels=None, benchmarks=None):
+    """
+    Returns the checker classes selected by ids, levels and benchmarks (package name, or
+    author in lower case), None meaning all. Only their modules are imported.
+    Checks with invalid metadata are always returned, so Checker.is_valid reports them.
+    """
+    selected = []
+    for entry in manifest()["checks"]:
+        valid = entry["id"] is not None and entry["levels"] and entry["benchmark_author"]
+        if valid and not _is_selected(entry, ids, levels, benchmarks):
+            continue
+        if "rules" in entry:
+            # Compiled from the rule file (once per process)
+            selected.append(rules.rule_classes(os.path.join(parent_folder, entry["rules"]))[entry["id"]])
+        else:
+            selected.append(getattr(importlib.import_module(entry["module"]), entry["class"]))
+    return selected
@@ -0,0 +1,5 @@
+import checks
+
+# Generates the check manifest again: python3 -m checks
+manifest = checks.manifest(rebuild=True)
+print(f'[+] {len(manifest["checks"])} checks written to {checks.MANIFEST_PATH}')
@@ -1,17 +1,8 @@
 import os
-import sys
-import inspect
-from checker import Checker
+import checks
 
-# Imports all python files as checks
+# Checks are imported on demand, from the manifest (see checks/__init__.py)
 
-parent_folder = os.path.dirname(__file__)
-for module in os.listdir(parent_folder):
-    if module == '__init__.py' or module[-3:] != '.py':
-        continue
-    __import__(f'checks.{os.path.basename(parent_folder)}.{module[:-3]}', locals(), globals())
-
-# Return all checker classes
+# Return the checker classes of this benchmark
 def classes():
-    classes = Checker.__subclasses__()
-    return classes
\ No newline at end of file
+    return checks.classes(benchmarks=[os.path.basename(os.path.dirname(__file__))])
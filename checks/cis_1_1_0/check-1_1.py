@@ -22,6 +22,7 @@ class Check_CIS_1_1(Checker):
         self.auto = True  # Indica que el chequeo es automatizable
         self.benchmark_version = "v1.1.0"  # Versión del benchmark
         self.benchmark_author = "CIS"  # Autor del benchmark
+        self.inputs = ["system dns"]
 
     def do_check(self):
         """
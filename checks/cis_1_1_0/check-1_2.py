@@ -12,6 +12,7 @@ class Check_CIS_1_2(Checker):
         self.auto = False
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["system zone"]
 
     def do_check(self):
         config = self.get_config("system zone")
@@ -12,6 +12,8 @@ class Check_CIS_1_3(Checker):
         self.auto = False
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = []
+        self.indexes = ["wan_interfaces"]
 
     def do_check(self):
         wan_interfaces = self.firewall.get_wan_interfaces()
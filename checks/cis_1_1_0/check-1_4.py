@@ -1,6 +1,8 @@
 # checks/cis_1_1_0/check-1_4.py
 
 from checker import Checker # Assuming 'checker.py' is in the root directory
+import policyindex
+import portset
 import re # Needed for more robust port searching (though the current approach relies on direct matches)
 
 class ExposedVIPServicesCheck(Checker):
@@ -16,6 +18,8 @@ class ExposedVIPServicesCheck(Checker):
         
         self.benchmark_version = "1.0" 
         self.benchmark_author = "_"
+        self.inputs = ["firewall policy"]
+        self.indexes = ["wan_interfaces", "policies", "vip_catalog", "services"]
 
         # Define the list of sensitive ports and their common descriptions
         self.sensitive_ports = {
@@ -31,9 +35,8 @@ class ExposedVIPServicesCheck(Checker):
         # Initialize flag to track if any exposed VIPs are found
         exposed_vips_found = False
         
-        # Retrieve VIPs, policies, and WAN interface names from the Firewall object
-        vips_list = self.firewall.get_vips() 
-        policies = self.firewall.get_policies(actions=['accept']) 
+        # Retrieve the VIP catalog and WAN interface names from the Firewall object
+        vip_catalog = self.firewall.get_vip_catalog()
         wan_interface_names = self.firewall.get_wan_interfaces() 
 
         # If no WAN interfaces are defined, we cannot check for internet exposure
@@ -41,81 +44,84 @@ class ExposedVIPServicesCheck(Checker):
             self.add_message("ADVERTENCIA: No se han definido interfaces WAN o no se pudieron determinar. No se puede verificar la exposición de VIPs a internet.", log_level="WARN")
             return True # Consider it a "PASS" for this check if no WANs are present to expose from
 
+        # Accepted policies with any source interface being a WAN interface (index lookup)
+        policies = self.firewall.get_policies(srcintfs=wan_interface_names, actions=['accept'])
+
         # Dictionary to store unique exposures, preventing duplicate reports for the same policy/VIP
         reported_exposures = {}
 
-        # Iterate through each firewall policy
+        # Service name -> sensitive ports it exposes
+        exposed_ports_by_service = {}
+        sensitive_port_set = portset.PortSet({
+            protocol: [(port, port) for port in self.sensitive_ports] for protocol in portset.PROTOCOLS
+        })
+
+        # Iterate through each WAN firewall policy
         for policy in policies:
             policy_id = policy.get('policyid', policy.get('name', 'N/A')) # Get policy ID or name
-            
-            # Ensure srcintf is a list for consistent iteration
-            policy_srcintf = policy.get("srcintf", [])
-            if not isinstance(policy_srcintf, list):
-                policy_srcintf = [policy_srcintf] if policy_srcintf is not None else []
 
-            # Check if any source interface of the policy is a WAN interface
-            from_wan = any(src_intf_name in wan_interface_names for src_intf_name in policy_srcintf)
-            
-            if from_wan:
-                # Ensure dstaddr is a list for consistent iteration
-                dst_addrs = policy.get('dstaddr', [])
-                if not isinstance(dst_addrs, list):
-                    dst_addrs = [dst_addrs] if dst_addrs is not None else []
-
-                # Iterate through each destination address in the policy
-                for dst_addr_name in dst_addrs:
-                    # Search for the VIP configuration that matches the destination address name
-                    target_vip_config = None
-                    for vip_item in vips_list:
-                        if vip_item.get('edit') == dst_addr_name:
-                            target_vip_config = vip_item
-                            break
-                    
-                    if target_vip_config: # If the destination is a VIP
-                        vip_name = target_vip_config.get('edit')
-                        # Extract the mapped IP address (can be a list or a single string)
-                        mapped_ip_raw = target_vip_config.get('mappedip', 'N/A')
-                        mapped_ip = mapped_ip_raw[0] if isinstance(mapped_ip_raw, list) and mapped_ip_raw else mapped_ip_raw
-                        
-                        # Get services defined in the policy
-                        services_in_policy = policy.get('service', [])
-                        if not isinstance(services_in_policy, list):
-                            services_in_policy = [services_in_policy] if services_in_policy is not None else []
-
-                        # Iterate through each service in the policy
-                        for service_name in services_in_policy:
-                            # Resolve the service name to a list of integer port numbers
-                            resolved_ports = self.firewall.resolve_service_to_ports(service_name)
-                            
-                            # Filter for sensitive ports that are actually exposed by this service
-                            exposed_critical_ports = [
-                                port for port in resolved_ports if port in self.sensitive_ports
-                            ]
-                            
-                            if exposed_critical_ports:
-                                exposed_vips_found = True
-                                
-                                # Create a unique key to prevent redundant reporting of the same exposure
-                                exposure_key = (policy_id, vip_name) # Using policy ID and VIP name as key
-                                
-                                if exposure_key not in reported_exposures:
-                                    reported_exposures[exposure_key] = {
-                                        "policy_id": policy_id,
-                                        "vip_name": vip_name,
-                                        "mapped_ip": mapped_ip,
-                                        "services": []
-                                    }
-                                
-                                # Add only the sensitive ports found for this specific service
-                                for port in exposed_critical_ports:
-                                    service_detail = {
-                                        "service_name": service_name,
-                                        "port": port,
-                                        "description": self.sensitive_ports.get(port, "Unknown sensitive port")
-                                    }
-                                    # Avoid adding duplicate port entries for the same service if it's already there
-                                    if service_detail not in reported_exposures[exposure_key]["services"]:
-                                        reported_exposures[exposure_key]["services"].append(service_detail)
+            # Destination addresses that are VIPs or VIP groups (hash lookup in the catalog)
+            target_vips = []
+            for dst_addr_name in policyindex.as_list(policy.get('dstaddr')):
+                target_vips.extend(vip_catalog.resolve(dst_addr_name))
+            if not target_vips:
+                continue
+
+            # Sensitive ports allowed by each service of the policy
+            policy_services = []
+            for service_name in policyindex.as_list(policy.get('service')):
+                # "ALL" is a generic exposure, not a specific sensitive port, also inside a service group
+                if self.firewall.service_allows_all(service_name):
+                    continue
+
+                # Sensitive ports exposed by this service (per protocol), computed once per service
+                if service_name not in exposed_ports_by_service:
+                    resolved_ports = self.firewall.resolve_service(service_name)
+                    exposed_ports_by_service[service_name] = resolved_ports.intersection(sensitive_port_set)
+                if exposed_ports_by_service[service_name]:
+                    policy_services.append(service_name)
+            if not policy_services:
+                continue
+
+            for target_vip_config in target_vips:
+                vip_name = target_vip_config.get('edit')
+                # Only the internal (mapped) ports forwarded by the VIP, on its protocol, are reachable
+                mapped_ports = vip_catalog.mapped_ports(target_vip_config)
+                policy_ports = {}
+                for service_name in policy_services:
+                    for port in exposed_ports_by_service[service_name].intersection(mapped_ports).ports():
+                        policy_ports.setdefault(port, []).append(service_name)
+                exposed_critical_ports = sorted(policy_ports)
+                if not exposed_critical_ports:
+                    continue
+
+                exposed_vips_found = True
+
+                # Extract the mapped IP address (can be a list or a single string)
+                mapped_ip_raw = target_vip_config.get('mappedip', 'N/A')
+                mapped_ip = mapped_ip_raw[0] if isinstance(mapped_ip_raw, list) and mapped_ip_raw else mapped_ip_raw
+
+                # Create a unique key to prevent redundant reporting of the same exposure
+                exposure_key = (policy_id, vip_name) # Using policy ID and VIP name as key
+                if exposure_key not in reported_exposures:
+                    reported_exposures[exposure_key] = {
+                        "policy_id": policy_id,
+                        "vip_name": vip_name,
+                        "mapped_ip": mapped_ip,
+                        "services": []
+                    }
+
+                for port in exposed_critical_ports:
+                    for service_name in policy_ports[port]:
+                        service_detail = {
+                            "service_name": service_name,
+                            "port": port,
+                            "external_port": vip_catalog.external_port(target_vip_config, port),
+                            "description": self.sensitive_ports.get(port, "Unknown sensitive port")
+                        }
+                        # Avoid adding duplicate port entries for the same service if it's already there
+                        if service_detail not in reported_exposures[exposure_key]["services"]:
+                            reported_exposures[exposure_key]["services"].append(service_detail)
 
         # Generate the final message based on findings
         if exposed_vips_found:
@@ -127,7 +133,10 @@ class ExposedVIPServicesCheck(Checker):
                 # Sort services for consistent output
                 sorted_services = sorted(info['services'], key=lambda x: x['port'])
                 for svc_info in sorted_services:
-                    ports_info.append(f"{svc_info['port']} ({svc_info['description']})")
+                    if svc_info['external_port'] != svc_info['port']:
+                        ports_info.append(f"{svc_info['port']} ({svc_info['description']}, externo {svc_info['external_port']})")
+                    else:
+                        ports_info.append(f"{svc_info['port']} ({svc_info['description']})")
                 
                 message_details.append(
                     f" - Política: {info['policy_id']}, "
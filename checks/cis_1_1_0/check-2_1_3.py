@@ -12,6 +12,7 @@ class Check_CIS_2_1_3(Checker):
         self.auto = False
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["system global"]
 
     def do_check(self):
         config_system_global = self.get_config("system global")
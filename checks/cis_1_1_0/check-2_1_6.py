@@ -12,6 +12,7 @@ class Check_CIS_2_1_6(Checker):
         self.auto = False
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = [] # File header (config-version), not a chapter
 
     def do_check(self):
         config = self.get_config()
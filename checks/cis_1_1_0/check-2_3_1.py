@@ -13,6 +13,7 @@ class Check_CIS_2_3_1(Checker):
         self.enabled = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["system snmp sysinfo"]
 
 
     def do_check(self):
@@ -12,6 +12,7 @@ class Check_CIS_2_3_2(Checker):
         self.enabled = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["system snmp sysinfo", "system snmp community", "system snmp user"]
 
     def do_check(self):
         config_system_snmp_sysinfo = self.get_config("system snmp sysinfo")
@@ -13,6 +13,7 @@ class Check_CIS_2_4_3(Checker):
         self.enabled = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["system accprofile"]
 
 
     def do_check(self):
@@ -12,6 +12,7 @@ class Check_CIS_2_4_5(Checker):
         self.auto = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["system interface"]
 
 
     def do_check(self):
@@ -12,6 +12,7 @@ class Check_CIS_2_4_6(Checker):
         self.auto = False
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["firewall local-in-policy"]
 
 
     def do_check(self):
@@ -13,6 +13,8 @@ class Check_CIS_3_2(Checker):
         self.enabled = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["firewall policy"]
+        self.indexes = ["policy_table"]
 
     def do_check(self):
         config_firewall_policy = self.get_config("firewall policy")
@@ -24,14 +26,14 @@ class Check_CIS_3_2(Checker):
         fail = False
         
         if len(config_firewall_policy['edits']) > 0:
-            for edit in config_firewall_policy['edits']:
-                if "service" in edit.keys() and edit['service'] == 'ALL' and "action" in edit.keys():
-                    # it seems that when a policy is blocking, there is no "action" key. Here we look
-                    # only for policies that are not blocking and using service ALL
-                    fail = True
-                    self.add_message(f'The policy {edit["uuid"]} is not compliant:')
-                    if "name" in edit.keys():
-                        self.add_message(f'\tname: {edit["name"]}')
+            table = self.firewall.get_policy_table()
+            # it seems that when a policy is blocking, there is no "action" key. Here we look
+            # only for policies that are not blocking and using service ALL
+            for edit in table.select(table.all_of(table.equals('service', 'ALL'), table.present('action'))):
+                fail = True
+                self.add_message(f'The policy {edit["uuid"]} is not compliant:')
+                if "name" in edit.keys():
+                    self.add_message(f'\tname: {edit["name"]}')
             fail = True
         else:
             self.add_message('There is no policy defined')
@@ -13,6 +13,8 @@ class Check_CIS_3_3(Checker):
         self.enabled = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["firewall policy"]
+        self.indexes = ["policy_table"]
 
 
     def do_check(self):
@@ -25,17 +27,15 @@ class Check_CIS_3_3(Checker):
         fail = False
         
         if len(config_firewall_policy['edits']) > 0:
-            all_names = []
-            for edit in config_firewall_policy['edits']:
-                if not 'name' in edit.keys():
-                    fail = True
+            table = self.firewall.get_policy_table()
+            unnamed = table.none_of(table.present('name'))
+            for row in table.rows(table.any_of(unnamed, table.duplicated('name'))):
+                edit = table.policies[row]
+                fail = True
+                if unnamed[row]:
                     self.add_message(f'The policy {edit["uuid"]} has no name')
                 else:
-                    if edit['name'] not in all_names:
-                        all_names.append(edit['name'])
-                    else:
-                        fail = True
-                        self.add_message(f'Policy {edit["name"]} exists multiple times')
+                    self.add_message(f'Policy {edit["name"]} exists multiple times')
         else:
             self.add_message('There is no policy defined')
 
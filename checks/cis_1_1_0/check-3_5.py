@@ -13,6 +13,8 @@ class Check_CIS_3_5(Checker):
         self.enabled = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["firewall policy"]
+        self.indexes = ["policy_table"]
 
 
     def do_check(self):
@@ -27,21 +29,26 @@ class Check_CIS_3_5(Checker):
         if len(config_firewall_policy['edits']) > 0:
             found_tor_inbound_block = False
             found_tor_outbound_block = False
-            for edit in config_firewall_policy['edits']:
-                if 'internet-service-src-name' in edit.keys():
-                    if "Tor-Exit.Node" in edit['internet-service-src-name'] or "Tor-Relay.Node" in edit['internet-service-src-name']:
-                        found_tor_inbound_block = True
-                        if 'name' in edit.keys():
-                            self.add_message(f'Inbound Tor traffic blocked in rule \"{edit["name"]}\"')
-                        else:
-                            self.add_message(f'Inbound Tor traffic blocked in rule {edit["uuid"]}')
-                elif 'internet-service-dst-name' in edit.keys():
-                    if "Tor-Exit.Node" in edit['internet-service-dst-name'] or "Tor-Relay.Node" in edit['internet-service-dst-name']:
-                        found_tor_outbound_block = True
-                        if 'name' in edit.keys():
-                            self.add_message(f'Outbound Tor traffic blocked in rule \"{edit["name"]}\"')
-                        else:
-                            self.add_message(f'Outbound Tor traffic blocked in rule {edit["uuid"]}')
+            table = self.firewall.get_policy_table()
+            tor = lambda names: "Tor-Exit.Node" in names or "Tor-Relay.Node" in names
+            # The destination is only looked at in policies without source internet services
+            with_src = table.present('internet-service-src-name')
+            inbound = table.matches('internet-service-src-name', tor)
+            outbound = table.all_of(table.none_of(with_src), table.matches('internet-service-dst-name', tor))
+            for row in table.rows(table.any_of(inbound, outbound)):
+                edit = table.policies[row]
+                if inbound[row]:
+                    found_tor_inbound_block = True
+                    if 'name' in edit.keys():
+                        self.add_message(f'Inbound Tor traffic blocked in rule \"{edit["name"]}\"')
+                    else:
+                        self.add_message(f'Inbound Tor traffic blocked in rule {edit["uuid"]}')
+                else:
+                    found_tor_outbound_block = True
+                    if 'name' in edit.keys():
+                        self.add_message(f'Outbound Tor traffic blocked in rule \"{edit["name"]}\"')
+                    else:
+                        self.add_message(f'Outbound Tor traffic blocked in rule {edit["uuid"]}')
         else:
             self.add_message('There is no policy defined')
 
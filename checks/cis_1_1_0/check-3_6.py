@@ -13,6 +13,8 @@ class Check_CIS_3_6(Checker):
         self.enabled = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["firewall policy"]
+        self.indexes = ["policy_table"]
 
 
     def do_check(self):
@@ -25,20 +27,19 @@ class Check_CIS_3_6(Checker):
         found_no_logging_policy = False
         
         if len(config_firewall_policy['edits']) > 0:
-            for edit in config_firewall_policy['edits']:
+            table = self.firewall.get_policy_table()
+            for edit in table.select(table.none_of(table.equals('logtraffic', 'all'))):
+                found_no_logging_policy = True
                 if 'logtraffic' not in edit.keys():
-                    found_no_logging_policy = True
                     if 'name' in edit.keys():
                         self.add_message(f'No logging for rule \"{edit["name"]}\"')
                     else:
                         self.add_message(f'No logging for rule {edit["uuid"]}')
                 else:
-                    if edit["logtraffic"] != "all":
-                        found_no_logging_policy = True
-                        if 'name' in edit.keys():
-                            self.add_message(f'Logging is not \"all\" for rule \"{edit["name"]}\"')
-                        else:
-                            self.add_message(f'Logging is not \"all\" for rule {edit["uuid"]}')
+                    if 'name' in edit.keys():
+                        self.add_message(f'Logging is not \"all\" for rule \"{edit["name"]}\"')
+                    else:
+                        self.add_message(f'Logging is not \"all\" for rule {edit["uuid"]}')
         else:
             self.add_message('There is no policy defined')
 
@@ -12,6 +12,8 @@ class Check_CIS_4_1_1(Checker):
         self.auto = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["firewall policy", "ips sensor"]
+        self.indexes = ["wan_interfaces", "policies"]
 
     def do_check(self):
         wan_interfaces = self.firewall.get_wan_interfaces()
@@ -12,6 +12,8 @@ class Check_CIS_4_2_2(Checker):
         self.auto = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["system interface", "firewall policy"]
+        self.indexes = ["policies"]
 
     def do_check(self):
         interfaces = self.firewall.get_interfaces()
@@ -12,6 +12,7 @@ class Check_CIS_4_2_3(Checker):
         self.auto = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["antivirus profile"]
 
     def do_check(self):
         # interfaces = self.firewall.get_interfaces() # This line is not used in the current logic, can be removed if truly not needed.
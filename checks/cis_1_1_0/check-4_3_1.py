@@ -12,6 +12,8 @@ class Check_CIS_4_3_1(Checker):
         self.auto = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["firewall policy", "firewall service group", "dnsfilter profile"]
+        self.indexes = ["policies"]
 
     def do_check(self):
         policies = self.firewall.get_policies(actions=["accept"])
@@ -12,6 +12,7 @@ class Check_CIS_4_3_2(Checker):
         self.auto = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["dnsfilter profile"]
 
     def do_check(self):
         dnsfilter_profiles = self.firewall.get_dnsfilter_profiles()
@@ -12,6 +12,7 @@ class Check_CIS_4_4_2(Checker):
         self.auto = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["application list"]
 
     def do_check(self):
         appcontrol_profiles = self.firewall.get_appcontrol_profiles()
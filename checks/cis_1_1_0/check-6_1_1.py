@@ -12,6 +12,7 @@ class Check_CIS_6_1_1(Checker):
         self.auto = False
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["vpn ssl settings"]
 
     def do_check(self):
         config_vpnssl_settings= self.get_config("vpn ssl settings")
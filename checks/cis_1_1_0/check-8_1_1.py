@@ -12,6 +12,7 @@ class Check_CIS_8_1_1(Checker):
         self.auto = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = []
 
     def do_check(self):
         self.add_message('Not implemented')
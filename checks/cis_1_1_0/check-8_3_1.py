@@ -12,6 +12,7 @@ class Check_CIS_8_3_1(Checker):
         self.auto = True
         self.benchmark_version = "v1.1.0"
         self.benchmark_author = "CIS"
+        self.inputs = ["log fortianalyzer setting"]
 
     def do_check(self):
         config_log_fortianalyzer_setting = self.get_config("log fortianalyzer setting")
@@ -13,6 +13,8 @@ class Check_Cyblex_1(Checker):
         self.auto = False
         self.benchmark_version = "1.0.0"
         self.benchmark_author = "Cyblex"
+        self.inputs = ["firewall policy"]
+        self.indexes = ["policy_table"]
 
     def do_check(self):
         config_firewall_policy = self.get_config("firewall policy")
@@ -25,32 +27,19 @@ class Check_Cyblex_1(Checker):
 
         suspicious_rules = []
         if len(config_firewall_policy['edits']) > 0:
-            
-            for edit in config_firewall_policy['edits']:
-                suspicious = False
-
-                if "name" in edit.keys():
-                    name = edit["name"]
-                    if REGEX.search(name):
-                        suspicious = True
-                else:
-                    name = "<no name>"
-                
-                if "comments" in edit.keys():
-                    comments = edit['comments']
-
-                    if len(comments) > 0:
-                        # Dirty semi workaround for https://github.com/ssato/python-anyconfig-fortios-backend/issues/4
-                        if isinstance(comments, list):
-                            comments = " ".join(comments)
-
-                        if REGEX.search(comments):
-                            suspicious = True
-                else:
-                    comments = "<no comment>"
-
-                if suspicious:
-                    suspicious_rules.append({"uuid": edit["uuid"], "name": name, "comments": comments})
+            table = self.firewall.get_policy_table()
+            # Each distinct name and comment is searched once
+            suspicious_name = table.matches('name', REGEX.search)
+            # Dirty semi workaround for https://github.com/ssato/python-anyconfig-fortios-backend/issues/4
+            suspicious_comments = table.matches('comments', lambda comments: len(comments) > 0 and REGEX.search(
+                " ".join(comments) if isinstance(comments, list) else comments))
+
+            for edit in table.select(table.any_of(suspicious_name, suspicious_comments)):
+                name = edit.get("name", "<no name>")
+                comments = edit.get("comments", "<no comment>")
+                if isinstance(comments, list) and len(comments) > 0:
+                    comments = " ".join(comments)
+                suspicious_rules.append({"uuid": edit["uuid"], "name": name, "comments": comments})
                         
             if len(suspicious_rules) > 0:
                 self.add_question_context("The following policies have suspicious name or suspicious comment:")
@@ -13,6 +13,7 @@ class Check_Cyblex_2(Checker):
         self.auto = False
         self.benchmark_version = "1.0.0"
         self.benchmark_author = "Cyblex"
+        self.inputs = ["firewall proxy-policy"]
 
     def do_check(self):
         config_proxy_policy = self.get_config("firewall proxy-policy")
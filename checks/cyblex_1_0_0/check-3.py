@@ -0,0 +1,35 @@
+from checker import Checker
+
+class Check_Cyblex_3(Checker):
+
+    def __init__(self, firewall, display, verbose=False):
+
+        super().__init__(firewall, display, verbose)
+
+        self.id = "3"
+        self.title = "Check firewall policies shadowed by an earlier policy"
+        self.levels = [1]
+        self.auto = True
+        self.benchmark_version = "1.0.0"
+        self.benchmark_author = "Cyblex"
+        self.inputs = ["firewall policy"]
+        self.indexes = ["covered_policies"]
+
+    def do_check(self):
+        if self.get_config("firewall policy") is None:
+            self.set_message(f'No \"config firewall policy\" block defined')
+            return True
+
+        shadowed = [finding for finding in self.firewall.get_covered_policies() if finding["type"] == "shadowed"]
+
+        if len(shadowed) > 0:
+            details = ["The following policies are never applied: an earlier policy with another action matches all their traffic:"]
+            for finding in shadowed:
+                details.append(f' - Policy {self.get_policy_label(finding["policy"])} shadowed by {self.get_policy_label(finding["covered_by"])} ({finding["covered_by"].get("action", "deny")})')
+            self.add_message("\n".join(details), log_level="FAIL")
+            self.set_message(f'{len(shadowed)} shadowed policies')
+            return False
+
+        self.set_message("No shadowed policy found")
+        return True
+
@@ -0,0 +1,35 @@
+from checker import Checker
+
+class Check_Cyblex_4(Checker):
+
+    def __init__(self, firewall, display, verbose=False):
+
+        super().__init__(firewall, display, verbose)
+
+        self.id = "4"
+        self.title = "Check redundant firewall policies"
+        self.levels = [2]
+        self.auto = True
+        self.benchmark_version = "1.0.0"
+        self.benchmark_author = "Cyblex"
+        self.inputs = ["firewall policy"]
+        self.indexes = ["covered_policies"]
+
+    def do_check(self):
+        if self.get_config("firewall policy") is None:
+            self.set_message(f'No \"config firewall policy\" block defined')
+            return True
+
+        redundant = [finding for finding in self.firewall.get_covered_policies() if finding["type"] == "redundant"]
+
+        if len(redundant) > 0:
+            details = ["The following policies are redundant: an earlier policy with the same action matches all their traffic:"]
+            for finding in redundant:
+                details.append(f' - Policy {self.get_policy_label(finding["policy"])} duplicated by {self.get_policy_label(finding["covered_by"])}')
+            self.add_message("\n".join(details), log_level="FAIL")
+            self.set_message(f'{len(redundant)} redundant policies')
+            return False
+
+        self.set_message("No redundant policy found")
+        return True
+
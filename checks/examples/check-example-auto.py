@@ -12,6 +12,8 @@ class Check_Example_Manual(Checker):
         self.auto = True
         self.enabled = False # Remove this line to enable
         self.benchmark_author = "Example Org."
+        self.inputs = ["system dns"]
+        self.requires_inputs = True # SKIP when there is no "config system dns" block
 
     def do_check(self):
         config_system_dns = self.get_config("system dns")
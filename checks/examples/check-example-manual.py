@@ -12,6 +12,7 @@ class Check_Example_Manual(Checker):
         self.auto = False
         self.enabled = False # Remove this line to enable
         self.benchmark_author = "Example Org."
+        self.inputs = ["system auto-install"]
 
     def do_check(self):
         config = self.get_config("system auto-install")
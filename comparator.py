@@ -1,24 +1,68 @@
-import PyPDF2
-import difflib
+import concurrent.futures
+import hashlib
 import os
 import sys # Import the sys module
+from pathlib import Path
+import linediff
+import parsecache
+import sidecar
 
-def extract_text_from_pdf(pdf_path):
+# Caché del texto extraído de los PDF, por hash del archivo: cada reporte se extrae una sola vez
+TEXT_CACHE_PATH = str(Path.home()) + '/.cache/fortigate-security-auditor/pdftext'
+TEXT_CACHE_SIZE = 256 * 1024 * 1024 # bytes
+
+# Las páginas se reparten entre procesos a partir de este número de páginas
+PARALLEL_MIN_PAGES = 16
+
+def _extract_pages(pdf_path, start, end):
+    """
+    Extrae el texto de las páginas start a end-1 (en un proceso del pool).
+    """
+    import PyPDF2
+
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[page_num].extract_text() or "" for page_num in range(start, end)]
+
+def _text_cache_key(pdf_path):
+    import PyPDF2
+
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    digest.update(f':pdftext:{PyPDF2.__version__}'.encode())
+    return digest.hexdigest()
+
+def extract_text_from_pdf(pdf_path, workers=None, use_cache=True):
     """
     Extrae todo el texto de un archivo PDF.
 
+    Las páginas se extraen en paralelo (workers procesos, por defecto uno por CPU) y el
+    texto se guarda en caché por hash del archivo.
+
     Args:
         pdf_path (str): La ruta al archivo PDF.
 
     Returns:
         str: El texto extraído del PDF.
     """
-    text = ""
+    # Solo necesario para la comparación de texto
+    import PyPDF2
+
     try:
         if not os.path.exists(pdf_path):
             print(f"ERROR: El archivo no existe en la ruta: '{pdf_path}'")
             return None
 
+        text_cache = key = None
+        if use_cache:
+            text_cache = parsecache.ParseCache(TEXT_CACHE_PATH, TEXT_CACHE_SIZE)
+            key = _text_cache_key(pdf_path)
+            text = text_cache.get(key)
+            if text is not None:
+                return text
+
         with open(pdf_path, 'rb') as file:
             reader = PyPDF2.PdfReader(file)
             
@@ -26,16 +70,28 @@ def extract_text_from_pdf(pdf_path):
                 print(f"ADVERTENCIA: El PDF '{pdf_path}' está encriptado. Intentando desencriptar sin contraseña...")
                 # Si tienes una contraseña, podrías usar: reader.decrypt('tu_contrasena_aqui')
 
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text
-                else:
-                    print(f"ADVERTENCIA: Página {page_num+1} de '{pdf_path}' no contiene texto extraíble o es una imagen escaneada.")
-            
-            if not text.strip():
-                print(f"ADVERTENCIA: No se pudo extraer texto significativo de '{pdf_path}'. Podría ser un PDF escaneado o vacío.")
+            page_count = len(reader.pages)
+            workers = min(workers or os.cpu_count() or 1, page_count // PARALLEL_MIN_PAGES or 1)
+            if workers <= 1 or reader.is_encrypted:
+                pages = [reader.pages[page_num].extract_text() or "" for page_num in range(page_count)]
+
+        if workers > 1 and not reader.is_encrypted:
+            # Cada proceso abre el PDF y extrae un bloque contiguo de páginas
+            bounds = [(page_count * index // workers, page_count * (index + 1) // workers) for index in range(workers)]
+            with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+                blocks = executor.map(_extract_pages, [pdf_path] * workers, *zip(*bounds))
+                pages = [page_text for block in blocks for page_text in block]
+
+        for page_num, page_text in enumerate(pages):
+            if not page_text:
+                print(f"ADVERTENCIA: Página {page_num+1} de '{pdf_path}' no contiene texto extraíble o es una imagen escaneada.")
+        # Unión en tiempo lineal
+        text = "".join(pages)
+
+        if not text.strip():
+            print(f"ADVERTENCIA: No se pudo extraer texto significativo de '{pdf_path}'. Podría ser un PDF escaneado o vacío.")
+        elif text_cache is not None:
+            text_cache.put(key, text)
 
     except PyPDF2.errors.PdfReadError as e:
         print(f"ERROR PyPDF2 al leer '{pdf_path}': {e}. El archivo podría estar corrupto o no ser un PDF válido.")
@@ -48,13 +104,14 @@ def extract_text_from_pdf(pdf_path):
         return None
     return text
 
-def compare_pdf_texts(pdf1_path, pdf2_path):
+def compare_pdf_texts(pdf1_path, pdf2_path, context=linediff.DEFAULT_CONTEXT):
     """
     Compara el texto de dos archivos PDF y devuelve las diferencias.
 
     Args:
         pdf1_path (str): La ruta al primer archivo PDF.
         pdf2_path (str): La ruta al segundo archivo PDF.
+        context (int): Líneas de contexto alrededor de cada diferencia.
 
     Returns:
         list: Una lista de cadenas que representan las diferencias,
@@ -74,32 +131,85 @@ def compare_pdf_texts(pdf1_path, pdf2_path):
     lines1 = text1.splitlines(keepends=True)
     lines2 = text2.splitlines(keepends=True)
 
-    # Llamar directamente a difflib.unified_diff
-    diff = difflib.unified_diff(lines1, lines2, fromfile=pdf1_path, tofile=pdf2_path)
+    # Diff anclado en las líneas únicas: lineal en reportes largos con líneas repetidas
+    diff = linediff.unified_diff(lines1, lines2, fromfile=pdf1_path, tofile=pdf2_path, n=context)
     
     return list(diff)
 
-if __name__ == "__main__":
-    # --- Check for command-line arguments ---
-    if len(sys.argv) != 3:
-        print("Uso: python compare_pdfs.py <ruta_pdf1> <ruta_pdf2>")
-        sys.exit(1) # Exit with an error code
+def compare_results(results1_path, results2_path):
+    """
+    Compara los archivos de resultados (.results.json) de dos auditorías, unidos por id de control,
+    sin extraer texto de los PDF.
 
-    pdf_path1 = sys.argv[1]
-    pdf_path2 = sys.argv[2]
+    Returns:
+        dict: Ver sidecar.compare, o None si no se pudo leer uno de los archivos.
+    """
+    try:
+        return sidecar.compare(sidecar.load(results1_path), sidecar.load(results2_path))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR al leer los resultados: {e}")
+        return None
+
+def print_comparison(comparison, file=None):
+    """
+    Muestra (o escribe en file) los cambios de estado, controles nuevos o eliminados y
+    hallazgos nuevos o resueltos.
+    """
+    sections = [
+        ("transitions", "Cambios de estado", lambda item: f"[{item[0]}] {item[1]}: {item[2]} -> {item[3]}"),
+        ("added", "Controles nuevos", lambda item: f"[{item[0]}] {item[1]}: {item[2]}"),
+        ("removed", "Controles eliminados", lambda item: f"[{item[0]}] {item[1]}: {item[2]}"),
+        ("new_findings", "Hallazgos nuevos", lambda item: f"[{item[0]}] {item[2]}"),
+        ("resolved_findings", "Hallazgos resueltos", lambda item: f"[{item[0]}] {item[2]}"),
+    ]
+    for key, title, line in sections:
+        if comparison[key]:
+            print(f"\n--- {title} ({len(comparison[key])}): ---", file=file)
+            for item in comparison[key]:
+                print(line(item), file=file)
+
+def compare_reports(pdf1_path, pdf2_path, compare_texts=compare_pdf_texts):
+    """
+    Compara dos reportes: por resultados estructurados si ambos tienen su archivo .results.json,
+    si no por el texto de los PDF (con compare_texts). Retorna el código de salida
+    (0: idénticos, 2: diferencias, 1: error).
+    """
+    results1, results2 = sidecar.find(pdf1_path), sidecar.find(pdf2_path)
+    if results1 is not None and results2 is not None:
+        print("\n--- Iniciando comparación de resultados (por id de control) ---")
+        comparison = compare_results(results1, results2)
+        if comparison is None:
+            print("\nNo se pudo realizar la comparación debido a errores en la lectura de los resultados.")
+            return 1
+        if sidecar.has_differences(comparison):
+            print_comparison(comparison)
+            return 2
+        print("\nLos resultados de ambas auditorías son idénticos.")
+        return 0
 
     print("\n--- Iniciando comparación de PDFs ---")
-    differences = compare_pdf_texts(pdf_path1, pdf_path2)
+    differences = compare_texts(pdf1_path, pdf2_path)
 
     if differences is not None:
         if len(differences) > 0:
             print("\n--- Diferencias encontradas: ---")
             for line in differences:
                 print(line, end='')
-            sys.exit(2) # Exit with a different code to indicate differences were found
+            return 2 # Exit with a different code to indicate differences were found
         else:
             print("\nLos archivos PDF son idénticos en su contenido de texto.")
-            sys.exit(0) # Exit with success code
+            return 0 # Exit with success code
     else:
         print("\nNo se pudo realizar la comparación debido a errores en la extracción de texto de uno o ambos archivos.")
-        sys.exit(1) # Exit with an error code3.
\ No newline at end of file
+        return 1 # Exit with an error code
+
+if __name__ == "__main__":
+    # --- Check for command-line arguments ---
+    if len(sys.argv) != 3:
+        print("Uso: python compare_pdfs.py <ruta_pdf1> <ruta_pdf2>")
+        sys.exit(1) # Exit with an error code
+
+    pdf_path1 = sys.argv[1]
+    pdf_path2 = sys.argv[2]
+
+    sys.exit(compare_reports(pdf_path1, pdf_path2))
@@ -0,0 +1,67 @@
+import hashlib
+import re
+
+# Canonical fingerprint of a configuration backup.
+#
+# Two backups of an unchanged device are not byte-identical: the header comments
+# record the administrator who downloaded the file and a counter bumped on every
+# save ("#config-version=...:user=admin", "#conf_file_ver=..."), and the secrets
+# stored encrypted ("set psksecret ENC <base64>") are encrypted again with a new
+# salt on every backup. The canonical form drops those header items, replaces the
+# encrypted values by "ENC" (the checks only test whether a secret is set) and
+# normalizes the line endings; its hash identifies what the audit actually reads.
+
+FINGERPRINT_VERSION = 1
+
+# Header items that change on every backup of the same configuration
+VOLATILE_HEADER_ITEMS = (b'conf_file_ver', b'user')
+
+ENCRYPTED_VALUE = re.compile(rb' ENC \S+')
+
+
+def _canonical_header(line):
+    # "#key=value:key=value", without the volatile items (None: nothing left)
+    items = [item for item in line[1:].split(b':') if item.partition(b'=')[0].strip() not in VOLATILE_HEADER_ITEMS]
+    return b'#' + b':'.join(items) if items else None
+
+
+def _canonical_parts(data):
+    # Canonical form as a sequence of parts (memoryviews of data: no copy of large backups)
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n')
+    view = memoryview(data)
+    # Header: the comment lines at the top of the file
+    start = 0
+    while data.startswith(b'#', start):
+        end = data.find(b'\n', start)
+        end = len(data) if end < 0 else end
+        line = _canonical_header(data[start:end].rstrip())
+        if line is not None:
+            yield line + b'\n'
+        start = end + 1
+    yield b'\n'
+    for match in ENCRYPTED_VALUE.finditer(data, start):
+        yield view[start:match.start()]
+        yield b' ENC'
+        start = match.end()
+    yield view[start:]
+
+
+def canonical(data):
+    """
+    Canonical form (bytes) of the content of a configuration backup.
+    """
+    return b''.join(_canonical_parts(data))
+
+
+def config_fingerprint(filepath):
+    """
+    Fingerprint (hex) of a configuration file: hash of its canonical form.
+    """
+    with open(filepath, 'rb') as config_file:
+        data = config_file.read()
+    digest = hashlib.sha256()
+    for part in _canonical_parts(data):
+        digest.update(part)
+    digest.update(f':{FINGERPRINT_VERSION}'.encode())
+    return digest.hexdigest()
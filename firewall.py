@@ -1,13 +1,62 @@
+import addressset
 import fortiguard
+import hashlib
+import intervalset
+import json
+import policyindex
+import policytable
+import portset
+import shadowing
+import vipcatalog
+import sys
+from types import MappingProxyType
+
+# Huella del código fuente de cada módulo (ver Firewall.get_inputs_digest): módulo -> huella
+_module_digests = {}
+
+
+def _module_digest(module):
+    if module not in _module_digests:
+        with open(module.__file__, 'rb') as source:
+            _module_digests[module] = hashlib.blake2b(source.read(), digest_size=16).hexdigest()
+    return _module_digests[module]
+
 
 class Firewall:
+
+    # Índices derivados que una verificación puede declarar (Checker.indexes), en orden de
+    # construcción: nombre -> (método que lo construye, capítulos que lee, índices de los que depende)
+    INDEXES = {
+        "wan_interfaces": ("get_wan_interfaces", ("system interface", "system zone"), ()),
+        "policies": ("get_policy_index", ("firewall policy",), ()),
+        "policy_table": ("get_policy_table", ("firewall policy",), ()),
+        "services": ("_load_services", ("firewall service custom", "firewall service group"), ()),
+        "addresses": ("_load_addresses", ("firewall address", "firewall addrgrp", "firewall address6", "firewall addrgrp6"), ()),
+        "vip_catalog": ("get_vip_catalog", ("firewall vip", "firewall vipgrp"), ()),
+        "covered_policies": ("get_covered_policies", ("system zone",), ("policies", "services", "addresses")),
+        "fortiguard": ("_load_fortiguard", (), ()),
+    }
+
+    # Módulos que calculan cada índice (además de este): su código forma parte de la huella
+    # de las verificaciones que lo usan, así una corrección invalida los resultados guardados
+    INDEX_MODULES = {
+        "wan_interfaces": (),
+        "policies": (policyindex,),
+        "policy_table": (policytable,),
+        "services": (portset, intervalset),
+        "addresses": (addressset, intervalset),
+        "vip_catalog": (vipcatalog, portset, intervalset),
+        "covered_policies": (shadowing,),
+        "fortiguard": (fortiguard,),
+    }
     
-    def __init__(self, config, display, verbose=False):
+    def __init__(self, config, display, verbose=False, fortiguard_db=None):
         self.config = config
         self.wan_interfaces = None # Se inicializa a None, será una lista de nombres de interfaces WAN (strings)
+        self.policy_workers = 1 # Procesos para el análisis de políticas ocultas (ver get_covered_policies)
         self.display = display
-        # Fortiguard object
-        self.fortiguard = fortiguard.Fortiguard()
+        # Fortiguard object (compartido entre auditorías en modo lote)
+        self.fortiguard = fortiguard_db if fortiguard_db is not None else fortiguard.Fortiguard()
         self.all_timezones = {
             "01":"(GMT-11:00) Midway Island, Samoa",
             "02":"(GMT-10:00) Hawaii",
@@ -99,13 +148,119 @@ class Firewall:
             "76":"(GMT+14:00) Kiritimati"
         }
         
+        # Índice capítulo -> bloque, construido una sola vez (ver get_config)
+        self._build_chapter_index()
+
         # --- NUEVAS PROPIEDADES PARA CACHEAR DATOS PARSEADOS ---
         self._vips = None
-        self._addresses = None # Para futuras referencias de objetos de dirección
+        self._addresses = None # Objetos de dirección por nombre (ver resolve_address)
+        self._address_groups = None
+        self._addresses6 = None
+        self._address_groups6 = None
+        self._resolved_addresses = {} # Nombre -> AddressSet
+        self._resolved_addresses6 = {}
         self._services = None
         self._service_groups = None
+        self._resolved_services = {} # Nombre de servicio -> PortSet (ver resolve_service)
+        self._service_members = {} # Nombre de servicio -> servicios que contiene (ver get_service_members)
+        self._policy_index = None
+        self._policy_table = None
+        self._vip_catalog = None
+        self._covered_policies = None
+        self._chapter_digests = None
         # --- FIN NUEVAS PROPIEDADES ---
 
+    def get_chapter_size(self, chapter):
+        """
+        Número de entradas ("edit") de un capítulo: 1 para un bloque de ajustes, 0 si no existe.
+        """
+        config_block = self.get_config(chapter)
+        if config_block is None:
+            return 0
+        return len(config_block.get('edits', ())) or 1
+
+    def resolve_indexes(self, names):
+        """
+        Retorna los índices names y aquellos de los que dependen, en orden de construcción.
+        Los nombres desconocidos se ignoran con un aviso.
+        """
+        needed = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in needed:
+                continue
+            if name not in self.INDEXES:
+                print(f'[!] Unknown index: {name}')
+                continue
+            needed.add(name)
+            pending.extend(self.INDEXES[name][2])
+        return [name for name in self.INDEXES if name in needed]
+
+    def get_index_cost(self, name):
+        """
+        Costo estimado de construir un índice, en entradas de configuración procesadas
+        (comparaciones de pares de políticas para covered_policies).
+        """
+        if name == "covered_policies":
+            policies = self.get_chapter_size("firewall policy")
+            return policies * (policies - 1) // 2
+        return sum(self.get_chapter_size(chapter) for chapter in self.INDEXES[name][1])
+
+    def build_indexes(self, names):
+        """
+        Construye los índices names (y sus dependencias) antes de ejecutar las verificaciones:
+        en modo paralelo los procesos los heredan ya construidos. Retorna los nombres construidos.
+        Un índice que falla se deja sin construir: la verificación que lo usa reporta el error.
+        """
+        built = []
+        for name in self.resolve_indexes(names):
+            try:
+                getattr(self, self.INDEXES[name][0])()
+                built.append(name)
+            except Exception as e:
+                print(f'[!] Cannot build index {name}: {e}')
+        return built
+
+    def get_chapter_digests(self):
+        """
+        Retorna la huella (BLAKE2b) de cada capítulo de la configuración: {capítulo: huella},
+        calculada una sola vez. Sirve para saber qué capítulos cambiaron desde la auditoría anterior.
+        """
+        if self._chapter_digests is None:
+            # JSON normalizado (claves ordenadas) y no marshal: la salida de marshal depende de los
+            # objetos compartidos en memoria. Los bloques iguales de dos equipos tienen la misma huella
+            self._chapter_digests = {chapter: hashlib.blake2b(json.dumps(block, sort_keys=True, separators=(',', ':')).encode(),
+                                                              digest_size=16).hexdigest()
+                                     for chapter, block in self.chapters.items()}
+        return self._chapter_digests
+
+    def get_inputs_digest(self, chapters, indexes=()):
+        """
+        Huella de todo lo que lee una verificación: los capítulos chapters, los capítulos de los
+        índices indexes (y de sus dependencias), el código que calcula esos índices, las interfaces
+        WAN configuradas y la base Fortiguard si la usa. Cambia si cambia alguno de ellos.
+        """
+        indexes = self.resolve_indexes(indexes)
+        chapters = set(chapters)
+        for name in indexes:
+            chapters.update(self.INDEXES[name][1])
+        digests = self.get_chapter_digests()
+        inputs = [(chapter, digests.get(chapter)) for chapter in sorted(chapters)]
+        if indexes:
+            modules = {sys.modules[__name__]}
+            for name in indexes:
+                modules.update(self.INDEX_MODULES[name])
+            inputs.append(("code", sorted(_module_digest(module) for module in modules)))
+        if "wan_interfaces" in indexes:
+            inputs.append(("wan", self.wan_interfaces))
+        if "fortiguard" in indexes:
+            inputs.append(("fortiguard", fortiguard._source_signature()))
+        return hashlib.blake2b(repr(inputs).encode(), digest_size=16).hexdigest()
+
+    def _load_fortiguard(self):
+        fortiguard.load_database()
+
     def _get_edits_from_config(self, chapter):
         """
         Helper para obtener la lista de 'edits' de un capítulo de configuración.
@@ -116,15 +271,67 @@ class Firewall:
             return config_block['edits']
         return []
 
+    def _build_chapter_index(self):
+        """
+        Indexa los bloques de configuración por nombre de capítulo ("system global",
+        "vpn ssl settings", ...). Con VDOMs, los capítulos anidados en "config global"
+        y en cada "config vdom" / "edit <vdom>" también se indexan.
+        Prioridad sin VDOM explícito: nivel superior, luego global, luego el VDOM si solo hay uno.
+        Con varios VDOMs, un capítulo de VDOM solo se obtiene con vdom: sin él se devolvería el
+        bloque de un solo VDOM como si fuera el del equipo entero.
+        """
+        top_level = {}
+        global_scope = {}
+        vdom_scopes = {}
+        for block in self.config:
+            name = block.get("config")
+            if name is None:
+                continue
+            top_level.setdefault(name, block)
+            if name == "global":
+                for nested in block.get("configs", []):
+                    global_scope.setdefault(nested["config"], nested)
+            elif name == "vdom":
+                for vdom in block.get("edits", []):
+                    scope = vdom_scopes.setdefault(vdom["edit"], {})
+                    for nested in vdom.get("configs", []):
+                        scope.setdefault(nested["config"], nested)
+
+        chapters = dict(top_level)
+        for name, block in global_scope.items():
+            chapters.setdefault(name, block)
+        if len(vdom_scopes) == 1:
+            for scope in vdom_scopes.values():
+                for name, block in scope.items():
+                    chapters.setdefault(name, block)
+
+        # Vistas de solo lectura: los checks pueden consultarlas pero no modificarlas
+        self.chapters = MappingProxyType(chapters)
+        self._global_chapters = global_scope
+        self._vdom_chapters = {vdom: MappingProxyType({**global_scope, **scope}) for vdom, scope in vdom_scopes.items()}
+
     # Returns the config bloc in config dict
-    def get_config(self, chapter=None):
+    def get_config(self, chapter=None, vdom=None):
+        """
+        Retorna el bloque del capítulo en O(1), o None si no existe.
+        Con vdom, busca el capítulo en ese VDOM y luego en "config global". Sin vdom, None
+        para un capítulo de VDOM cuando hay varios VDOMs (ver _build_chapter_index).
+        """
         if chapter is None:
             return self.config
-        else:
-            for block in self.config:
-                if "config" in block.keys() and block["config"] == chapter:
-                    return block
-            return None
+        if vdom is not None:
+            return self.get_vdom_chapters(vdom).get(chapter)
+        return self.chapters.get(chapter)
+
+    # Returns the VDOM names (empty when VDOMs are not enabled)
+    def get_vdoms(self):
+        return list(self._vdom_chapters.keys())
+
+    def get_vdom_chapters(self, vdom):
+        """
+        Retorna la vista de solo lectura capítulo -> bloque de un VDOM (incluye los capítulos globales).
+        """
+        return self._vdom_chapters.get(vdom, MappingProxyType(self._global_chapters))
     
     # Returns all firewall interfaces
     def get_interfaces(self):
@@ -211,49 +418,46 @@ class Firewall:
         self.wan_interfaces = interfaces_names_list 
     # --- FIN MODIFICACIONES EN get_wan_interfaces y set_wan_interfaces ---
     
+    # Returns the inverted indexes of the firewall policies (built on first use)
+    def get_policy_index(self):
+        if self._policy_index is None:
+            self._policy_index = policyindex.PolicyIndex(self._get_edits_from_config("firewall policy"))
+        return self._policy_index
+
+    # Returns the columnar view of the firewall policies, for checks over every policy (built on first use)
+    def get_policy_table(self):
+        if self._policy_table is None:
+            self._policy_table = policytable.PolicyTable(self._get_edits_from_config("firewall policy"),
+                                                         policytable.COLUMNS)
+        return self._policy_table
+
     # Returns firewall policies. Allows filtering
-    def get_policies(self, srcintfs=None, dstintfs=None, actions=None):
-        config_firewall_policy = self.get_config("firewall policy")
-        if config_firewall_policy is None:
-            return []
-        
-        policies = config_firewall_policy['edits']
-
-        result = []         
-        for policy in policies:
-            # Manejo de srcintf: Puede ser una cadena o una lista. Convertir a lista para consistencia.
-            current_srcintf = policy.get("srcintf")
-            if not isinstance(current_srcintf, list):
-                current_srcintf = [current_srcintf] if current_srcintf is not None else []
-
-            # Manejo de dstintf: Puede ser una cadena o una lista. Convertir a lista para consistencia.
-            current_dstintf = policy.get("dstintf")
-            if not isinstance(current_dstintf, list):
-                current_dstintf = [current_dstintf] if current_dstintf is not None else []
-
-            # Filtro por srcintfs (lista de NOMBRES de interfaces/zonas)
-            if srcintfs is not None:
-                # Verificamos si CUALQUIERA de las interfaces de origen de la política está en la lista de srcintfs
-                if not any(s_intf in srcintfs for s_intf in current_srcintf):
-                    continue
-                
-            # Filtro por dstintfs (lista de NOMBRES de interfaces/zonas)
-            if dstintfs is not None:
-                # Verificamos si CUALQUIERA de las interfaces de destino de la política está en la lista de dstintfs
-                if not any(d_intf in dstintfs for d_intf in current_dstintf):
-                    continue
-                
-            if actions is not None:
-                if "action" not in policy.keys():
-                    continue
-                
-                if policy["action"] not in actions:
-                    continue
-            
-            result.append(policy)
+    def get_policies(self, srcintfs=None, dstintfs=None, actions=None, services=None, srcaddrs=None,
+                     dstaddrs=None, addresses=None, has_profile=None, logtraffic=None, statuses=None):
+        """
+        Retorna las políticas (en orden de evaluación) que cumplen todos los filtros dados.
+        Cada filtro es una lista de valores aceptados; una política cumple si CUALQUIERA
+        de sus valores está en la lista (p. ej. alguna de sus srcintf está en srcintfs).
+        - addresses: nombres buscados en srcaddr o dstaddr
+        - has_profile: True/False (algún perfil de seguridad) o el nombre de un campo de perfil ("ips-sensor")
+        - logtraffic / statuses: si no están en la política se usan los valores por defecto ("utm" / "enable")
+        Las políticas sin "action" no cumplen el filtro actions.
+        """
+        filters = {
+            "srcintf": srcintfs,
+            "dstintf": dstintfs,
+            "action": actions,
+            "service": services,
+            "srcaddr": srcaddrs,
+            "dstaddr": dstaddrs,
+            "addresses": addresses,
+            "logtraffic": logtraffic,
+            "status": statuses,
+        }
+        filters = {field: policyindex.as_list(values) for field, values in filters.items() if values is not None}
+        filters["has_profile"] = has_profile
+        return self.get_policy_index().query(**filters)
 
-        return result
-    
     # --- NUEVO MÉTODO: get_vips ---
     def get_vips(self):
         """
@@ -265,100 +469,362 @@ class Firewall:
         return self._vips
     # --- FIN NUEVO MÉTODO: get_vips ---
 
+    # Returns VIP groups
+    def get_vip_groups(self):
+        return self._get_edits_from_config("firewall vipgrp")
+
+    def get_vip_catalog(self):
+        """
+        Retorna el catálogo de VIPs indexado por nombre (grupos de VIPs aplanados
+        y traducción de puertos extport -> mappedport), construido en el primer uso.
+        """
+        if self._vip_catalog is None:
+            self._vip_catalog = vipcatalog.VipCatalog(self.get_vips(), self.get_vip_groups(), self.display)
+        return self._vip_catalog
+
     # --- NUEVO MÉTODO: resolve_service_to_ports ---
-    def resolve_service_to_ports(self, service_name):
+    def resolve_service(self, service_name):
         """
-        Resuelve un nombre de servicio FortiGate (predeterminado o custom)
-        o un grupo de servicios a una lista de números de puerto (integers).
+        Resuelve un servicio FortiGate (custom, predefinido o grupo de servicios, anidado)
+        a un PortSet: intervalos de puertos de destino por protocolo.
+        El resultado se memoriza por nombre; los grupos cíclicos no provocan recursión infinita.
+        """
+        self._load_services()
+
+        if service_name not in self._resolved_services:
+            self._resolve_group_closure(service_name, [], self._resolved_services, self._service_groups,
+                                        self._service_to_portset, portset.PortSet, "servicios")
+        return self._resolved_services[service_name]
+
+    def get_service_members(self, service_name):
+        """
+        Retorna los servicios (no grupos) que contiene un servicio o un grupo de servicios anidado:
+        frozenset de nombres, el propio nombre si no es un grupo. Los ciclos se ignoran.
+        """
+        self._load_services()
+
+        if service_name not in self._service_members:
+            members = set()
+            visited = set()
+            pending = [service_name]
+            while pending:
+                name = pending.pop()
+                if name in visited:
+                    continue
+                visited.add(name)
+                if name in self._service_groups:
+                    pending.extend(policyindex.as_list(self._service_groups[name].get('member')))
+                else:
+                    members.add(name)
+            self._service_members[service_name] = frozenset(members)
+        return self._service_members[service_name]
+
+    def is_all_service(self, service_name):
+        """
+        True si el servicio (no un grupo) es "ALL": todo el tráfico IP, no solo los puertos TCP/UDP/SCTP.
+        """
+        self._load_services()
+        if service_name in self._services:
+            svc_config = self._services[service_name]
+            return (svc_config.get('protocol', 'TCP/UDP/SCTP') == 'IP' and
+                    str(svc_config.get('protocol-number', '0')) == '0')
+        return service_name.lower() == "all"
+
+    def service_allows_all(self, service_name):
+        """
+        True si el servicio o grupo de servicios (anidado) contiene "ALL".
         """
-        ports = set() # Usamos un set para evitar puertos duplicados
+        return any(self.is_all_service(member) for member in self.get_service_members(service_name))
 
-        # Cargar servicios y grupos de servicios si no están ya cargados
+    def _load_services(self):
         if self._services is None:
             self._services = {s['edit']: s for s in self._get_edits_from_config("firewall service custom")}
         if self._service_groups is None:
             self._service_groups = {sg['edit']: sg for sg in self._get_edits_from_config("firewall service group")}
 
-        if service_name.lower() == "all":
-            # Si el servicio es "all", no podemos determinar puertos específicos.
-            # Para este chequeo, si una política usa "all", se considera una exposición genérica
-            # y no se buscarán puertos sensibles específicos en este método.
-            # El check de VIPs está buscando puertos concretos.
-            return [] 
+    def _resolve_group_closure(self, name, stack, resolved, groups, convert, result_class, label):
+        """
+        Resolución recursiva de un objeto o de un grupo (anidado) de objetos.
+        convert(name) resuelve un objeto que no es un grupo; resolved memoriza los resultados.
+        Retorna (resultado, profundidad mínima de la pila alcanzada por un ciclo).
+        Un resultado solo se memoriza cuando está completo, es decir cuando ningún ciclo
+        vuelve a un grupo que todavía se está resolviendo por encima de este.
+        """
+        if name in resolved:
+            return resolved[name], len(stack)
+        if name in stack:
+            self.display.log(f"ADVERTENCIA: Grupo de {label} cíclico: {' -> '.join(stack + [name])}", log_level="WARN")
+            return result_class(), stack.index(name)
 
-        # 1. Buscar en los servicios personalizados (custom services)
-        if service_name in self._services:
-            svc_config = self._services[service_name]
-            # FortiGate puede tener tcp-portrange, udp-portrange
-            if 'tcp-portrange' in svc_config:
-                self._add_ports_from_range(svc_config['tcp-portrange'], ports)
-            if 'udp-portrange' in svc_config:
-                self._add_ports_from_range(svc_config['udp-portrange'], ports)
-            # Podrías añadir lógica para otros protocolos si fueran relevantes y tuviesen puertos
-
-        # 2. Buscar en los grupos de servicios
-        elif service_name in self._service_groups:
-            group_config = self._service_groups[service_name]
-            if 'member' in group_config:
-                members = group_config['member']
-                if isinstance(members, list):
-                    for member_name in members:
-                        # Recursivamente resolvemos los miembros del grupo
-                        ports.update(self.resolve_service_to_ports(member_name))
-                elif isinstance(members, str): # Si solo hay un miembro
-                    ports.update(self.resolve_service_to_ports(members))
-        
-        # 3. Mapear servicios predefinidos de FortiGate a puertos conocidos
+        depth = len(stack)
+        low = depth
+        if name in groups:
+            members = []
+            stack.append(name)
+            for member_name in policyindex.as_list(groups[name].get('member')):
+                member_result, member_low = self._resolve_group_closure(member_name, stack, resolved, groups,
+                                                                        convert, result_class, label)
+                members.append(member_result)
+                low = min(low, member_low)
+            stack.pop()
+            result = result_class.union_all(members)
+        else:
+            result = convert(name)
+
+        if low >= depth:
+            resolved[name] = result
+        return result, low
+
+    def _service_to_portset(self, service_name):
+        """
+        Convierte un servicio custom en PortSet según su protocolo:
+        TCP/UDP/SCTP (tcp-portrange, udp-portrange, sctp-portrange), IP (protocol-number) o ICMP (sin puertos).
+        Los servicios que no están en "firewall service custom" se buscan entre los predefinidos.
+        """
+        if service_name not in self._services:
+            return self._predefined_service_to_portset(service_name)
+        svc_config = self._services[service_name]
+        protocol = svc_config.get('protocol', 'TCP/UDP/SCTP')
+        if protocol == 'IP':
+            # "ALL" es un servicio IP con protocol-number 0
+            number = str(svc_config.get('protocol-number', '0'))
+            protocols = {'0': portset.PROTOCOLS, '6': ('tcp',), '17': ('udp',), '132': ('sctp',)}.get(number, ())
+            return portset.PortSet.all(protocols)
+        if protocol != 'TCP/UDP/SCTP':
+            return portset.PortSet()
+
+        intervals = {}
+        for proto in portset.PROTOCOLS:
+            ranges = self._parse_portrange(svc_config.get(f'{proto}-portrange'))
+            if ranges:
+                intervals[proto] = ranges
+        return portset.PortSet(intervals)
+
+    def _predefined_service_to_portset(self, service_name):
+        # Servicios predefinidos de FortiGate a puertos conocidos, si no están en "firewall service custom".
         # Esta es una lista parcial, puedes expandirla según necesites
-        # Se verifica después de custom y grupos para darles prioridad
-        elif service_name.upper() == "TELNET":
-            ports.add(23)
-        elif service_name.upper() == "SSH":
-            ports.add(22)
-        elif service_name.upper() == "HTTP":
-            ports.add(80)
-        elif service_name.upper() == "HTTPS":
-            ports.add(443)
-        elif service_name.upper() == "DNS":
-            ports.add(53)
-        elif service_name.upper() == "MS_RDP": # Nombre común para el servicio RDP predefinido
-            ports.add(3389)
-        elif service_name.upper() == "MS_SQL": # Nombre común para el servicio SQL predefinido
-            ports.add(1433)
-        elif service_name.upper() == "MYSQL": # A veces también está como servicio predefinido
-            ports.add(3306)
-        elif service_name.upper() == "POSTGRESQL": # A veces también está como servicio predefinido
-            ports.add(5432)
-        # Añade más servicios predefinidos según los nombres exactos que aparezcan en tu config
-        # elif service_name.upper() == "FTP": ports.add(21)
-        # elif service_name.upper() == "SMTP": ports.add(25)
-        # etc.
-
-        return sorted(list(ports)) # Retornar una lista ordenada de puertos
-
-    def _add_ports_from_range(self, port_range_str, ports_set):
-        """Helper para parsear rangos de puertos como '80' o '1000-2000' o '80 443'."""
-        if not isinstance(port_range_str, str): 
-            return
-
-        parts = port_range_str.split() 
-        for part in parts:
-            if '-' in part:
-                try:
-                    start, end = map(int, part.split('-'))
-                    for p in range(start, end + 1):
-                        ports_set.add(p)
-                except ValueError:
-                    self.display.log(f"ADVERTENCIA: Rango de puerto inválido encontrado: '{part}'", log_level="WARN")
-            else:
+        if service_name.lower() == "all":
+            return portset.PortSet.all()
+        predefined = {
+            "TELNET": {"tcp": [(23, 23)]},
+            "SSH": {"tcp": [(22, 22)]},
+            "HTTP": {"tcp": [(80, 80)]},
+            "HTTPS": {"tcp": [(443, 443)]},
+            "DNS": {"tcp": [(53, 53)], "udp": [(53, 53)]},
+            "MS_RDP": {"tcp": [(3389, 3389)]}, # Nombre común para el servicio RDP predefinido
+            "MS_SQL": {"tcp": [(1433, 1433)]}, # Nombre común para el servicio SQL predefinido
+            "MYSQL": {"tcp": [(3306, 3306)]},
+            "POSTGRESQL": {"tcp": [(5432, 5432)]},
+        }
+        return portset.PortSet(predefined.get(service_name.upper()))
+
+    def _parse_portrange(self, port_range):
+        """
+        Parsea rangos de puertos como '80', '1000-2000', '80 443' o con puertos de origen '80:1024-2000'.
+        Retorna la lista de intervalos (inicio, fin) de puertos de DESTINO.
+        """
+        ranges = []
+        for part in policyindex.as_list(port_range):
+            for item in str(part).split():
+                destination = item.split(':', 1)[0] # Lo que sigue a ':' son los puertos de origen
+                low, _, high = destination.partition('-')
                 try:
-                    ports_set.add(int(part))
+                    start = int(low)
+                    end = int(high) if high else start
                 except ValueError:
-                    self.display.log(f"ADVERTENCIA: Puerto inválido encontrado: '{part}'", log_level="WARN")
-                    pass
+                    self.display.log(f"ADVERTENCIA: Rango de puerto inválido encontrado: '{item}'", log_level="WARN")
+                    continue
+                if start > end:
+                    start, end = end, start
+                ranges.append((start, end))
+        return ranges
 
+    def resolve_service_to_ports(self, service_name):
+        """
+        Resuelve un nombre de servicio FortiGate (predeterminado o custom)
+        o un grupo de servicios a una lista de números de puerto (integers).
+        Expande los intervalos: preferir resolve_service() para consultas.
+        """
+        if service_name.lower() == "all":
+            # Si el servicio es "all", no podemos determinar puertos específicos.
+            return []
+        return self.resolve_service(service_name).ports()
     # --- FIN NUEVO MÉTODO: resolve_service_to_ports ---
 
+    # --- Resolución de objetos de dirección ---
+    def resolve_address(self, address_name):
+        """
+        Resuelve un objeto de dirección IPv4 ("firewall address"), un grupo ("firewall addrgrp", anidado)
+        o una VIP / grupo de VIPs (su extip) a un AddressSet de intervalos de IPs.
+        Los objetos que no se pueden resolver sin conexión (fqdn, geography, dynamic...) quedan
+        como "unresolved". El resultado se memoriza por nombre.
+        """
+        self._load_addresses()
+
+        if address_name not in self._resolved_addresses:
+            self._resolve_group_closure(address_name, [], self._resolved_addresses, self._address_groups,
+                                        self._address_to_addressset, addressset.AddressSet, "direcciones")
+        return self._resolved_addresses[address_name]
+
+    def resolve_address6(self, address_name):
+        """
+        Igual que resolve_address para IPv6 ("firewall address6" y "firewall addrgrp6").
+        """
+        self._load_addresses()
+
+        if address_name not in self._resolved_addresses6:
+            self._resolve_group_closure(address_name, [], self._resolved_addresses6, self._address_groups6,
+                                        self._address6_to_addressset, addressset.AddressSet, "direcciones IPv6")
+        return self._resolved_addresses6[address_name]
+
+    def _load_addresses(self):
+        if self._addresses is None:
+            self._addresses = {a['edit']: a for a in self._get_edits_from_config("firewall address")}
+            self._address_groups = {g['edit']: g for g in self._get_edits_from_config("firewall addrgrp")}
+        if self._addresses6 is None:
+            self._addresses6 = {a['edit']: a for a in self._get_edits_from_config("firewall address6")}
+            self._address_groups6 = {g['edit']: g for g in self._get_edits_from_config("firewall addrgrp6")}
+
+    def resolve_addresses(self, address_names, ipv6=False):
+        """
+        Retorna la unión de varios objetos de dirección (por ejemplo el srcaddr de una política).
+        """
+        resolve = self.resolve_address6 if ipv6 else self.resolve_address
+        return addressset.AddressSet.union_all(resolve(name) for name in policyindex.as_list(address_names))
+
+    def _address_to_addressset(self, address_name):
+        address = self._addresses.get(address_name)
+        try:
+            if address is None:
+                # Las VIPs también se usan como dstaddr: se resuelven a su IP externa
+                vips = self.get_vip_catalog().resolve(address_name)
+                if vips:
+                    ranges = []
+                    for vip in vips:
+                        for extip in policyindex.as_list(vip.get('extip', '0.0.0.0')):
+                            ranges.extend(self._parse_ip_range(extip))
+                    return addressset.AddressSet({4: ranges})
+                if address_name == "all":
+                    return addressset.AddressSet.all([4])
+                return addressset.AddressSet(unresolved=[address_name])
+
+            address_type = address.get('type', 'ipmask')
+            if address_type in ('ipmask', 'interface-subnet'):
+                subnet = policyindex.as_list(address.get('subnet', ['0.0.0.0', '0.0.0.0']))
+                if len(subnet) == 1:
+                    subnet = subnet[0].split('/')
+                return addressset.AddressSet({4: addressset.ipv4_subnet(subnet[0], subnet[1])})
+            if address_type == 'iprange':
+                start_ip = address.get('start-ip', '0.0.0.0')
+                return addressset.AddressSet({4: self._parse_ip_range(f"{start_ip}-{address.get('end-ip', start_ip)}")})
+            if address_type == 'wildcard':
+                wildcard = policyindex.as_list(address.get('wildcard', ['0.0.0.0', '0.0.0.0']))
+                return addressset.AddressSet({4: addressset.ipv4_subnet(wildcard[0], wildcard[1])})
+        except (OSError, ValueError, IndexError):
+            self.display.log(f"ADVERTENCIA: Dirección inválida encontrada: '{address_name}'", log_level="WARN")
+        # fqdn, geography, dynamic, mac... no se pueden resolver a IPs sin conexión
+        return addressset.AddressSet(unresolved=[address_name])
+
+    def _address6_to_addressset(self, address_name):
+        address = self._addresses6.get(address_name)
+        if address is None:
+            if address_name == "all":
+                return addressset.AddressSet.all([6])
+            return addressset.AddressSet(unresolved=[address_name])
+
+        address_type = address.get('type', 'ipprefix')
+        try:
+            if address_type == 'ipprefix':
+                return addressset.AddressSet({6: addressset.ipv6_prefix(address.get('ip6', '::/0'))})
+            if address_type == 'iprange':
+                start_ip = address.get('start-ip', '::')
+                start = addressset.ipv6_to_int(start_ip)
+                end = addressset.ipv6_to_int(address.get('end-ip', start_ip))
+                return addressset.AddressSet({6: [(min(start, end), max(start, end))]})
+        except (OSError, ValueError):
+            self.display.log(f"ADVERTENCIA: Dirección IPv6 inválida encontrada: '{address_name}'", log_level="WARN")
+        return addressset.AddressSet(unresolved=[address_name])
+
+    def _parse_ip_range(self, ip_range):
+        # "10.0.0.1" o "10.0.0.1-10.0.0.9" -> [(inicio, fin)]
+        start_ip, _, end_ip = ip_range.partition('-')
+        start = addressset.ipv4_to_int(start_ip)
+        end = addressset.ipv4_to_int(end_ip) if end_ip else start
+        return [(min(start, end), max(start, end))]
+    # --- FIN Resolución de objetos de dirección ---
+
+    # Configures the worker processes of the policy shadowing analysis
+    def set_policy_workers(self, workers):
+        self.policy_workers = max(1, workers)
+
+    def get_covered_policies(self):
+        """
+        Retorna las políticas cubiertas por completo por una política anterior (ver shadowing),
+        en orden de evaluación: {"policy", "covered_by", "type": "shadowed" | "redundant"}.
+        Se calcula una sola vez; con policy_workers > 1 las tablas grandes se reparten entre procesos.
+        """
+        if self._covered_policies is None:
+            zones = {zone['edit']: policyindex.as_list(zone.get('interface')) for zone in self.get_zones()}
+            matches = []
+            for policy in self.get_policies():
+                match = self._policy_match(policy, zones)
+                if match is not None:
+                    matches.append(match)
+            self._covered_policies = shadowing.find_covered_policies(matches, self.policy_workers)
+        return self._covered_policies
+
+    def _policy_match(self, policy, zones):
+        """
+        Resuelve lo que cubre una política (interfaces, direcciones, servicios...) a un PolicyMatch.
+        Retorna None si la política no se puede comparar: deshabilitada, con negaciones o con internet services.
+        """
+        if policy.get('status', 'enable') != 'enable':
+            return None
+        for field in ('srcaddr-negate', 'dstaddr-negate', 'service-negate', 'internet-service', 'internet-service-src',
+                      'srcaddr6-negate', 'dstaddr6-negate', 'internet-service6', 'internet-service6-src'):
+            if policy.get(field) == 'enable':
+                return None
+
+        interfaces = []
+        for field in ('srcintf', 'dstintf'):
+            names = policyindex.as_list(policy.get(field))
+            if shadowing.ANY_INTERFACE in names:
+                interfaces.append(None)
+            else:
+                # Una zona cubre sus interfaces
+                interfaces.append(frozenset(member for name in names for member in zones.get(name, [name])))
+
+        identities = frozenset([f'user:{name}' for name in policyindex.as_list(policy.get('users'))] +
+                               [f'group:{name}' for name in policyindex.as_list(policy.get('groups'))])
+
+        addresses = []
+        for field in ('srcaddr', 'dstaddr'):
+            addresses.append(addressset.AddressSet.union_all([self.resolve_addresses(policy.get(field)),
+                                                              self.resolve_addresses(policy.get(f'{field}6'), ipv6=True)]))
+
+        services = policyindex.as_list(policy.get('service'))
+        members = frozenset().union(*(self.get_service_members(name) for name in services))
+        all_services = any(self.is_all_service(member) for member in members)
+        # Servicios sin puertos (ICMP, protocolos IP), también dentro de grupos: se comparan por nombre.
+        # Solo ALL cubre a ALL (incluye tráfico que no es TCP/UDP/SCTP)
+        opaque_services = {member for member in members
+                           if not self.is_all_service(member) and not self.resolve_service(member)}
+        if all_services:
+            opaque_services.add(shadowing.ALL_SERVICES)
+        return shadowing.PolicyMatch(
+            policy,
+            policy.get('action', 'deny'),
+            policy.get('schedule', shadowing.ANY_SCHEDULE),
+            interfaces[0],
+            interfaces[1],
+            identities or None,
+            addresses[0],
+            addresses[1],
+            portset.PortSet.union_all([self.resolve_service(name) for name in services]),
+            frozenset(opaque_services),
+            all_services,
+        )
+
     # Returns ips sensors. Allows filtering
     def get_ips_sensors(self, names=None):
         return self._get_edits_from_config("ips sensor")
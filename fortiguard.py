@@ -1,61 +1,156 @@
-import csv
+import marshal
+import os
+import sys
+from pathlib import Path
+
+# Fortiguard application control database (libs/FortigateAppControlID).
+#
+# The CSV files are compiled once to a marshal file holding the lookup dicts ready to
+# use (no CSV parsing at load time), in the cache directory. The compiled file records
+# the size and modification time of the CSV files and is rebuilt automatically when
+# they change, or explicitly with "python3 fortiguard.py". The database is loaded on
+# the first lookup and shared by every Fortiguard object of the process.
+
+DATABASE_VERSION = 1
+
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'libs', 'FortigateAppControlID')
+SOURCE_FILES = ('Categories.csv', 'Applications.csv', 'Table.csv')
+
+# marshal format depends on the Python version
+COMPILED_PATH = str(Path.home()) + f'/.cache/fortigate-security-auditor/fortiguard-{sys.implementation.cache_tag}.bin'
+
+# Database shared by the Fortiguard objects (see load_database)
+_database = None
+
+
+def _source_signature():
+    signature = [DATABASE_VERSION]
+    for name in SOURCE_FILES:
+        stat = os.stat(os.path.join(SOURCE_DIRECTORY, name))
+        signature.append((name, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def _read_csv(name):
+    # Only needed to compile the database (startup time, see auditor.py)
+    import csv
+
+    # Rows without the column titles (the files start with a BOM)
+    with open(os.path.join(SOURCE_DIRECTORY, name), encoding='utf-8-sig', newline='') as data:
+        rows = csv.reader(data, delimiter=";")
+        next(rows, None)
+        return [row for row in rows if row]
+
+
+def compile_database():
+    """
+    Parses the CSV files to the lookup dicts of the database.
+    """
+    database = {
+        "signature": _source_signature(),
+        "category_ids": {},        # id -> name
+        "category_names": {},      # name -> id
+        "application_ids": {},     # id -> name
+        "application_names": {},   # name -> id
+        "application_categories": {},  # application id -> category id
+    }
+    for name, category_id in _read_csv('Categories.csv'):
+        database["category_ids"][category_id] = name
+        database["category_names"][name] = category_id
+
+    for name, application_id in _read_csv('Applications.csv'):
+        database["application_ids"][application_id] = name
+        database["application_names"][name] = application_id
+
+    # APP ID;APP;CAT ID;CATEGORY;TECHNOLOGY
+    for row in _read_csv('Table.csv'):
+        database["application_categories"][row[0]] = row[2]
+    return database
+
+
+def load_database(rebuild=False, compiled_path=COMPILED_PATH):
+    """
+    Returns the database, loaded once per process from the compiled file.
+    The compiled file is (re)built when missing, outdated or when rebuild is True.
+    """
+    global _database
+    if _database is not None and not rebuild:
+        return _database
+
+    database = None
+    if not rebuild:
+        try:
+            with open(compiled_path, 'rb') as compiled_file:
+                database = marshal.loads(compiled_file.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            database = None
+        if database is not None and database.get("signature") != _source_signature():
+            database = None
+
+    if database is None:
+        print("[+] Compiling fortiguard items")
+        database = compile_database()
+        print(f'[-] {len(database["category_ids"])} categories, {len(database["application_ids"])} applications imported')
+        try:
+            os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+            tmp_path = f'{compiled_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as compiled_file:
+                marshal.dump(database, compiled_file)
+            os.replace(tmp_path, compiled_path)
+        except OSError as e:
+            # Read-only cache: the database is compiled again by the next process
+            print(f'[!] Cannot save the compiled fortiguard database: {e}')
+
+    _database = database
+    return database
+
 
 class Fortiguard:
-    
+
     def __init__(self, verbose=False):
-        
-        print("[+] Loading fortiguard items")
-
-        # Load fortiguard categories from files
-        self.category_ids = {}
-        self.category_names = {}
-        i = 0
-        with open("libs/FortigateAppControlID/Categories.csv", "r+") as data:
-            for line in csv.reader(data, delimiter=";"):
-                if i > 0:
-                    # Do not take into account column titles
-                    self.category_ids[line[1]] = line[0]
-                    self.category_names[line[0]] = line[1]
-                i += 1
-
-        print(f'[-] {i} categories imported')
-        
-        
-        # Load fortiguard applications from files
-        self.application_ids = {}
-        self.application_names = {}
-        i = 0
-        with open("libs/FortigateAppControlID/Applications.csv", "r+") as data:
-            for line in csv.reader(data, delimiter=";"):
-                if i > 0:
-                    # Do not take into account column titles
-                    self.application_ids[line[1]] = line[0]
-                    self.application_names[line[0]] = line[1]
-                i += 1
-
-        print(f'[-] {i} applications imported')
-        
+        # Nothing is loaded until the first lookup
+        self.verbose = verbose
+
+    @property
+    def category_ids(self):
+        return load_database()["category_ids"]
+
+    @property
+    def category_names(self):
+        return load_database()["category_names"]
+
+    @property
+    def application_ids(self):
+        return load_database()["application_ids"]
+
+    @property
+    def application_names(self):
+        return load_database()["application_names"]
+
     def category_id_from_name(self, name):
-        if name in self.category_names.keys():
-            return self.category_names[name]
-        else:
-            return None
-    
+        return self.category_names.get(name)
+
     def category_name_from_id(self, id):
-        if id in self.category_ids.keys():
-            return self.category_ids[id]
-        else:
-            return None
-    
+        return self.category_ids.get(id)
+
     def application_id_from_name(self, name):
-        if name in self.application_names.keys():
-            return self.application_names[name]
-        else:
-            return None
-    
+        return self.application_names.get(name)
+
     def application_name_from_id(self, id):
-        if id in self.application_ids.keys():
-            return self.application_ids[id]
-        else:
-            return None
-    
\ No newline at end of file
+        return self.application_ids.get(id)
+
+    def application_category_id(self, id):
+        """
+        Returns the category id of an application id (Table.csv), or None.
+        """
+        return load_database()["application_categories"].get(id)
+
+    def application_category_name(self, id):
+        category_id = self.application_category_id(id)
+        return None if category_id is None else self.category_name_from_id(category_id)
+
+
+if __name__ == '__main__':
+    # Rebuild step, for instance after updating libs/FortigateAppControlID
+    database = load_database(rebuild=True)
+    print(f'[+] Compiled fortiguard database written to {COMPILED_PATH}')
@@ -0,0 +1,165 @@
+import re
+
+# Native parser for FortiOS "show full-configuration" backups.
+#
+# It reads the file once, line by line, and builds the same "configs" structure
+# fortios_xutils produced (a list of dicts with "config", "edit", "configs",
+# "edits" and one key per "set" line) so the Firewall class can consume it
+# without the temporary copy and JSON dump of the old parsing path.
+
+# Bump when the produced structure changes (used to invalidate cached results)
+PARSER_VERSION = 1
+
+# A value is either an unquoted token or a quoted string
+WORD_RE = re.compile(r'([^" \t\n\r\f\v]+)|"([^"]+)"')
+
+
+def _split_values(text):
+    if '"' not in text:
+        return text.split()
+    return [unquoted or quoted for unquoted, quoted in WORD_RE.findall(text)]
+
+
+def _value(values):
+    # A single value is stored as a scalar, several values as a list
+    if values is None or len(values) != 1:
+        return values
+    return values[0]
+
+
+def _parse_comment(content, comments):
+    # Structured comments look like "#config-version=FG100F-7.0.12:opmode=0:vdom=0"
+    try:
+        items = dict(kv.split('=') for kv in content.split(':'))
+    except ValueError:
+        return
+    comments.update(items)
+
+
+class _Node:
+    __slots__ = ('kind', 'name', 'values', 'configs', 'edits')
+
+    def __init__(self, kind, name):
+        self.kind = kind # "config" or "edit"
+        self.name = name
+        self.values = {kind: name}
+        self.configs = []
+        self.edits = []
+
+    def set(self, key, value):
+        if key == self.kind:
+            # "set config read" (config loggrp-permission) would overwrite the block name.
+            # Keep it under the same key the former --autofix workaround used.
+            key = f'{key}xxx'
+        self.values[key] = value
+
+    def to_dict(self):
+        block = self.values
+        if self.configs:
+            block["configs"] = self.configs
+        if self.edits:
+            block["edits"] = self.edits
+        return block
+
+
+def parse_lines(lines):
+    """
+    Parses an iterable of configuration lines (for instance an open file).
+    Returns the list of top-level config blocks.
+    """
+    configs = []
+    comments = {"comments": []}
+    stack = []
+    multiline = None # (node, key, values) of a "set" whose quoted value spans several lines
+
+    for line in lines:
+        if multiline is not None:
+            if line.isspace():
+                continue
+            node, key, values = multiline
+            quote = line.find('"')
+            if quote < 0:
+                values[-1] += line
+            else:
+                values[-1] += line[:quote]
+                node.set(key, _value(values))
+                multiline = None
+            continue
+
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        if stripped[0] == '#':
+            content = stripped[1:].strip()
+            comments["comments"].append(content)
+            _parse_comment(content, comments)
+            continue
+
+        keyword, _, rest = stripped.partition(' ')
+        rest = rest.lstrip()
+
+        if keyword == 'set' or keyword == 'unset':
+            if not stack or not rest:
+                continue
+            key, _, text = rest.partition(' ')
+            text = text.lstrip()
+            if not text:
+                stack[-1].set(key, None)
+                continue
+            if keyword == 'set' and text.count('"') % 2 == 1:
+                # Quoted value not closed on this line: keep reading until the closing quote
+                values = _split_values(text[:text.rfind('"')])
+                values.append(line[line.rfind('"') + 1:])
+                multiline = (stack[-1], key, values)
+                continue
+            stack[-1].set(key, _value(_split_values(text)))
+
+        elif keyword == 'config':
+            if rest:
+                stack.append(_Node('config', rest))
+
+        elif keyword == 'edit':
+            match = WORD_RE.fullmatch(rest)
+            if match:
+                stack.append(_Node('edit', match.group(1) or match.group(2)))
+
+        elif keyword == 'next':
+            if stack and stack[-1].kind == 'edit':
+                _close(stack, configs)
+
+        elif keyword == 'end':
+            if not stack:
+                continue
+            if stack[-1].kind == 'config':
+                _close(stack, configs)
+            elif len(stack) > 1 and stack[-2].name == 'vdom' and stack[-2].kind == 'config':
+                # "config vdom" / "edit <vdom>" blocks are closed by "end" without "next"
+                _close(stack, configs)
+                _close(stack, configs)
+
+    if comments["comments"]:
+        configs.append(comments)
+
+    return configs
+
+
+def _close(stack, configs):
+    node = stack.pop()
+    block = node.to_dict()
+    if not stack:
+        configs.append(block)
+    elif node.kind == 'edit':
+        stack[-1].edits.append(block)
+    else:
+        stack[-1].configs.append(block)
+
+
+def parse_file(filepath, errors='strict'):
+    """
+    Parses a configuration file exported from the fortigate or fortimanager.
+    With errors='strict' a UnicodeDecodeError is raised on non utf-8 characters,
+    errors='ignore' drops them.
+    """
+    with open(filepath, 'r', encoding='utf-8', errors=errors) as file:
+        return parse_lines(file)
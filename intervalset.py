@@ -0,0 +1,137 @@
+from bisect import bisect_right
+
+# Sets of integers stored as sorted, merged intervals, split by kind
+# (a protocol for ports, an IP family for addresses).
+#
+# Membership, range overlap and range containment queries are O(log n) (bisect),
+# union and intersection are linear merges of the sorted intervals.
+
+
+def merge(intervals):
+    """
+    Sorts and merges overlapping or adjacent (start, end) intervals.
+    """
+    if len(intervals) == 1:
+        return list(intervals)
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def intersect(ranges, other_ranges):
+    """
+    Returns the intersection of two sorted, merged interval lists.
+    """
+    common = []
+    i = j = 0
+    while i < len(ranges) and j < len(other_ranges):
+        start = max(ranges[i][0], other_ranges[j][0])
+        end = min(ranges[i][1], other_ranges[j][1])
+        if start <= end:
+            common.append((start, end))
+        if ranges[i][1] < other_ranges[j][1]:
+            i += 1
+        else:
+            j += 1
+    return common
+
+
+class IntervalSet:
+    __slots__ = ('intervals', '_starts')
+
+    def __init__(self, intervals=None):
+        """
+        intervals: dict kind -> iterable of (start, end) ranges (inclusive).
+        """
+        self.intervals = {}
+        self._starts = {}
+        for kind, ranges in (intervals or {}).items():
+            merged = merge(ranges)
+            if merged:
+                self.intervals[kind] = merged
+                self._starts[kind] = [start for start, end in merged]
+
+    def _find(self, kind, value):
+        # Interval of kind starting at or before value, None if there is none
+        starts = self._starts.get(kind)
+        if not starts:
+            return None
+        position = bisect_right(starts, value) - 1
+        return self.intervals[kind][position] if position >= 0 else None
+
+    def overlaps_range(self, start, end, kind=None):
+        """
+        Returns True if any value in start-end (of kind, or any kind) is in the set.
+        """
+        for current in self._starts:
+            if kind is not None and current != kind:
+                continue
+            interval = self._find(current, end)
+            if interval is not None and interval[1] >= start:
+                return True
+        return False
+
+    def covers_range(self, start, end, kind):
+        """
+        Returns True if every value in start-end (of kind) is in the set.
+        """
+        interval = self._find(kind, start)
+        return interval is not None and interval[1] >= end
+
+    def overlaps(self, other):
+        """
+        Returns True if both sets have a common value.
+        """
+        for kind, ranges in other.intervals.items():
+            if kind not in self.intervals:
+                continue
+            smaller, larger = (ranges, self) if len(ranges) <= len(self.intervals[kind]) else (self.intervals[kind], other)
+            for start, end in smaller:
+                if larger.overlaps_range(start, end, kind):
+                    return True
+        return False
+
+    def covers(self, other):
+        """
+        Returns True if every value of other is in this set.
+        """
+        for kind, ranges in other.intervals.items():
+            for start, end in ranges:
+                if not self.covers_range(start, end, kind):
+                    return False
+        return True
+
+    def union(self, other):
+        return type(self).union_all((self, other))
+
+    @classmethod
+    def union_all(cls, interval_sets):
+        """
+        Returns the union of several sets, merged once.
+        """
+        intervals = {}
+        for interval_set in interval_sets:
+            for kind, ranges in interval_set.intervals.items():
+                intervals.setdefault(kind, []).extend(ranges)
+        return cls(intervals)
+
+    def intersection(self, other):
+        intervals = {}
+        for kind, ranges in self.intervals.items():
+            other_ranges = other.intervals.get(kind)
+            if other_ranges:
+                common = intersect(ranges, other_ranges)
+                if common:
+                    intervals[kind] = common
+        return type(self)(intervals)
+
+    def __bool__(self):
+        return bool(self.intervals)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.intervals == other.intervals
@@ -0,0 +1,215 @@
+import bisect
+import difflib
+
+# Line diff of long reports, anchored on the lines that occur once.
+#
+# difflib.SequenceMatcher looks for the longest matching block of every region, which
+# is close to quadratic on reports made of thousands of similar or repeated lines
+# ("No logging for rule ..."). Here, as in the patience diff of git, lines are first
+# replaced by integers (one dict lookup per line), then each region is split on the
+# lines that occur exactly once in both versions, kept in order (longest increasing
+# subsequence, O(k log k)); the matches are extended around each anchor and the
+# regions in between are split again the same way. A region without any unique common
+# line is split on the lines occurring as many times in both versions instead (k-th
+# occurrence with k-th occurrence). Only the regions without either fall back to
+# SequenceMatcher, when they are small enough (FALLBACK_SIZE), and are reported as
+# replaced otherwise.
+#
+# The output of unified_diff() has the same format as difflib.unified_diff().
+
+DEFAULT_CONTEXT = 3
+
+# Largest len(a) * len(b) of a region without anchors compared with SequenceMatcher
+FALLBACK_SIZE = 250000
+
+
+def _anchors(a, b, alo, ahi, blo, bhi, unique=True):
+    """
+    Pairs (i, j) of the lines occurring once in a[alo:ahi] and once in b[blo:bhi] (or, if not
+    unique, of the k-th occurrences of the lines occurring as many times in both), the longest
+    subsequence increasing in both i and j.
+    """
+    if unique:
+        positions = {}
+        for i in range(alo, ahi):
+            line = a[i]
+            positions[line] = -1 if line in positions else i
+        candidates = {}
+        for j in range(blo, bhi):
+            line = b[j]
+            if positions.get(line, -1) >= 0:
+                candidates[line] = -1 if line in candidates else j
+        pairs = sorted((positions[line], j) for line, j in candidates.items() if j >= 0)
+    else:
+        positions = {}
+        for i in range(alo, ahi):
+            positions.setdefault(a[i], []).append(i)
+        candidates = {}
+        for j in range(blo, bhi):
+            if b[j] in positions:
+                candidates.setdefault(b[j], []).append(j)
+        pairs = sorted(pair for line, js in candidates.items() if len(js) == len(positions[line])
+                       for pair in zip(positions[line], js))
+    if not pairs:
+        return []
+
+    # Patience sorting: tails[k] is the smallest j ending an increasing subsequence of length k+1
+    tails = []
+    tail_indices = []
+    previous = [0] * len(pairs)
+    for index, (i, j) in enumerate(pairs):
+        k = bisect.bisect_left(tails, j)
+        previous[index] = tail_indices[k - 1] if k else -1
+        if k == len(tails):
+            tails.append(j)
+            tail_indices.append(index)
+        else:
+            tails[k] = j
+            tail_indices[k] = index
+    anchors = []
+    index = tail_indices[-1]
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def matching_blocks(a, b):
+    """
+    Matching blocks of the sequences of lines a and b, as SequenceMatcher.get_matching_blocks():
+    sorted (i, j, size) triples, ending with (len(a), len(b), 0).
+    """
+    # Lines replaced by integers: hashed and compared once
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in a]
+    b = [ids.setdefault(line, len(ids)) for line in b]
+
+    blocks = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+        # Common prefix and suffix
+        start = alo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > start:
+            blocks.append((start, blo - (alo - start), alo - start))
+        end = ahi
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        if end > ahi:
+            blocks.append((ahi, bhi, end - ahi))
+        if alo == ahi or blo == bhi:
+            continue
+
+        # Lines repeated as many times in both versions when no line is unique
+        anchors = _anchors(a, b, alo, ahi, blo, bhi) or _anchors(a, b, alo, ahi, blo, bhi, unique=False)
+        if anchors:
+            for i, j in anchors:
+                regions.append((alo, i, blo, j))
+                blocks.append((i, j, 1))
+                alo, blo = i + 1, j + 1
+            regions.append((alo, ahi, blo, bhi))
+        elif (ahi - alo) * (bhi - blo) <= FALLBACK_SIZE:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            blocks.extend((alo + i, blo + j, size) for i, j, size in matcher.get_matching_blocks() if size)
+        # else: no anchor in a large region, reported as replaced
+
+    # Adjacent blocks merged (as SequenceMatcher does)
+    blocks.sort()
+    merged = []
+    for i, j, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    merged.append((len(a), len(b), 0))
+    return merged
+
+
+def opcodes(a, b):
+    """
+    Operations turning a into b, as SequenceMatcher.get_opcodes().
+    """
+    codes = []
+    i = j = 0
+    for ai, bj, size in matching_blocks(a, b):
+        if i < ai and j < bj:
+            codes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            codes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            codes.append(('insert', i, ai, j, bj))
+        if size:
+            codes.append(('equal', ai, ai + size, bj, bj + size))
+        i, j = ai + size, bj + size
+    return codes
+
+
+def grouped_opcodes(codes, n=DEFAULT_CONTEXT):
+    """
+    Hunks of opcodes with up to n lines of context, as SequenceMatcher.get_grouped_opcodes().
+    """
+    if not codes:
+        codes = [('equal', 0, 1, 0, 1)]
+    codes = list(codes)
+    # Context trimmed at both ends
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        # Long unchanged blocks split the hunks
+        if tag == 'equal' and i2 - i1 > n * 2:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _format_range(start, stop):
+    # Same as difflib: "start,length", 1-based, "start" alone for one line
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
+
+def unified_diff(a, b, fromfile='', tofile='', n=DEFAULT_CONTEXT, lineterm='\n'):
+    """
+    Differences between the lists of lines a and b, in unified format with n lines of
+    context: the same format as difflib.unified_diff(), in near-linear time on reports.
+    """
+    started = False
+    for group in grouped_opcodes(opcodes(a, b), n):
+        if not started:
+            started = True
+            yield f'--- {fromfile}{lineterm}'
+            yield f'+++ {tofile}{lineterm}'
+
+        first, last = group[0], group[-1]
+        yield f'@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@{lineterm}'
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                for line in a[i1:i2]:
+                    yield ' ' + line
+                continue
+            if tag in ('replace', 'delete'):
+                for line in a[i1:i2]:
+                    yield '-' + line
+            if tag in ('replace', 'insert'):
+                for line in b[j1:j2]:
+                    yield '+' + line
@@ -0,0 +1,138 @@
+import concurrent.futures
+import functools
+import gc
+import io
+import multiprocessing
+import sys
+import threading
+
+# Parallel execution of the automatic checks and of the audits of a fleet.
+#
+# Automatic checks only read the parsed configuration, so they can run at the same
+# time: in forked worker processes (the configuration is inherited, not copied) or in
+# threads. The console output of each task is captured and replayed by the main
+# process in task order, so the output is the same as a serial run.
+
+# Checker attributes sent back by the workers
+RESULT_ATTRIBUTES = ("result", "success", "messages", "current_summary_message", "log_messages",
+                     "question_context", "question", "answer", "manual_entry")
+
+# Tasks inherited by the forked workers (see CapturePool)
+_tasks = []
+
+
+class _CapturedStream:
+    """
+    sys.stdout / sys.stderr replacement writing to the capture of the current thread, if any.
+    """
+
+    def __init__(self, stream, name, local):
+        self.stream = stream
+        self.name = name
+        self.local = local
+
+    def write(self, text):
+        capture = getattr(self.local, "capture", None)
+        if capture is None:
+            return self.stream.write(text)
+        capture.append((self.name, text))
+        return len(text)
+
+    def flush(self):
+        if getattr(self.local, "capture", None) is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+# Capture of the output of the task running in the current thread: list of (stream name, text)
+_local = threading.local()
+
+
+def _run(index):
+    _local.capture = []
+    try:
+        return _local.capture, _tasks[index]()
+    finally:
+        _local.capture = None
+
+
+class CapturePool:
+
+    def __init__(self, tasks, jobs, threads=False):
+        """
+        Starts running the tasks (functions without arguments) on jobs workers: processes when
+        fork is available (unless threads is True), threads otherwise. With processes, the
+        results of the tasks must be picklable.
+        """
+        global _tasks
+        _tasks = list(tasks)
+        self.streams = {"stdout": sys.stdout, "stderr": sys.stderr}
+        sys.stdout = _CapturedStream(self.streams["stdout"], "stdout", _local)
+        sys.stderr = _CapturedStream(self.streams["stderr"], "stderr", _local)
+
+        if threads or 'fork' not in multiprocessing.get_all_start_methods():
+            self.executor = concurrent.futures.ThreadPoolExecutor(jobs)
+            self.frozen = False
+        else:
+            # Objects inherited by the workers moved out of the collected generations while they
+            # are forked: collections in the workers do not touch (and copy) their memory pages
+            gc.freeze()
+            self.frozen = True
+            self.executor = concurrent.futures.ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context('fork'))
+        self.futures = [self.executor.submit(_run, index) for index in range(len(_tasks))]
+
+    def result(self, index):
+        """
+        Waits for the task at index, replays its output and returns its result.
+        Raises the exception of the task, or of the worker running it.
+        """
+        output, result = self.futures[index].result()
+        # Same interleaving of stdout and stderr as a serial run
+        for stream_name, text in output:
+            stream = self.streams[stream_name]
+            stream.write(text)
+            stream.flush()
+        return result
+
+    def close(self):
+        global _tasks
+        self.executor.shutdown(cancel_futures=True)
+        if self.frozen:
+            gc.unfreeze()
+        sys.stdout = self.streams["stdout"]
+        sys.stderr = self.streams["stderr"]
+        _tasks = []
+
+
+def _run_checker(checker):
+    checker.run()
+    return {attribute: getattr(checker, attribute, None) for attribute in RESULT_ATTRIBUTES}
+
+
+class CheckPool(CapturePool):
+
+    def __init__(self, checkers, jobs, threads=False):
+        """
+        Starts running the checkers (automatic checks), see CapturePool.
+        """
+        self.indexes = {id(checker): index for index, checker in enumerate(checkers)}
+        super().__init__([functools.partial(_run_checker, checker) for checker in checkers], jobs, threads)
+
+    def __contains__(self, checker):
+        return id(checker) in self.indexes
+
+    def collect(self, checker):
+        """
+        Waits for the result of checker, replays its output and restores its results.
+        A check whose worker failed is run again here.
+        """
+        try:
+            state = self.result(self.indexes[id(checker)])
+        except Exception as e:
+            print(f'[!] Parallel execution of {checker.get_id()} failed ({e}), running it again')
+            checker.run()
+            return
+        for attribute, value in state.items():
+            setattr(checker, attribute, value)
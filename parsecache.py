@@ -0,0 +1,152 @@
+import gc
+import hashlib
+import marshal
+import os
+import sys
+
+import fortios
+
+# On-disk cache of parsed configurations.
+#
+# Entries are keyed by the SHA-256 of the raw backup bytes plus the parser version,
+# so re-auditing the same backup (playbook retries, other --levels/--ids) skips the
+# parsing entirely. Entries are stored with marshal, which loads several times faster
+# than re-parsing. The directory is bounded in size: the least recently used entries
+# are removed first (file mtime is refreshed on every hit). A cache that cannot be
+# read or written (permissions, full disk, entry evicted by another process) is
+# skipped: the audit goes on without it.
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024 # bytes
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ParseCache:
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.enabled = True
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            print(f'[!] Cannot use parse cache: {e}')
+            self.enabled = False
+
+    def key(self, filepath, errors='strict'):
+        """
+        Returns the cache key of a configuration file: hash of its bytes, decoding
+        errors mode (a lossy parse is not a strict one), parser version and marshal
+        format (which depends on the Python version).
+        """
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        digest.update(f':{errors}:{fortios.PARSER_VERSION}:{sys.implementation.cache_tag}:{marshal.version}'.encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.bin')
+
+    def get(self, key):
+        """
+        Returns the cached configs for key, or None if not cached (or unreadable).
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+
+        try:
+            configs = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            # Truncated or corrupted entry
+            self._remove(path)
+            return None
+
+        # Mark as recently used (skipped if read-only, or already evicted)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return configs
+
+    def put(self, key, configs):
+        """
+        Stores the configs for key. A cache that cannot be written (full disk,
+        permissions) is skipped: the audit goes on without caching.
+        """
+        if not self.enabled:
+            return
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as file:
+                marshal.dump(configs, file)
+            os.replace(tmp_path, path)
+            self.evict()
+        except OSError as e:
+            print(f'[!] Cannot write parse cache: {e}')
+            self._remove(tmp_path)
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in max_size.
+        """
+        if not self.enabled:
+            return
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.bin'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                # Removed meanwhile by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def load_config(filepath, cache=None, errors='strict'):
+    """
+    Returns (configs, from_cache) for a configuration file, using the cache when given.
+    The garbage collector is paused meanwhile: building millions of small acyclic
+    dicts and lists otherwise triggers constant, useless collections.
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        key = None
+        if cache is not None:
+            key = cache.key(filepath, errors)
+            configs = cache.get(key)
+            if configs is not None:
+                return configs, True
+
+        configs = fortios.parse_file(filepath, errors=errors)
+        if cache is not None:
+            cache.put(key, configs)
+        return configs, False
+    finally:
+        if gc_enabled:
+            gc.enable()
@@ -0,0 +1,113 @@
+# Inverted indexes over the "firewall policy" table.
+#
+# Each indexed field maps a value to the set of policy positions (in evaluation
+# order) using it, so multi-field filters are answered by set intersection
+# instead of walking every policy.
+
+# Multi-valued policy fields, stored as a string or a list of strings
+LIST_FIELDS = ("srcintf", "dstintf", "srcaddr", "dstaddr", "service")
+
+# Security profile fields of a policy
+PROFILE_FIELDS = ("av-profile", "webfilter-profile", "dnsfilter-profile", "emailfilter-profile",
+                  "dlp-sensor", "dlp-profile", "file-filter-profile", "ips-sensor", "application-list",
+                  "voip-profile", "waf-profile", "ssh-filter-profile", "icap-profile",
+                  "videofilter-profile", "profile-group")
+
+# FortiOS defaults, omitted by "show" when not changed
+DEFAULTS = {"status": "enable", "logtraffic": "utm"}
+
+
+def as_list(value):
+    """
+    Returns a policy field value as a list (fields are a string when there is one value).
+    """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+class PolicyIndex:
+
+    def __init__(self, policies):
+        self.policies = policies
+        self.all = frozenset(range(len(policies)))
+        self.fields = {field: {} for field in LIST_FIELDS + ("action", "status", "logtraffic") + PROFILE_FIELDS}
+        self.with_profile = set()
+
+        for position, policy in enumerate(policies):
+            for field in LIST_FIELDS:
+                index = self.fields[field]
+                for value in as_list(policy.get(field)):
+                    index.setdefault(value, set()).add(position)
+
+            # "action" is absent on some blocking policies: those are not indexed
+            if "action" in policy:
+                self.fields["action"].setdefault(policy["action"], set()).add(position)
+
+            for field, default in DEFAULTS.items():
+                self.fields[field].setdefault(policy.get(field, default), set()).add(position)
+
+            for field in PROFILE_FIELDS:
+                if field in policy:
+                    self.fields[field].setdefault(policy[field], set()).add(position)
+                    self.with_profile.add(position)
+
+    def lookup(self, field, values):
+        """
+        Returns the positions of the policies whose field matches any of values.
+        """
+        index = self.fields[field]
+        if len(values) == 1:
+            return index.get(values[0], set())
+        positions = set()
+        for value in values:
+            positions.update(index.get(value, ()))
+        return positions
+
+    def with_field(self, field):
+        """
+        Returns the positions of the policies where field is set (any value).
+        """
+        positions = set()
+        for matching in self.fields[field].values():
+            positions.update(matching)
+        return positions
+
+    def query(self, **filters):
+        """
+        Returns the policies matching all filters, in evaluation order.
+        Each filter is field=list of accepted values, None meaning no filter.
+        Special filters:
+          - addresses: matches srcaddr or dstaddr
+          - has_profile: True/False for any security profile, or a profile field name
+        """
+        selections = []
+        for field, values in filters.items():
+            if values is None:
+                continue
+            if field == "addresses":
+                selections.append(self.lookup("srcaddr", values) | self.lookup("dstaddr", values))
+            elif field == "has_profile":
+                if isinstance(values, str):
+                    selections.append(self.with_field(values))
+                elif values:
+                    selections.append(self.with_profile)
+                else:
+                    selections.append(self.all - self.with_profile)
+            else:
+                selections.append(self.lookup(field, values))
+
+        if not selections:
+            return list(self.policies)
+
+        # Intersect starting with the most selective filter
+        selections.sort(key=len)
+        positions = set(selections[0])
+        for selection in selections[1:]:
+            positions &= selection
+            if not positions:
+                return []
+
+        return [self.policies[position] for position in sorted(positions)]
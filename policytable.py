@@ -0,0 +1,200 @@
+import itertools
+
+from array import array
+
+# Columnar view of the "firewall policy" table.
+#
+# The policy checks test the same few fields of every policy ("logtraffic", "name",
+# "service"...). Here each field is a column: its values are interned (one integer code
+# per distinct value, 0 when the field is absent, lists as a single value) and the
+# column holds the code of every policy, in a NumPy array when NumPy is installed and in
+# a compact array('i') otherwise. A predicate is evaluated once per distinct value, then
+# spread over the policies by their codes: the result is a mask (NumPy booleans, or a
+# bytearray of 0/1), combined with all_of / any_of / none_of. rows() and select() give
+# the matching policies in evaluation order, to build the messages from the policies.
+
+# Columns built with the table (see Firewall.get_policy_table), the others on first use
+COLUMNS = ("name", "action", "service", "logtraffic", "internet-service-src-name", "internet-service-dst-name")
+
+ABSENT = 0
+
+_MISSING = object()
+_NOT = bytes([1, 0]) + bytes(254)
+_numpy = None
+
+
+def _load_numpy():
+    # NumPy if installed (imported on first use: it is slow to import), False otherwise
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy
+
+
+def _key(value):
+    # Hashable form of a value: lists (and blocks) compared as a whole
+    if isinstance(value, list):
+        return tuple(_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _key(item)) for key, item in value.items()))
+    return value
+
+
+class Column:
+
+    def __init__(self, policies, field):
+        self.field = field
+        self.values = [_MISSING]        # code -> value (the first policy using it)
+        ids = {_MISSING: ABSENT}
+        codes = array('i')
+        for policy in policies:
+            value = policy.get(field, _MISSING)
+            key = value if value.__class__ is str or value is _MISSING else _key(value)
+            code = ids.get(key)
+            if code is None:
+                code = ids[key] = len(self.values)
+                self.values.append(value)
+            codes.append(code)
+        self.ids = ids
+        numpy = _load_numpy()
+        self.codes = numpy.array(codes, dtype=numpy.intc) if numpy else codes
+
+    def code(self, value):
+        """
+        Returns the code of value, None if no policy uses it.
+        """
+        return self.ids.get(value if value.__class__ is str else _key(value))
+
+
+class PolicyTable:
+
+    def __init__(self, policies, fields=()):
+        self.policies = policies
+        self.size = len(policies)
+        self.numpy = _load_numpy()
+        self.columns = {}
+        for field in fields:
+            self.column(field)
+
+    def column(self, field):
+        """
+        Returns the column of field (built on first use).
+        """
+        column = self.columns.get(field)
+        if column is None:
+            column = self.columns[field] = Column(self.policies, field)
+        return column
+
+    def _spread(self, column, hits):
+        # Mask of the policies from the result of a predicate per code (hits[code] is 0 or 1)
+        if self.numpy:
+            return self.numpy.frombuffer(bytes(hits), dtype=bool)[column.codes]
+        return bytearray(map(hits.__getitem__, column.codes))
+
+    def present(self, field):
+        """
+        Mask of the policies where field is set.
+        """
+        column = self.column(field)
+        return self._spread(column, bytes([0]) + bytes([1]) * (len(column.values) - 1))
+
+    def equals(self, field, value):
+        """
+        Mask of the policies where field is value (as ==: a list does not equal a single string).
+        """
+        return self.isin(field, [value])
+
+    def isin(self, field, values):
+        """
+        Mask of the policies where field is one of values.
+        """
+        column = self.column(field)
+        hits = bytearray(len(column.values))
+        for value in values:
+            code = column.code(value)
+            if code is not None:
+                hits[code] = 1
+        return self._spread(column, hits)
+
+    def matches(self, field, predicate):
+        """
+        Mask of the policies where field is set and predicate(value) is true. The predicate is
+        called once per distinct value, with the value of the policy (a string or a list).
+        """
+        column = self.column(field)
+        hits = bytearray(len(column.values))
+        for code in range(1, len(column.values)):
+            if predicate(column.values[code]):
+                hits[code] = 1
+        return self._spread(column, hits)
+
+    def duplicated(self, field):
+        """
+        Mask of the policies where field is set to a value already used by a previous policy.
+        """
+        column = self.column(field)
+        numpy = self.numpy
+        if numpy:
+            mask = column.codes != ABSENT
+            first = numpy.unique(column.codes, return_index=True)[1]
+            mask[first] = False
+            return mask
+        seen = bytearray(len(column.values))
+        seen[ABSENT] = 2
+        mask = bytearray(self.size)
+        for row, code in enumerate(column.codes):
+            if seen[code] == 1:
+                mask[row] = 1
+            elif not seen[code]:
+                seen[code] = 1
+        return mask
+
+    def all_of(self, *masks):
+        """
+        Mask of the policies in all masks.
+        """
+        if self.numpy:
+            return self.numpy.logical_and.reduce(masks)
+        return bytearray(map(min, *masks)) if len(masks) > 1 else masks[0]
+
+    def any_of(self, *masks):
+        """
+        Mask of the policies in any of masks.
+        """
+        if self.numpy:
+            return self.numpy.logical_or.reduce(masks)
+        return bytearray(map(max, *masks)) if len(masks) > 1 else masks[0]
+
+    def none_of(self, mask):
+        """
+        Mask of the policies not in mask.
+        """
+        if self.numpy:
+            return ~mask
+        return mask.translate(_NOT)
+
+    def count(self, mask):
+        """
+        Number of policies in mask.
+        """
+        if self.numpy:
+            return int(mask.sum())
+        return mask.count(1)
+
+    def rows(self, mask):
+        """
+        Positions of the policies in mask, in evaluation order.
+        """
+        if self.numpy:
+            return self.numpy.flatnonzero(mask).tolist()
+        return list(itertools.compress(range(self.size), mask))
+
+    def select(self, mask):
+        """
+        Policies in mask, in evaluation order.
+        """
+        return [self.policies[row] for row in self.rows(mask)]
@@ -0,0 +1,39 @@
+from intervalset import IntervalSet
+
+# Protocol-aware sets of ports stored as sorted, merged intervals (see intervalset).
+#
+# A "1-65535" range is a single interval instead of 65535 integers.
+
+PROTOCOLS = ("tcp", "udp", "sctp")
+MIN_PORT = 0
+MAX_PORT = 65535
+
+
+class PortSet(IntervalSet):
+    __slots__ = ()
+
+    @classmethod
+    def all(cls, protocols=PROTOCOLS):
+        return cls({protocol: [(MIN_PORT, MAX_PORT)] for protocol in protocols})
+
+    def contains(self, port, protocol=None):
+        return self.overlaps_range(port, port, protocol)
+
+    def ports(self, protocol=None):
+        """
+        Returns the sorted list of individual ports (on protocol, or any protocol).
+        Beware: this expands the intervals.
+        """
+        ports = set()
+        protocols = PROTOCOLS if protocol is None else (protocol,)
+        for proto in protocols:
+            for start, end in self.intervals.get(proto, ()):
+                ports.update(range(start, end + 1))
+        return sorted(ports)
+
+    def __repr__(self):
+        items = []
+        for protocol, ranges in self.intervals.items():
+            ports = " ".join(str(start) if start == end else f'{start}-{end}' for start, end in ranges)
+            items.append(f'{protocol}/{ports}')
+        return f'PortSet({", ".join(items)})'
@@ -0,0 +1,265 @@
+import json
+import os
+import sqlite3
+import time
+
+# SQLite store of the check results (used by --resume to recover the manual steps).
+#
+# One row per device (configuration file path) and one row per (device, check), so a
+# run reads and writes only the rows of its device instead of the whole cache. Each
+# check result is upserted in its own transaction as soon as the check is performed.
+# The database is in WAL mode: concurrent runs (several Ansible jobs, batch workers)
+# write at the same time without overwriting each other. Devices not audited for
+# max_age days, or beyond the max_devices most recent ones, are removed.
+#
+# The digest of every chapter of the configuration audited last is also kept per
+# device, to report what changed since the previous audit (see --full).
+#
+# The memo table holds the results of the automatic checks by content: (check id,
+# digest of the check code and of its inputs). Devices built from the same template
+# share their blocks, so a check is evaluated once per distinct input across the
+# fleet and its result reused for the other devices.
+#
+# The snapshots table keeps, per device name, the fingerprint of the last configuration
+# audited (canonical content and audit settings, see fingerprint.py) with its checks and
+# report: a backup that did not change is not audited again.
+
+SCHEMA_VERSION = 1
+
+DEFAULT_MAX_AGE = 90  # days
+DEFAULT_MAX_DEVICES = 1000
+
+# Seconds waiting for the lock of another writer
+BUSY_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS devices (
+    id INTEGER PRIMARY KEY,
+    config TEXT NOT NULL UNIQUE,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS devices_updated ON devices (updated);
+CREATE TABLE IF NOT EXISTS results (
+    device_id INTEGER NOT NULL REFERENCES devices (id) ON DELETE CASCADE,
+    check_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (device_id, check_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS memo (
+    check_id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (check_id, digest)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS memo_updated ON memo (updated);
+CREATE TABLE IF NOT EXISTS snapshots (
+    device TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_updated ON snapshots (updated);
+CREATE TABLE IF NOT EXISTS chapters (
+    device_id INTEGER NOT NULL REFERENCES devices (id) ON DELETE CASCADE,
+    chapter TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (device_id, chapter)
+) WITHOUT ROWID;
+"""
+
+
+class ResultCache:
+
+    def __init__(self, path):
+        """
+        Opens (creates) the database at path.
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit: transactions are explicit (with self.connection / BEGIN IMMEDIATE)
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        self.connection.executescript(SCHEMA)
+        self.connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                                (str(SCHEMA_VERSION),))
+
+    def close(self):
+        self.connection.close()
+
+    def _transaction(self):
+        # Write lock taken at the start: no deadlock between two upgrading readers
+        self.connection.execute('BEGIN IMMEDIATE')
+        return _Transaction(self.connection)
+
+    def _device_id(self, config, create=False):
+        row = self.connection.execute('SELECT id FROM devices WHERE config = ?', (config,)).fetchone()
+        if row is not None or not create:
+            return None if row is None else row[0]
+        return self.connection.execute('INSERT INTO devices (config, updated) VALUES (?, ?)',
+                                       (config, time.time())).lastrowid
+
+    def has_device(self, config):
+        return self._device_id(config) is not None
+
+    def device_results(self, config):
+        """
+        Returns the results of config as a DeviceResults dict: {check id: result}.
+        """
+        results = DeviceResults(self, config)
+        device_id = self._device_id(config)
+        if device_id is not None:
+            for check_id, data in self.connection.execute(
+                    'SELECT check_id, data FROM results WHERE device_id = ?', (device_id,)):
+                dict.__setitem__(results, check_id, json.loads(data))
+        return results
+
+    def save(self, config, check_id, result):
+        """
+        Upserts the result of one check, atomically.
+        """
+        data = json.dumps(result)
+        now = time.time()
+        with self._transaction():
+            device_id = self._device_id(config, create=True)
+            self.connection.execute('UPDATE devices SET updated = ? WHERE id = ?', (now, device_id))
+            self.connection.execute(
+                'INSERT INTO results (device_id, check_id, data, updated) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (device_id, check_id) DO UPDATE SET data = excluded.data, updated = excluded.updated',
+                (device_id, check_id, data, now))
+
+    def chapter_digests(self, config):
+        """
+        Returns the chapter digests saved by the last complete audit of config: {chapter: digest}.
+        """
+        device_id = self._device_id(config)
+        if device_id is None:
+            return {}
+        return dict(self.connection.execute('SELECT chapter, digest FROM chapters WHERE device_id = ?', (device_id,)))
+
+    def save_chapter_digests(self, config, digests):
+        """
+        Replaces the chapter digests of config, atomically.
+        """
+        with self._transaction():
+            device_id = self._device_id(config, create=True)
+            self.connection.execute('DELETE FROM chapters WHERE device_id = ?', (device_id,))
+            self.connection.executemany('INSERT INTO chapters (device_id, chapter, digest) VALUES (?, ?, ?)',
+                                        [(device_id, chapter, digest) for chapter, digest in digests.items()])
+
+    def memo_get(self, check_id, digest):
+        """
+        Returns the memoized result of check_id for the inputs digest, or None.
+        """
+        row = self.connection.execute('SELECT data FROM memo WHERE check_id = ? AND digest = ?',
+                                      (check_id, digest)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def memo_save(self, check_id, digest, result):
+        with self._transaction():
+            self.connection.execute('INSERT OR REPLACE INTO memo (check_id, digest, data, updated) VALUES (?, ?, ?, ?)',
+                                    (check_id, digest, json.dumps(result), time.time()))
+
+    def snapshot(self, device, fingerprint):
+        """
+        Returns the snapshot saved by the last audit of device if its fingerprint matches, or None.
+        """
+        row = self.connection.execute('SELECT data FROM snapshots WHERE device = ? AND fingerprint = ?',
+                                      (device, fingerprint)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def save_snapshot(self, device, fingerprint, snapshot):
+        with self._transaction():
+            self.connection.execute('INSERT OR REPLACE INTO snapshots (device, fingerprint, data, updated) VALUES (?, ?, ?, ?)',
+                                    (device, fingerprint, json.dumps(snapshot), time.time()))
+
+    def evict(self, max_age=DEFAULT_MAX_AGE, max_devices=DEFAULT_MAX_DEVICES):
+        """
+        Removes the devices not updated for max_age days and the oldest devices beyond
+        max_devices (None: no limit). Returns the number of devices removed.
+        """
+        removed = 0
+        with self._transaction():
+            if max_age is not None:
+                removed += self.connection.execute('DELETE FROM devices WHERE updated < ?',
+                                                   (time.time() - max_age * 86400,)).rowcount
+                # Memoized results are not attached to a device
+                self.connection.execute('DELETE FROM memo WHERE updated < ?', (time.time() - max_age * 86400,))
+                self.connection.execute('DELETE FROM snapshots WHERE updated < ?', (time.time() - max_age * 86400,))
+            if max_devices is not None:
+                removed += self.connection.execute(
+                    'DELETE FROM devices WHERE id NOT IN (SELECT id FROM devices ORDER BY updated DESC LIMIT ?)',
+                    (max_devices,)).rowcount
+                self.connection.execute(
+                    'DELETE FROM snapshots WHERE device NOT IN (SELECT device FROM snapshots ORDER BY updated DESC LIMIT ?)',
+                    (max_devices,))
+        return removed
+
+    def migrate_json(self, json_path):
+        """
+        One-shot import of the old JSON cache file ({config: {check id: result}}), which is then
+        renamed to <json_path>.migrated. Returns the number of devices imported.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path) as json_file:
+            cache = json.load(json_file)
+        updated = os.path.getmtime(json_path)
+
+        with self._transaction():
+            migrated = self.connection.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+            if migrated is not None:
+                return 0
+            for config, results in cache.items():
+                # Results written since (by this version) are kept
+                device_id = self._device_id(config, create=True)
+                self.connection.executemany(
+                    'INSERT OR IGNORE INTO results (device_id, check_id, data, updated) VALUES (?, ?, ?, ?)',
+                    [(device_id, check_id, json.dumps(result), updated) for check_id, result in results.items()])
+            self.connection.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)", (json_path,))
+        try:
+            os.replace(json_path, f'{json_path}.migrated')
+        except OSError:
+            pass
+        return len(cache)
+
+
+class _Transaction:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.connection.execute('ROLLBACK' if exc_type is not None else 'COMMIT')
+        return False
+
+
+class DeviceResults(dict):
+    """
+    Results of one device, {check id: result}: every assignment is saved in the store.
+    """
+
+    def __init__(self, store, config):
+        super().__init__()
+        self.store = store
+        self.config = config
+
+    def __setitem__(self, check_id, result):
+        self.store.save(self.config, check_id, result)
+        super().__setitem__(check_id, result)
+
+    def __reduce__(self):
+        # Sent to other processes as a plain dict (the connection stays here)
+        return dict, (dict(self),)
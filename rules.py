@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+
+from checker import Checker
+
+# Declarative checks: rule files compiled into predicates.
+#
+# Most automatic checks read one chapter and compare a few "set" keys. They can be
+# written as rules in a JSON (or YAML, if PyYAML is installed) file of a benchmark
+# folder, listed in the check manifest like the Python checks (see checks/__init__.py):
+#
+#     {"benchmark_author": "CIS", "benchmark_version": "v1.1.0", "rules": [
+#         {"id": "2.1.9", "title": "Enable Global Strong Encryption", "levels": [2],
+#          "chapter": "system global",
+#          "missing": {"messages": [{"summary": "No \"config system global\" bloc in configuration file"}]},
+#          "conditions": [{"key": "strong-crypto", "equals": "enable",
+#                          "absent": [{"summary": "strong-crypto not defined"}],
+#                          "fail": [{"summary": "strong-crypto not enabled"}]}]}]}
+#
+# A rule fails when its chapter is missing ("missing": result FAIL by default, or PASS)
+# or when a condition fails: its key is absent, or its value does not pass the tests
+# (equals, not_equals, in, startswith, not_startswith, min, max; min and max compare
+# int(value)). With "mode": "first" (the default) the first failed condition ends the
+# rule, with "all" every condition is evaluated. Messages are added when the chapter is
+# missing, when a condition is absent, fails or passes, and when the rule passes:
+# {"summary": text} is the summary (set_message), {"log": text, "level": "INFO"} a log
+# line (add_message). Texts may use {key}, {value}, {values} (", ".join(value)) and
+# {number} (int(value)); with "each_key": true the message is added for every key of
+# the block. Rules produce the same results and messages as the equivalent Checker.
+#
+# Each rule is compiled once per process into closures. The rules to run are evaluated
+# together before the other checks (evaluate): each chapter is looked up once for all
+# the rules that read it.
+
+RULES_VERSION = 1
+
+RULE_FILE_EXTENSIONS = ('.json', '.yml', '.yaml')
+
+RULE_KEYS = {'id', 'title', 'levels', 'chapter', 'enabled', 'requires_inputs', 'mode', 'missing', 'conditions', 'pass'}
+CONDITION_KEYS = {'key', 'absent', 'fail', 'pass'}
+MESSAGE_KEYS = {'summary', 'log', 'level', 'each_key'}
+
+# Tests of a condition: name -> builder of the predicate
+TESTS = {
+    'equals': lambda expected: lambda value: value == expected,
+    'not_equals': lambda expected: lambda value: value != expected,
+    'in': lambda allowed: lambda value: value in allowed,
+    'startswith': lambda prefix: lambda value: value.startswith(prefix),
+    'not_startswith': lambda prefix: lambda value: not value.startswith(prefix),
+    'min': lambda minimum: lambda value: int(value) >= minimum,
+    'max': lambda maximum: lambda value: int(value) <= maximum,
+}
+
+# Compiled rule files of this process: path -> (signature, {rule id: checker class})
+_rule_files = {}
+_engine_digest = None
+
+
+class RuleError(ValueError):
+    """
+    Invalid rule file.
+    """
+
+
+def is_rule_file(name):
+    return name.endswith(RULE_FILE_EXTENSIONS)
+
+
+def load_rule_file(path):
+    """
+    Returns the content of a rule file (JSON, or YAML when PyYAML is installed).
+    """
+    with open(path, encoding='utf-8') as rule_file:
+        if path.endswith('.json'):
+            return json.load(rule_file)
+        try:
+            import yaml
+        except ImportError:
+            raise RuleError(f'{path}: YAML rule files need PyYAML (pip install pyyaml)') from None
+        return yaml.safe_load(rule_file)
+
+
+def _check_keys(where, spec, allowed):
+    if not isinstance(spec, dict):
+        raise RuleError(f'{where}: expected a mapping, got {spec!r}')
+    unknown = set(spec) - allowed
+    if unknown:
+        raise RuleError(f'{where}: unknown keys {", ".join(sorted(unknown))}')
+
+
+def _compile_messages(where, specs):
+    """
+    Returns emit(actions, block, key, value), which appends the (kind, text, level) of the messages.
+    """
+    messages = []
+    for spec in specs or []:
+        _check_keys(where, spec, MESSAGE_KEYS)
+        if ('summary' in spec) == ('log' in spec):
+            raise RuleError(f'{where}: a message is either a "summary" or a "log" line')
+        kind = 'summary' if 'summary' in spec else 'log'
+        text = spec[kind]
+        # Placeholders known once: constant texts are not formatted
+        fields = {field for field in ('key', 'value', 'values', 'number') if '{' + field + '}' in text}
+        messages.append((kind, text, spec.get('level', 'INFO'), fields, spec.get('each_key', False)))
+    if not messages:
+        return None
+
+    def emit(actions, block, key, value):
+        for kind, text, level, fields, each_key in messages:
+            if each_key:
+                for block_key, block_value in block.items():
+                    actions.append((kind, text.format(key=block_key, value=block_value), level))
+            elif fields:
+                context = {'key': key, 'value': value}
+                if 'values' in fields:
+                    context['values'] = ", ".join(value)
+                if 'number' in fields:
+                    context['number'] = int(value)
+                actions.append((kind, text.format(**context), level))
+            else:
+                actions.append((kind, text, level))
+    return emit
+
+
+def _compile_condition(where, spec):
+    """
+    Returns condition(block, actions): True if the condition passes, its messages appended to actions.
+    """
+    _check_keys(where, spec, CONDITION_KEYS | set(TESTS))
+    if 'key' not in spec:
+        raise RuleError(f'{where}: condition without "key"')
+    key = spec['key']
+    where = f'{where} ({key})'
+    tests = [TESTS[name](spec[name]) for name in TESTS if name in spec]
+    absent = _compile_messages(where, spec.get('absent'))
+    fail = _compile_messages(where, spec.get('fail'))
+    passed = _compile_messages(where, spec.get('pass'))
+
+    def condition(block, actions):
+        if key not in block:
+            if absent is not None:
+                absent(actions, block, key, None)
+            return False
+        value = block[key]
+        for test in tests:
+            if not test(value):
+                if fail is not None:
+                    fail(actions, block, key, value)
+                return False
+        if passed is not None:
+            passed(actions, block, key, value)
+        return True
+    return condition
+
+
+def compile_rule(where, spec):
+    """
+    Returns the predicate of a rule: evaluate(block) -> (result, actions, error), result being
+    True (PASS) or False (FAIL), actions the messages [(kind, text, level)] to add and error the
+    exception raised by a test (int() of a value that is not a number...) after those messages.
+    """
+    _check_keys(where, spec, RULE_KEYS)
+    missing = spec.get('missing', {})
+    _check_keys(f'{where} missing', missing, {'result', 'messages'})
+    missing_result = missing.get('result', 'FAIL')
+    if missing_result not in ('PASS', 'FAIL'):
+        raise RuleError(f'{where}: missing result must be PASS or FAIL')
+    missing_actions = []
+    missing_messages = _compile_messages(f'{where} missing', missing.get('messages'))
+    if missing_messages is not None:
+        missing_messages(missing_actions, {}, None, None)
+    missing_outcome = (missing_result == 'PASS', missing_actions, None)
+
+    mode = spec.get('mode', 'first')
+    if mode not in ('first', 'all'):
+        raise RuleError(f'{where}: mode must be "first" or "all"')
+    first = mode == 'first'
+    conditions = [_compile_condition(f'{where} condition {index + 1}', condition)
+                  for index, condition in enumerate(spec.get('conditions', []))]
+    passed = _compile_messages(f'{where} pass', spec.get('pass'))
+
+    def evaluate(block):
+        if block is None:
+            return missing_outcome
+        actions = []
+        failed = False
+        try:
+            for condition in conditions:
+                if not condition(block, actions):
+                    failed = True
+                    if first:
+                        break
+            if not failed and passed is not None:
+                passed(actions, block, None, None)
+        except Exception as e:
+            return None, actions, e
+        return not failed, actions, None
+    return evaluate
+
+
+def _digest_engine():
+    # Source of this module: part of the digest of every rule (see RuleCheck.get_inputs_digest)
+    global _engine_digest
+    if _engine_digest is None:
+        with open(__file__, 'rb') as source:
+            _engine_digest = hashlib.blake2b(source.read(), digest_size=16).hexdigest()
+    return _engine_digest
+
+
+class RuleCheck(Checker):
+    """
+    Check defined by a rule: one subclass per rule (see rule_classes), with the rule as class attributes.
+    """
+
+    spec = None
+    evaluate_rule = None
+    digest = None
+    benchmark = None
+
+    def __init__(self, firewall, display, verbose=False):
+        super().__init__(firewall, display, verbose)
+        spec = self.spec
+        self.id = spec.get('id')
+        self.title = spec.get('title')
+        self.levels = spec.get('levels')
+        self.auto = True
+        self.enabled = spec.get('enabled', True)
+        self.benchmark_version = self.benchmark.get('benchmark_version')
+        self.benchmark_author = self.benchmark.get('benchmark_author')
+        self.inputs = [spec['chapter']]
+        self.requires_inputs = spec.get('requires_inputs', False)
+        self.outcome = None     # (result, actions, error), set by evaluate() before the check is run
+
+    def get_inputs_digest(self):
+        # The rule and the engine instead of the source file of the class
+        return f'{self.digest}:{self.firewall.get_inputs_digest(self.inputs, self.indexes)}'
+
+    def do_check(self):
+        outcome = self.outcome
+        self.outcome = None
+        if outcome is None:
+            outcome = self.evaluate_rule(self.get_config(self.spec['chapter']))
+        result, actions, error = outcome
+        for kind, text, level in actions:
+            if kind == 'summary':
+                self.set_message(text)
+            else:
+                self.add_message(text, log_level=level)
+        if error is not None:
+            # Ends in ERROR, after the messages added before it (as a Checker raising it)
+            raise error
+        return result
+
+
+def rule_classes(path):
+    """
+    Returns the checker classes of the rules of a rule file, {rule id: class}, compiled
+    once per process (and again if the file changed).
+    """
+    stat = os.stat(path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _rule_files.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    content = load_rule_file(path)
+    _check_keys(path, content, {'benchmark_author', 'benchmark_version', 'rules'})
+    benchmark = {key: content.get(key) for key in ('benchmark_author', 'benchmark_version')}
+    classes = {}
+    for index, spec in enumerate(content.get('rules', [])):
+        where = f'{path}: rule {spec.get("id", index + 1) if isinstance(spec, dict) else index + 1}'
+        evaluate_rule = compile_rule(where, spec)
+        if 'chapter' not in spec:
+            raise RuleError(f'{where}: rule without "chapter"')
+        digest = hashlib.blake2b(f'{RULES_VERSION}:{_digest_engine()}:{json.dumps(spec, sort_keys=True)}'.encode(),
+                                 digest_size=16).hexdigest()
+        name = f'Rule_{benchmark["benchmark_author"]}_{spec.get("id")}'.replace('.', '_').replace(' ', '_')
+        classes[spec.get('id')] = type(name, (RuleCheck,), {
+            'spec': spec, 'evaluate_rule': staticmethod(evaluate_rule), 'digest': digest, 'benchmark': benchmark,
+        })
+    _rule_files[path] = (signature, classes)
+    return classes
+
+
+def evaluate(firewall, checkers):
+    """
+    Evaluates the rules of checkers (RuleCheck) in a single pass, chapter by chapter: each
+    checker keeps its outcome, applied when it is run.
+    """
+    by_chapter = {}
+    for checker in checkers:
+        by_chapter.setdefault(checker.spec['chapter'], []).append(checker)
+    for chapter, chapter_checkers in by_chapter.items():
+        block = firewall.get_config(chapter)
+        for checker in chapter_checkers:
+            checker.outcome = checker.evaluate_rule(block)
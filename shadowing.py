@@ -0,0 +1,284 @@
+from bisect import bisect_left, bisect_right
+
+# Shadowed and redundant firewall policies.
+#
+# A policy is covered by an earlier one when every packet it matches is also matched
+# by the earlier policy (srcintf, dstintf, srcaddr, dstaddr, service, schedule, users):
+# it is never applied. Covered by a policy with another action it is "shadowed",
+# covered by a policy with the same action it is "redundant".
+#
+# Comparing every pair of policies is O(n²). Instead, the candidates of each policy
+# are selected with bitmasks (Python integers, bit i = policy i): one mask per value
+# for the name fields, and for addresses and ports one mask per query point, giving
+# the policies whose intervals contain that point (computed by a sweep over the
+# sorted interval bounds). Only the few remaining candidates are checked exactly.
+#
+# Policies are analyzed by blocks, each block sweeping for its own query points only,
+# which bounds the memory used by the masks and lets blocks run in worker processes.
+
+BLOCK_SIZE = 2048
+
+# Names of the "any" values
+ANY_INTERFACE = "any"
+ANY_SCHEDULE = "always"
+
+# Opaque service of the policies allowing every service: only those cover it
+ALL_SERVICES = "<all services>"
+
+
+class PolicyMatch:
+    """
+    What a policy matches, resolved:
+      - srcintf, dstintf, identities: frozensets of names, None meaning any
+      - src, dst: AddressSet
+      - ports: PortSet, plus the services that have no ports (ICMP, IP protocols...), also
+        inside service groups, in opaque_services, all_services being True when the policy
+        allows every service (ALL, which is then one of its opaque_services)
+    """
+    __slots__ = ('policy', 'action', 'schedule', 'srcintf', 'dstintf', 'identities',
+                 'src', 'dst', 'ports', 'opaque_services', 'all_services')
+
+    def __init__(self, policy, action, schedule, srcintf, dstintf, identities, src, dst, ports,
+                 opaque_services, all_services):
+        self.policy = policy
+        self.action = action
+        self.schedule = schedule
+        self.srcintf = srcintf
+        self.dstintf = dstintf
+        self.identities = identities
+        self.src = src
+        self.dst = dst
+        self.ports = ports
+        self.opaque_services = opaque_services
+        self.all_services = all_services
+
+    def covers(self, other):
+        """
+        Exact check of the interval fields (the name fields are exact in the bitmasks).
+        """
+        if not self.all_services and not other.opaque_services <= self.opaque_services:
+            return False
+        return self.ports.covers(other.ports) and self.dst.covers(other.dst) and self.src.covers(other.src)
+
+
+def _bits(positions):
+    # Bitmask of an ascending list of positions
+    if not positions:
+        return 0
+    data = bytearray((positions[-1] >> 3) + 1)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, 'little')
+
+
+class _IntervalEvents:
+    """
+    Interval bounds of the interval sets of every policy, by kind (protocol, IP family):
+    sorted points with the positions of the policies whose intervals start or stop there.
+    The intervals of a set are disjoint and not adjacent, so each bound toggles its policy.
+    """
+
+    def __init__(self, interval_sets):
+        events = {}
+        for position, interval_set in enumerate(interval_sets):
+            for kind, ranges in interval_set.intervals.items():
+                kind_events = events.setdefault(kind, {})
+                for start, end in ranges:
+                    kind_events.setdefault(start, []).append(position)
+                    kind_events.setdefault(end + 1, []).append(position)
+        self.points = {}
+        self.toggles = {}
+        for kind, kind_events in events.items():
+            self.points[kind] = sorted(kind_events)
+            self.toggles[kind] = [kind_events[point] for point in self.points[kind]]
+
+    def stabbing(self, queries, end):
+        """
+        Returns {kind: {point: bitmask of the policies before end containing point}}
+        for the query points {kind: points}.
+        """
+        masks = {}
+        for kind, query_points in queries.items():
+            kind_masks = masks[kind] = {}
+            points = self.points.get(kind, [])
+            toggles = self.toggles.get(kind, [])
+            active = 0
+            next_event = 0
+            for query_point in sorted(query_points):
+                last_event = bisect_right(points, query_point, next_event)
+                for positions in toggles[next_event:last_event]:
+                    if len(positions) == 1:
+                        if positions[0] < end:
+                            active ^= 1 << positions[0]
+                    else:
+                        active ^= _bits(positions[:bisect_left(positions, end)])
+                next_event = last_event
+                kind_masks[query_point] = active
+        return masks
+
+
+def _query_points(interval_set):
+    # (kind, point) that every covering set must contain: first and last value of each kind
+    for kind, ranges in interval_set.intervals.items():
+        yield kind, ranges[0][0]
+        yield kind, ranges[-1][1]
+
+
+class ShadowingAnalyzer:
+
+    def __init__(self, matches):
+        """
+        matches: PolicyMatch of the comparable policies, in evaluation order.
+        """
+        self.matches = matches
+        self.name_masks = {}
+        self.any_masks = {}
+        for field in ('srcintf', 'dstintf', 'identities', 'schedule'):
+            positions = {}
+            any_positions = []
+            for index, match in enumerate(matches):
+                values = getattr(match, field)
+                if values is None or (field == 'schedule' and values == ANY_SCHEDULE):
+                    any_positions.append(index)
+                    continue
+                for value in ([values] if isinstance(values, str) else values):
+                    positions.setdefault(value, []).append(index)
+            self.name_masks[field] = {value: _bits(value_positions) for value, value_positions in positions.items()}
+            self.any_masks[field] = _bits(any_positions)
+
+        self.unresolved_masks = {}
+        self.all_address_masks = {}
+        for field in ('src', 'dst'):
+            positions = {}
+            for index, match in enumerate(matches):
+                for name in getattr(match, field).unresolved:
+                    positions.setdefault(name, []).append(index)
+            self.unresolved_masks[field] = {name: _bits(name_positions) for name, name_positions in positions.items()}
+            self.all_address_masks[field] = _bits([index for index, match in enumerate(matches)
+                                                   if getattr(match, field).is_all(4)])
+
+        self.all_services_mask = _bits([index for index, match in enumerate(matches) if match.all_services])
+        positions = {}
+        for index, match in enumerate(matches):
+            for name in match.opaque_services:
+                positions.setdefault(name, []).append(index)
+        self.opaque_masks = {name: _bits(name_positions) for name, name_positions in positions.items()}
+
+        self.events = {field: _IntervalEvents([getattr(match, field) for match in matches])
+                       for field in ('src', 'dst', 'ports')}
+
+    def _names_candidates(self, field, values, candidates):
+        # Policies with any value, or with all the values
+        masks = self.name_masks[field]
+        if values is None:
+            return candidates & self.any_masks[field]
+        if isinstance(values, str):
+            values = (values,)
+        containing = candidates
+        for value in values:
+            containing &= masks.get(value, 0)
+            if not containing:
+                break
+        return candidates & (containing | self.any_masks[field])
+
+    def candidates(self, index, stabbing):
+        """
+        Bitmask of the earlier policies that may cover the policy at index.
+        stabbing: masks of the query points of the block (see covering_range).
+        """
+        match = self.matches[index]
+        candidates = (1 << index) - 1
+        for field in ('srcintf', 'dstintf', 'identities', 'schedule'):
+            candidates = self._names_candidates(field, getattr(match, field), candidates)
+            if not candidates:
+                return 0
+
+        for field in ('src', 'dst'):
+            address_set = getattr(match, field)
+            for name in address_set.unresolved:
+                candidates &= self.unresolved_masks[field].get(name, 0) | self.all_address_masks[field]
+            for kind, point in _query_points(address_set):
+                candidates &= stabbing[field][kind][point]
+            if not candidates:
+                return 0
+
+        for name in match.opaque_services:
+            candidates &= self.all_services_mask | self.opaque_masks.get(name, 0)
+        for kind, point in _query_points(match.ports):
+            candidates &= stabbing['ports'][kind][point]
+        return candidates
+
+    def covering(self, index, stabbing):
+        """
+        Returns the index of the first policy covering the policy at index, or None.
+        """
+        match = self.matches[index]
+        candidates = self.candidates(index, stabbing)
+        while candidates:
+            lowest = candidates & -candidates
+            candidate = lowest.bit_length() - 1
+            if self.matches[candidate].covers(match):
+                return candidate
+            candidates ^= lowest
+        return None
+
+    def covering_range(self, start, end):
+        """
+        Returns (index, first covering index or None) for the policies of the block start-end.
+        """
+        stabbing = {}
+        for field, events in self.events.items():
+            queries = {}
+            for match in self.matches[start:end]:
+                for kind, point in _query_points(getattr(match, field)):
+                    queries.setdefault(kind, set()).add(point)
+            stabbing[field] = events.stabbing(queries, end)
+        return [(index, self.covering(index, stabbing)) for index in range(start, end)]
+
+    def analyze(self, workers=1):
+        """
+        Returns the list of (covered index, first covering index), in evaluation order.
+        With workers > 1 the blocks are split between processes (where fork is available).
+        """
+        count = len(self.matches)
+        bounds = [(start, min(start + BLOCK_SIZE, count)) for start in range(0, count, BLOCK_SIZE)]
+        workers = min(workers, len(bounds))
+        if workers > 1:
+            # Imported only for the parallel analysis (startup time, see auditor.py)
+            import multiprocessing
+        if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            global _shared_analyzer
+            _shared_analyzer = self
+            try:
+                with multiprocessing.get_context('fork').Pool(workers) as pool:
+                    # Last blocks are the most expensive: start them first
+                    results = pool.map(_covering_range, bounds[::-1], chunksize=1)[::-1]
+            finally:
+                _shared_analyzer = None
+        else:
+            results = [self.covering_range(start, end) for start, end in bounds]
+        return [(index, covering) for result in results for index, covering in result if covering is not None]
+
+
+# Analyzer inherited by the forked workers (see ShadowingAnalyzer.analyze)
+_shared_analyzer = None
+
+
+def _covering_range(bounds):
+    return _shared_analyzer.covering_range(*bounds)
+
+
+def find_covered_policies(matches, workers=1):
+    """
+    Returns one dict per covered policy, in evaluation order:
+    {"policy", "covered_by", "type": "shadowed" | "redundant"}
+    """
+    findings = []
+    for index, covering in ShadowingAnalyzer(matches).analyze(workers):
+        policy, earlier = matches[index], matches[covering]
+        findings.append({
+            "policy": policy.policy,
+            "covered_by": earlier.policy,
+            "type": "redundant" if policy.action == earlier.action else "shadowed",
+        })
+    return findings
@@ -0,0 +1,93 @@
+import json
+import os
+from datetime import datetime
+
+# Machine-readable results written next to each PDF report.
+#
+# Audit_FW1_2025-06-23.pdf -> Audit_FW1_2025-06-23.results.json, holding the result,
+# title, levels and findings of every check. Two audits are compared on these files,
+# joined by check id, instead of diffing the text extracted from the PDFs (which
+# changes whenever FPDF wraps a line differently).
+
+SIDECAR_VERSION = 1
+SUFFIX = '.results.json'
+
+
+def sidecar_path(report_path):
+    """
+    Results file of a PDF report (or the path itself if it is already a results file).
+    """
+    if report_path.endswith(SUFFIX):
+        return report_path
+    return os.path.splitext(report_path)[0] + SUFFIX
+
+
+def find(report_path):
+    """
+    Returns the results file of a PDF report, or None if it has none.
+    """
+    path = sidecar_path(report_path)
+    return path if os.path.isfile(path) else None
+
+
+def write(path, audit_result, report_date=''):
+    """
+    Writes the results of an auditor.AuditResult (atomically).
+    """
+    data = {
+        "version": SIDECAR_VERSION,
+        "name": audit_result.name,
+        "config": audit_result.config,
+        "report_date": report_date,
+        "generated": datetime.now().isoformat(timespec='seconds'),
+        "checks": [{key: check[key] for key in ("id", "title", "result", "levels", "auto", "findings")}
+                   for check in audit_result.checks],
+    }
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as results_file:
+        json.dump(data, results_file, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load(path):
+    with open(path, encoding='utf-8') as results_file:
+        data = json.load(results_file)
+    if data.get("version") != SIDECAR_VERSION:
+        raise ValueError(f'{path}: unsupported results file version {data.get("version")}')
+    return data
+
+
+def compare(old, new):
+    """
+    Compares two results files (loaded), joined by check id. Returns a dict of lists:
+      - "transitions": (id, title, old result, new result) of the checks whose result changed
+      - "added", "removed": (id, title, result) of the checks present in one audit only
+      - "new_findings", "resolved_findings": (id, title, finding)
+    """
+    old_checks = {check["id"]: check for check in old["checks"]}
+    new_checks = {check["id"]: check for check in new["checks"]}
+    comparison = {"transitions": [], "added": [], "removed": [], "new_findings": [], "resolved_findings": []}
+
+    for check_id, check in new_checks.items():
+        old_check = old_checks.get(check_id)
+        if old_check is None:
+            comparison["added"].append((check_id, check["title"], check["result"]))
+            continue
+        if old_check["result"] != check["result"]:
+            comparison["transitions"].append((check_id, check["title"], old_check["result"], check["result"]))
+        old_findings = set(old_check["findings"])
+        new_findings = set(check["findings"])
+        comparison["new_findings"].extend((check_id, check["title"], finding)
+                                          for finding in check["findings"] if finding not in old_findings)
+        comparison["resolved_findings"].extend((check_id, check["title"], finding)
+                                               for finding in old_check["findings"] if finding not in new_findings)
+
+    for check_id, check in old_checks.items():
+        if check_id not in new_checks:
+            comparison["removed"].append((check_id, check["title"], check["result"]))
+    return comparison
+
+
+def has_differences(comparison):
+    return any(comparison.values())
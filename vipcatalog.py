@@ -0,0 +1,112 @@
+import policyindex
+import portset
+
+# Name-indexed catalog of the virtual IPs ("firewall vip") and VIP groups
+# ("firewall vipgrp", flattened to their member VIPs), with the port forwarding
+# translation of each VIP (extport -> mappedport when "portforward enable").
+
+
+def _parse_port_range(value):
+    # "3389" or "3389-3390" -> (start, end), None if invalid
+    if value is None:
+        return None
+    low, _, high = str(value).partition('-')
+    try:
+        start = int(low)
+        end = int(high) if high else start
+    except ValueError:
+        return None
+    return (start, end) if start <= end else (end, start)
+
+
+class VipCatalog:
+
+    def __init__(self, vips, vip_groups, display=None):
+        self.display = display
+        self.vips = {vip['edit']: vip for vip in vips}
+        self._group_members = {group['edit']: policyindex.as_list(group.get('member')) for group in vip_groups}
+        self.groups = {}
+        for name in self._group_members:
+            self.groups[name] = self._flatten(name, [])
+        self._mapped_ports = {}
+
+    def _flatten(self, name, stack):
+        # VIP names of a group, nested groups included. Cycles are reported and cut.
+        if name in stack:
+            if self.display:
+                self.display.log(f"ADVERTENCIA: Grupo de VIPs cíclico: {' -> '.join(stack + [name])}", log_level="WARN")
+            return []
+        if name in self.vips:
+            return [name]
+        if name in self.groups:
+            return self.groups[name]
+        members = []
+        stack.append(name)
+        for member in self._group_members.get(name, []):
+            for vip_name in self._flatten(member, stack):
+                if vip_name not in members:
+                    members.append(vip_name)
+        stack.pop()
+        return members
+
+    def resolve(self, name):
+        """
+        Returns the VIP configs behind an address name: the VIP itself, the members
+        of a VIP group, or [] if the name is not a VIP.
+        """
+        if name in self.vips:
+            return [self.vips[name]]
+        return [self.vips[vip_name] for vip_name in self.groups.get(name, ())]
+
+    def is_vip(self, name):
+        return name in self.vips or name in self.groups
+
+    def port_translation(self, vip):
+        """
+        Returns the port forwarding of a VIP as (protocol, (ext_start, ext_end), (mapped_start, mapped_end)),
+        or None when the VIP forwards every port (no "portforward enable").
+        A single mapped port with an external range maps the whole range to that port.
+        """
+        if vip.get('portforward') != 'enable':
+            return None
+        protocol = vip.get('protocol', 'tcp')
+        external = _parse_port_range(vip.get('extport'))
+        mapped = _parse_port_range(vip.get('mappedport')) or external
+        if external is None:
+            external = mapped
+        if external is None:
+            return (protocol, None, None)
+        if mapped[0] == mapped[1] or mapped[1] - mapped[0] == external[1] - external[0]:
+            return (protocol, external, mapped)
+        # Ranges of different lengths: FortiOS maps them from the start
+        return (protocol, external, (mapped[0], mapped[0] + external[1] - external[0]))
+
+    def mapped_ports(self, vip):
+        """
+        Returns the PortSet of internal (mapped) ports reachable through the VIP.
+        """
+        name = vip['edit']
+        if name not in self._mapped_ports:
+            translation = self.port_translation(vip)
+            if translation is None:
+                ports = portset.PortSet.all()
+            else:
+                protocol, external, mapped = translation
+                if mapped is None or protocol not in portset.PROTOCOLS:
+                    ports = portset.PortSet()
+                else:
+                    ports = portset.PortSet({protocol: [mapped]})
+            self._mapped_ports[name] = ports
+        return self._mapped_ports[name]
+
+    def external_port(self, vip, mapped_port):
+        """
+        Returns the external port forwarded to mapped_port, or mapped_port itself without port forwarding.
+        """
+        translation = self.port_translation(vip)
+        if translation is None or translation[1] is None:
+            return mapped_port
+        protocol, external, mapped = translation
+        if mapped[0] == mapped[1]:
+            return external[0] if external[0] == external[1] else f'{external[0]}-{external[1]}'
+        return external[0] + mapped_port - mapped[0]